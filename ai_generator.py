@@ -3,17 +3,139 @@ AI Message Generator using Claude Haiku.
 Generates unique, personalized messages for social media.
 """
 
+import importlib.util
+import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import anthropic
-from config import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MODEL_SMART
+import httpx
+from config import ANTHROPIC_API_KEY, ANTHROPIC_BASE_URL, CLAUDE_MODEL, CLAUDE_MODEL_SMART
+from config import (
+    ANTHROPIC_CONNECT_TIMEOUT,
+    ANTHROPIC_HTTP2,
+    ANTHROPIC_KEEPALIVE_SECONDS,
+    ANTHROPIC_POOL_SIZE,
+    ANTHROPIC_TIMEOUT,
+    ANTHROPIC_WARMUP_CONNECTIONS,
+)
 from templates import get_system_prompt, get_generation_prompt, get_trump_senator_prompt, get_finland_email_prompt, get_denmark_email_prompt, get_yle_email_prompt, get_yle_tweet_prompt, SMART_REPLY_SYSTEM_PROMPT, get_smart_reply_prompt, get_sciencespo_email_prompt, get_france_email_prompt, get_spain_email_prompt, get_finland_embassy_email_prompt, get_military_support_email_prompt, get_whitehouse_email_prompt, get_jsn_email_prompt
 
 
+logger = logging.getLogger(__name__)
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """HTTPTransport that counts requests and the new connections they opened."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "connections_opened": 0, "connect_seconds": 0.0}
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = {}
+
+        def trace(event: str, info: dict) -> None:
+            # Connection events only fire for requests that open a new connection
+            if event == "connection.connect_tcp.started":
+                started["at"] = time.perf_counter()
+            elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete") and "at" in started:
+                now = time.perf_counter()
+                with self._lock:
+                    if event == "connection.connect_tcp.complete":
+                        self._counters["connections_opened"] += 1
+                    self._counters["connect_seconds"] += now - started["at"]
+                started["at"] = now
+
+        request.extensions = {**request.extensions, "trace": trace}
+        with self._lock:
+            self._counters["requests"] += 1
+        return super().handle_request(request)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["reused"] = max(0, counters["requests"] - counters["connections_opened"])
+        return counters
+
+
+def _use_http2() -> bool:
+    if not ANTHROPIC_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("ANTHROPIC_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
 class MessageGenerator:
-    def __init__(self):
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+    def __init__(self, base_url: str = None):
+        """
+        Args:
+            base_url: API endpoint (e.g. a local fake server); defaults to
+                      ANTHROPIC_BASE_URL, then the real API
+        """
+        # One pooled keep-alive transport for every call, so requests after
+        # the first reuse its connections instead of repeating DNS and TLS
+        self._transport = _CountingTransport(
+            http2=_use_http2(),
+            limits=httpx.Limits(
+                max_connections=ANTHROPIC_POOL_SIZE,
+                max_keepalive_connections=ANTHROPIC_POOL_SIZE,
+                keepalive_expiry=ANTHROPIC_KEEPALIVE_SECONDS,
+            ),
+        )
+        timeout = httpx.Timeout(ANTHROPIC_TIMEOUT, connect=ANTHROPIC_CONNECT_TIMEOUT)
+        self.http_client = httpx.Client(transport=self._transport, timeout=timeout)
+        self.client = anthropic.Anthropic(
+            api_key=ANTHROPIC_API_KEY,
+            base_url=base_url or ANTHROPIC_BASE_URL,
+            http_client=self.http_client,
+            timeout=timeout,
+        )
         self.model = CLAUDE_MODEL
 
+    def warm_up(self, count: int = ANTHROPIC_WARMUP_CONNECTIONS) -> int:
+        """
+        Opens pooled connections to the API before the first generation needs them.
+
+        Sends count concurrent unauthenticated HEAD requests to the API host;
+        any response means a connection was set up and is now kept alive.
+
+        Args:
+            count: Number of connections to open
+
+        Returns:
+            Number of connections opened
+        """
+        if count <= 0:
+            return 0
+        url = str(self.client.base_url)
+        start = time.monotonic()
+        opened_before = self._transport.metrics()["connections_opened"]
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            results = list(executor.map(lambda _: self._head(url), range(count)))
+        failed = [r for r in results if isinstance(r, Exception)]
+        opened = self._transport.metrics()["connections_opened"] - opened_before
+        if failed:
+            logger.error(f"Error warming up Anthropic connections: {failed[0]}")
+        else:
+            logger.info(f"Warmed up {opened} Anthropic connections in {time.monotonic() - start:.2f}s")
+        return opened
+
+    def _head(self, url: str):
+        try:
+            return self.http_client.head(url)
+        except httpx.HTTPError as e:
+            return e
+
+    def connection_metrics(self) -> dict:
+        """Returns requests sent, connections opened and reused, and time spent connecting."""
+        return self._transport.metrics()
+
     def generate_message(
         self,
         target: dict,
@@ -83,7 +205,7 @@ def generate_tweet(target: dict, language: str = "en") -> str:
     Convenience function to generate a tweet.
 
     Args:
-        target: Target dict from targets.py
+        target: Target record from targets.py
         language: Language code
 
     Returns:
@@ -98,7 +220,7 @@ def generate_instagram_caption(target: dict, language: str = "en") -> str:
     Convenience function to generate an Instagram caption.
 
     Args:
-        target: Target dict from targets.py
+        target: Target record from targets.py
         language: Language code
 
     Returns:
@@ -0,0 +1,533 @@
+"""
+Usage analytics CLI for Voice for Iran bot.
+
+Reads the analytics snapshot the bot refreshes every SNAPSHOT_INTERVAL
+seconds (or the live database with --live) through a read-only
+connection, so it can run next to the bot without ever taking the write
+lock. Results are streamed
+row by row from SQLite to stdout as a table, CSV or JSON.
+
+Usage:
+    python analytics.py overview
+    python analytics.py targets --since 2026-01-01 --limit 20
+    python analytics.py daily --days 14 --format csv
+    python analytics.py funnels --campaign jsn --format json
+    python analytics.py logs --limit 100 --action generate
+    python analytics.py logs --follow --campaign spain
+    python analytics.py unique --minutes 60
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import DB_PATH, SNAPSHOT_PATH
+from db import check_query_plans, connect_readonly
+from sketches import HyperLogLog
+
+# Aggregates without a date range read usage_rollup_totals; with a range they
+# read usage_rollup_hourly, so --since/--until are rounded out to whole hours.
+
+_OVERVIEW_SQL = """
+    SELECT 'Total Users' AS metric, ({users}) AS value
+    UNION ALL
+    SELECT 'Total Actions', COALESCE(SUM(count), 0) FROM {rollup} WHERE {where}
+    UNION ALL
+    SELECT 'Today''s Actions', COALESCE(SUM(count), 0) FROM usage_rollup_hourly
+    WHERE hour >= strftime('%Y-%m-%d 00:00:00', 'now')
+    UNION ALL
+    SELECT 'Tweets Generated', COALESCE(SUM(count), 0) FROM {rollup}
+    WHERE {where} AND action = 'generate'
+"""
+
+_ACTIONS_SQL = """
+    SELECT action, SUM(count) AS count FROM {rollup}
+    WHERE {where}
+    GROUP BY action ORDER BY count DESC
+"""
+
+_TARGETS_SQL = """
+    SELECT target_handle, SUM(count) AS count FROM {rollup}
+    WHERE {where} AND target_handle != '' AND (:action IS NULL OR action = :action)
+    GROUP BY target_handle ORDER BY count DESC
+    LIMIT :limit
+"""
+
+_LANGUAGES_SQL = """
+    SELECT language, SUM(count) AS count FROM {rollup}
+    WHERE {where} AND language != ''
+    GROUP BY language ORDER BY count DESC
+"""
+
+_DAILY_SQL = """
+    SELECT
+        d.day,
+        d.actions,
+        (SELECT COUNT(DISTINCT telegram_id) FROM usage_events
+         WHERE ts >= CAST(strftime('%s', d.day) AS INTEGER)
+           AND ts < CAST(strftime('%s', d.day, '+1 day') AS INTEGER)) AS users,
+        COALESCE((SELECT count FROM users_daily_new WHERE users_daily_new.day = d.day), 0) AS new_users
+    FROM (
+        SELECT substr(hour, 1, 10) AS day, SUM(count) AS actions
+        FROM usage_rollup_hourly
+        WHERE hour >= :start_hour AND hour < :end_hour
+        GROUP BY day
+    ) d
+    ORDER BY d.day DESC
+"""
+
+# Events and unique users per campaign action. Stages are ordered by users,
+# and rate is each stage's users relative to the campaign's widest stage.
+_FUNNELS_SQL = """
+    SELECT
+        campaign,
+        action,
+        events,
+        users,
+        ROUND(users * 1.0 / MAX(users) OVER (PARTITION BY campaign), 3) AS rate
+    FROM (
+        SELECT
+            campaigns.name AS campaign,
+            actions.name AS action,
+            COUNT(*) AS events,
+            COUNT(DISTINCT usage_events.telegram_id) AS users
+        FROM usage_events
+        JOIN campaign_actions ON campaign_actions.action_id = usage_events.action_id
+        JOIN campaigns ON campaigns.id = campaign_actions.campaign_id
+        JOIN actions ON actions.id = usage_events.action_id
+        WHERE usage_events.ts >= :start AND usage_events.ts < :end
+          AND (:campaign IS NULL OR campaigns.name = :campaign)
+        GROUP BY campaign_actions.campaign_id, usage_events.action_id
+    )
+    ORDER BY campaign, users DESC, events DESC
+"""
+
+_LOGS_SQL = """
+    SELECT id, datetime(ts, 'unixepoch', 'localtime') AS time, telegram_id,
+           COALESCE(username, '-') AS username, action,
+           COALESCE(target_handle, '-') AS target, COALESCE(language, '-') AS lang,
+           COALESCE(campaign, '-') AS campaign
+    FROM usage_logs
+    WHERE ts >= :start AND ts < :end
+      AND (:action IS NULL OR action = :action)
+      AND (:campaign IS NULL OR campaign = :campaign)
+    ORDER BY id DESC
+    LIMIT :limit
+"""
+
+# Follow mode: rows after the id cursor, up to the newest id seen this poll
+_FOLLOW_SQL = """
+    SELECT id, datetime(ts, 'unixepoch', 'localtime') AS time, telegram_id,
+           COALESCE(username, '-') AS username, action,
+           COALESCE(target_handle, '-') AS target, COALESCE(language, '-') AS lang,
+           COALESCE(campaign, '-') AS campaign
+    FROM usage_logs
+    WHERE id > :after AND id <= :upto
+      AND (:action IS NULL OR action = :action)
+      AND (:campaign IS NULL OR campaign = :campaign)
+    ORDER BY id
+"""
+
+# Checkpointed HyperLogLog buckets, grouped by campaign (0 = all users);
+# compacted hours and days that overlap the window count whole
+_SKETCHES_SQL = """
+    SELECT sketches.campaign_id, COALESCE(campaigns.name, '(all)'), registers
+    FROM (
+        SELECT campaign_id, registers FROM user_sketches
+        WHERE minute >= :start_minute AND minute < :end_minute
+        UNION ALL
+        SELECT campaign_id, registers FROM user_sketches_rollup
+        WHERE start_minute < :end_minute AND start_minute + span > :start_minute
+    ) AS sketches
+    LEFT JOIN campaigns ON campaigns.id = sketches.campaign_id
+    ORDER BY sketches.campaign_id
+"""
+
+# Poll interval bounds for follow mode, in seconds
+FOLLOW_MIN_INTERVAL = 0.5
+FOLLOW_MAX_INTERVAL = 5.0
+
+# Table rows held back to size the columns before printing; later rows
+# keep the widths of the first batch
+TABLE_BUFFER_ROWS = 1000
+
+
+def _parse_time(value: str) -> datetime:
+    """Parses YYYY-MM-DD or an ISO datetime; naive values are taken as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _bounds(args: argparse.Namespace) -> dict:
+    """
+    Turns --since/--until into query parameters.
+
+    Returns:
+        Dict with epoch bounds (start, end), hour-bucket bounds for the
+        rollup tables (start_hour, end_hour) and whether a range was given
+    """
+    start = int(args.since.timestamp()) if args.since else 0
+    # Exclusive upper bound that still includes rows written this second
+    end = int(args.until.timestamp()) if args.until else int(time.time()) + 1
+    return {
+        "start": start,
+        "end": end,
+        "start_hour": time.strftime("%Y-%m-%d %H:00:00", time.gmtime(start)),
+        # Round up so a partial final hour is included
+        "end_hour": time.strftime("%Y-%m-%d %H:00:00", time.gmtime(end + 3599)),
+        "ranged": bool(args.since or args.until),
+    }
+
+
+def _rollup_query(sql: str, bounds: dict) -> str:
+    """Fills in the rollup table, filter and user count for an aggregate query."""
+    if bounds["ranged"]:
+        return sql.format(
+            rollup="usage_rollup_hourly",
+            where="hour >= :start_hour AND hour < :end_hour",
+            users="SELECT COUNT(DISTINCT telegram_id) FROM usage_events WHERE ts >= :start AND ts < :end",
+        )
+    return sql.format(
+        rollup="usage_rollup_totals",
+        where="1",
+        users="SELECT COALESCE(SUM(count), 0) FROM users_daily_new",
+    )
+
+
+class RowWriter:
+    """
+    Writes rows one at a time as a table, CSV or JSON.
+
+    JSON is written as an array, or as one object per line (JSON Lines)
+    when json_lines is set, which is what follow mode uses since its
+    output never ends. Tables are printed in batches of up to
+    TABLE_BUFFER_ROWS rows (or at each flush()) so every column is as
+    wide as the header and the longest value seen so far.
+    """
+
+    def __init__(self, columns: list, fmt: str, out=sys.stdout, json_lines: bool = False):
+        self.columns = columns
+        self.fmt = fmt
+        self.out = out
+        self.json_lines = json_lines
+        self.count = 0
+        self._widths = [len(col) for col in columns]
+        self._pending = []
+        self._header_written = False
+        self._csv = csv.writer(out) if fmt == "csv" else None
+
+    def _table_line(self, cells: list) -> str:
+        return "  ".join(cell.ljust(w) for cell, w in zip(cells, self._widths)).rstrip() + "\n"
+
+    def header(self) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow(self.columns)
+        elif self.fmt == "json":
+            if not self.json_lines:
+                self.out.write("[")
+        # Tables print their header with the first batch of rows, once widths are known
+
+    def row(self, row: tuple) -> None:
+        if self.fmt == "csv":
+            self._csv.writerow(row)
+        elif self.fmt == "json":
+            obj = json.dumps(dict(zip(self.columns, row)), ensure_ascii=False)
+            if self.json_lines:
+                self.out.write(obj + "\n")
+            else:
+                self.out.write(("," if self.count else "") + "\n  " + obj)
+        else:
+            self._pending.append(["" if value is None else str(value) for value in row])
+            if len(self._pending) >= TABLE_BUFFER_ROWS:
+                self.flush()
+        self.count += 1
+
+    def flush(self) -> None:
+        """Prints buffered table rows (and the header, the first time) and flushes out."""
+        if self.fmt not in ("csv", "json"):
+            for cells in self._pending:
+                self._widths = [max(w, len(cell)) for w, cell in zip(self._widths, cells)]
+            if not self._header_written:
+                self.out.write(self._table_line(self.columns))
+                self.out.write("  ".join("-" * w for w in self._widths) + "\n")
+                self._header_written = True
+            self.out.writelines(self._table_line(cells) for cells in self._pending)
+            self._pending.clear()
+        self.out.flush()
+
+    def footer(self) -> None:
+        if self.fmt == "json" and not self.json_lines:
+            self.out.write("\n]\n" if self.count else "]\n")
+        self.flush()
+
+
+def write_rows(cursor: sqlite3.Cursor, fmt: str, out=sys.stdout) -> int:
+    """
+    Streams a cursor's rows to out without loading them into memory.
+
+    Args:
+        cursor: Executed cursor to read from
+        fmt: "table", "csv" or "json"
+        out: Text stream to write to
+
+    Returns:
+        Number of rows written
+    """
+    writer = RowWriter([col[0] for col in cursor.description], fmt, out)
+    writer.header()
+    for row in cursor:
+        writer.row(row)
+    writer.footer()
+    return writer.count
+
+
+def follow_logs(
+    conn: sqlite3.Connection,
+    fmt: str = "table",
+    action: str = None,
+    campaign: str = None,
+    backlog: int = 10,
+    min_interval: float = FOLLOW_MIN_INTERVAL,
+    max_interval: float = FOLLOW_MAX_INTERVAL,
+    out=sys.stdout,
+) -> None:
+    """
+    Prints new log entries as they are written, until interrupted.
+
+    The position is an id cursor: each poll reads only rows with a larger
+    id, found by a primary key range search, and the cursor then moves to
+    the newest id seen even if no row matched the filters, so filtered-out
+    rows are never read twice. Polls are skipped entirely while PRAGMA
+    data_version shows no commit from another connection. The poll
+    interval doubles while idle, up to max_interval, and drops back to
+    min_interval as soon as something arrives.
+
+    Args:
+        conn: Read-only connection
+        fmt: "table", "csv" or "json" (written as JSON Lines)
+        action: Only show this action
+        campaign: Only show this campaign
+        backlog: Number of recent matching entries to print first
+        min_interval: Shortest poll interval in seconds
+        max_interval: Longest poll interval in seconds
+        out: Text stream to write to
+    """
+    filters = {"action": action, "campaign": campaign}
+    last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM usage_events").fetchone()[0]
+
+    cursor = conn.execute(_FOLLOW_SQL, dict(filters, after=last_id, upto=last_id))
+    writer = RowWriter([col[0] for col in cursor.description], fmt, out, json_lines=True)
+    writer.header()
+
+    if backlog > 0:
+        recent = conn.execute(
+            _LOGS_SQL, dict(filters, start=0, end=2**62, limit=backlog)
+        ).fetchall()
+        for row in reversed(recent):
+            # Rows newer than the cursor are printed by the first poll
+            if row[0] <= last_id:
+                writer.row(row)
+    writer.flush()
+
+    interval = min_interval
+    data_version = None
+    while True:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        found = False
+        if version != data_version:
+            data_version = version
+            newest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM usage_events").fetchone()[0]
+            if newest > last_id:
+                for row in conn.execute(_FOLLOW_SQL, dict(filters, after=last_id, upto=newest)):
+                    writer.row(row)
+                    found = True
+                last_id = newest
+                writer.flush()
+
+        interval = min_interval if found else min(interval * 2, max_interval)
+        time.sleep(interval)
+
+
+def _overview(conn, args, bounds):
+    return conn.execute(_rollup_query(_OVERVIEW_SQL, bounds), bounds)
+
+
+def _actions(conn, args, bounds):
+    return conn.execute(_rollup_query(_ACTIONS_SQL, bounds), bounds)
+
+
+def _targets(conn, args, bounds):
+    params = dict(bounds, action=args.action, limit=args.limit)
+    return conn.execute(_rollup_query(_TARGETS_SQL, bounds), params)
+
+
+def _languages(conn, args, bounds):
+    return conn.execute(_rollup_query(_LANGUAGES_SQL, bounds), bounds)
+
+
+def _daily(conn, args, bounds):
+    if not args.since:
+        # Default to the last N days, starting at midnight UTC
+        end = datetime.fromtimestamp(bounds["end"], timezone.utc)
+        start = (end - timedelta(days=args.days)).replace(hour=0, minute=0, second=0)
+        bounds = dict(bounds, start_hour=start.strftime("%Y-%m-%d %H:00:00"))
+    return conn.execute(_DAILY_SQL, bounds)
+
+
+def _funnels(conn, args, bounds):
+    return conn.execute(_FUNNELS_SQL, dict(bounds, campaign=args.campaign))
+
+
+def _logs(conn, args, bounds):
+    if args.follow:
+        follow_logs(conn, args.format, args.action, args.campaign, args.limit, args.interval, args.max_interval)
+        return 0
+    params = dict(bounds, action=args.action, campaign=args.campaign, limit=args.limit)
+    return conn.execute(_LOGS_SQL, params)
+
+
+def _unique(conn, args, bounds):
+    if bounds["ranged"]:
+        start_minute, end_minute = bounds["start"] // 60, -(-bounds["end"] // 60)
+    else:
+        end_minute = bounds["end"] // 60 + 1
+        start_minute = end_minute - args.minutes
+
+    def rows():
+        # Rows arrive grouped by campaign, so only one merged sketch is held at a time
+        current_id = name = sketch = None
+        for campaign_id, campaign, registers in conn.execute(
+            _SKETCHES_SQL, {"start_minute": start_minute, "end_minute": end_minute}
+        ):
+            if campaign_id != current_id:
+                if sketch is not None:
+                    yield name, sketch.count()
+                current_id, name, sketch = campaign_id, campaign, HyperLogLog.from_bytes(registers)
+            else:
+                sketch.merge(HyperLogLog.from_bytes(registers))
+        if sketch is not None:
+            yield name, sketch.count()
+
+    return ["campaign", "unique_users"], rows()
+
+
+def _check_plans(conn, args, bounds):
+    try:
+        check_query_plans(conn)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print("All query plans use their indexes.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", help="database file (default: data/analytics.db snapshot, else data/usage.db)")
+    common.add_argument("--live", action="store_true", help="read the live database instead of the snapshot")
+    common.add_argument("--since", type=_parse_time, help="start date/time, inclusive (UTC unless given)")
+    common.add_argument("--until", type=_parse_time, help="end date/time, exclusive (UTC unless given)")
+    common.add_argument("--format", choices=("table", "csv", "json"), default="table", help="output format")
+
+    parser = argparse.ArgumentParser(description="Usage analytics for Voice for Iran bot")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser(
+        "overview", parents=[common], help="users, actions (total and today) and tweets generated"
+    ).set_defaults(handler=_overview)
+    commands.add_parser("actions", parents=[common], help="actions by type").set_defaults(handler=_actions)
+
+    targets = commands.add_parser("targets", parents=[common], help="most targeted handles")
+    targets.add_argument("--limit", type=int, default=10, help="number of targets (default: 10)")
+    targets.add_argument("--action", help="only count this action")
+    targets.set_defaults(handler=_targets)
+
+    commands.add_parser("languages", parents=[common], help="output languages used").set_defaults(
+        handler=_languages
+    )
+
+    daily = commands.add_parser("daily", parents=[common], help="actions and unique users per day")
+    daily.add_argument("--days", type=int, default=7, help="days to show when --since is not given (default: 7)")
+    daily.set_defaults(handler=_daily)
+
+    funnels = commands.add_parser("funnels", parents=[common], help="per-campaign funnel stages")
+    funnels.add_argument("--campaign", help="only show this campaign")
+    funnels.set_defaults(handler=_funnels)
+
+    logs = commands.add_parser("logs", parents=[common], help="raw log entries, newest first")
+    logs.add_argument("--limit", type=int, default=50, help="number of entries (default: 50)")
+    logs.add_argument("--action", help="only show this action")
+    logs.add_argument("--campaign", help="only show this campaign")
+    logs.add_argument(
+        "-f", "--follow", action="store_true", help="keep printing new entries as they arrive (Ctrl-C to stop)"
+    )
+    logs.add_argument(
+        "--interval", type=float, default=FOLLOW_MIN_INTERVAL, help="shortest follow poll interval in seconds"
+    )
+    logs.add_argument(
+        "--max-interval", type=float, default=FOLLOW_MAX_INTERVAL, help="longest follow poll interval in seconds"
+    )
+    logs.set_defaults(handler=_logs)
+
+    unique = commands.add_parser(
+        "unique", parents=[common], help="approximate distinct users per campaign (HyperLogLog, ~3%% error)"
+    )
+    unique.add_argument("--minutes", type=int, default=60, help="window when --since is not given (default: 60)")
+    unique.set_defaults(handler=_unique)
+
+    commands.add_parser(
+        "check-plans", parents=[common], help="verify the time-range queries use their indexes"
+    ).set_defaults(handler=_check_plans)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.db is None:
+        # Follow mode tails new rows, which only the live database has
+        live = args.live or getattr(args, "follow", False) or not os.path.exists(SNAPSHOT_PATH)
+        args.db = DB_PATH if live else SNAPSHOT_PATH
+
+    if not os.path.exists(args.db):
+        print("Database not found. Run setup_db.sh first.", file=sys.stderr)
+        return 1
+
+    conn = connect_readonly(args.db)
+    try:
+        result = args.handler(conn, args, _bounds(args))
+        if isinstance(result, int):
+            return result
+        if isinstance(result, tuple):
+            columns, rows = result
+            writer = RowWriter(columns, args.format)
+            writer.header()
+            for row in rows:
+                writer.row(row)
+            writer.footer()
+        else:
+            write_rows(result, args.format)
+    except BrokenPipeError:
+        # Output piped into head/less that exited early
+        pass
+    except KeyboardInterrupt:
+        # Ctrl-C ends follow mode
+        pass
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
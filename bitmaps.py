@@ -0,0 +1,158 @@
+"""
+Compressed bitmaps of small non-negative integers, roaring style.
+
+Values are split into 65536-wide chunks by their high bits. In memory each
+chunk is a Python int used as a bitset, so AND/OR/AND-NOT and popcount run
+in C over 64-bit words. On disk a chunk is stored either as a sorted array
+of 16-bit offsets (fewer than 4096 members) or as an 8 KB bitset,
+whichever is smaller, as in Roaring bitmaps.
+
+db.py uses these for cohorts of users, numbered densely (cohort_users.seq)
+so that a million users fit in about 16 chunks.
+"""
+
+import re
+import struct
+import sys
+from array import array
+
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+_BITSET_BYTES = (1 << _CHUNK_BITS) // 8
+# Chunks with fewer members than this are smaller as a 16-bit array
+_ARRAY_MAX = 4096
+
+_MAGIC = b"RBM1"
+_HEADER = struct.Struct("<4sI")
+_CHUNK_HEADER = struct.Struct("<IBI")  # high bits, kind, member count
+_KIND_ARRAY = 0
+_KIND_BITSET = 1
+
+# Set bit positions for every byte value, used when decoding bitsets
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+# Finds non-zero bytes at C speed, so sparse chunks skip their empty bytes
+_NONZERO_BYTE = re.compile(b"[^\x00]")
+
+
+def _bitset_to_offsets(bits: int) -> array:
+    offsets = array("H")
+    data = bits.to_bytes(_BITSET_BYTES, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        index = match.start()
+        base = index * 8
+        offsets.extend(base + bit for bit in _BYTE_BITS[data[index]])
+    return offsets
+
+
+def _offsets_to_bitset(offsets) -> int:
+    buf = bytearray(_BITSET_BYTES)
+    for offset in offsets:
+        buf[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(buf, "little")
+
+
+class RoaringBitmap:
+    """Set of non-negative integers supporting fast &, |, - and len()."""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, values=None):
+        # high bits -> bitset of the low 16 bits; never holds empty chunks
+        self._chunks = {}
+        if values is not None:
+            self.update(values)
+
+    def add(self, value: int) -> None:
+        high = value >> _CHUNK_BITS
+        self._chunks[high] = self._chunks.get(high, 0) | (1 << (value & _CHUNK_MASK))
+
+    def update(self, values) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self._chunks.get(value >> _CHUNK_BITS, 0) >> (value & _CHUNK_MASK) & 1)
+
+    def __len__(self) -> int:
+        return sum(bits.bit_count() for bits in self._chunks.values())
+
+    def __iter__(self):
+        for high in sorted(self._chunks):
+            base = high << _CHUNK_BITS
+            for offset in _bitset_to_offsets(self._chunks[high]):
+                yield base + offset
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RoaringBitmap) and self._chunks == other._chunks
+
+    def __repr__(self) -> str:
+        return f"RoaringBitmap(<{len(self)} values>)"
+
+    @classmethod
+    def _from_chunks(cls, chunks: dict) -> "RoaringBitmap":
+        bitmap = cls()
+        bitmap._chunks = {high: bits for high, bits in chunks.items() if bits}
+        return bitmap
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        small, large = (self, other) if len(self._chunks) <= len(other._chunks) else (other, self)
+        return self._from_chunks(
+            {high: bits & large._chunks[high] for high, bits in small._chunks.items() if high in large._chunks}
+        )
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        chunks = dict(self._chunks)
+        for high, bits in other._chunks.items():
+            chunks[high] = chunks.get(high, 0) | bits
+        return self._from_chunks(chunks)
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._from_chunks(
+            {high: bits & ~other._chunks.get(high, 0) for high, bits in self._chunks.items()}
+        )
+
+    def __ior__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        for high, bits in other._chunks.items():
+            self._chunks[high] = self._chunks.get(high, 0) | bits
+        return self
+
+    def to_bytes(self) -> bytes:
+        """Serializes to the array-or-bitset chunk format."""
+        parts = [_HEADER.pack(_MAGIC, len(self._chunks))]
+        for high in sorted(self._chunks):
+            bits = self._chunks[high]
+            count = bits.bit_count()
+            if count < _ARRAY_MAX:
+                offsets = _bitset_to_offsets(bits)
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                parts.append(_CHUNK_HEADER.pack(high, _KIND_ARRAY, count))
+                parts.append(offsets.tobytes())
+            else:
+                parts.append(_CHUNK_HEADER.pack(high, _KIND_BITSET, count))
+                parts.append(bits.to_bytes(_BITSET_BYTES, "little"))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RoaringBitmap":
+        magic, chunk_count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a serialized RoaringBitmap")
+        pos = _HEADER.size
+        chunks = {}
+        for _ in range(chunk_count):
+            high, kind, count = _CHUNK_HEADER.unpack_from(data, pos)
+            pos += _CHUNK_HEADER.size
+            if kind == _KIND_ARRAY:
+                offsets = array("H")
+                offsets.frombytes(data[pos : pos + count * 2])
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                chunks[high] = _offsets_to_bitset(offsets)
+                pos += count * 2
+            else:
+                chunks[high] = int.from_bytes(data[pos : pos + _BITSET_BYTES], "little")
+                pos += _BITSET_BYTES
+        return cls._from_chunks(chunks)
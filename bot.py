@@ -4,7 +4,10 @@ Helps amplify awareness about the situation in Iran.
 All UI is in Persian (Farsi).
 """
 
+import asyncio
+import importlib.util
 import logging
+import time
 import urllib.parse
 import re
 import httpx
@@ -14,20 +17,50 @@ from telegram.ext import (
     CommandHandler,
     CallbackQueryHandler,
     MessageHandler,
+    TypeHandler,
     filters,
     ContextTypes,
 )
-
-from config import BOT_TOKEN, LANGUAGES, UI
-from targets import get_all_targets, get_targets_with_instagram, get_random_target, get_target_by_handle, get_yle_campaign_categories, get_yle_campaign_targets, get_yle_target_by_handle
-from ai_generator import generate_tweet, generate_instagram_caption, generate_finland_email, generate_smart_reply
-from db import init_db, log_action
+from telegram.request import HTTPXRequest
+
+from campaigns import (
+    CAMPAIGNS,
+    DENMARK_EMAIL_TO,
+    EMERGENCY_EMAIL_TO,
+    FINLAND_EMBASSY_EMAIL_TO,
+    FRANCE_EMAIL_TO,
+    JSN_EMAIL_TO,
+    SCIENCESPO_EMAIL_TO,
+    SPAIN_EMAIL_TO,
+    WHITEHOUSE_EMAIL_TO,
+    YLE_EMAIL_TO,
+)
+from config import BOT_TOKEN, LANGUAGES, UI, ADMIN_IDS, STATS_CACHE_TTL, SMART_REPLY_MAX_REJECTED
+from config import (
+    BOT_POOL_SIZE,
+    BOT_KEEPALIVE_SECONDS,
+    BOT_CONNECT_TIMEOUT,
+    BOT_READ_TIMEOUT,
+    BOT_WRITE_TIMEOUT,
+    BOT_POOL_TIMEOUT,
+    BOT_HTTP2,
+    BOT_POLL_TIMEOUT,
+    BOT_WARMUP_CONNECTIONS,
+    BOT_CONCURRENT_UPDATES,
+)
+from keyboards import target_keyboard
+from outbound import outbound, reply_text
+from render import edit_message, render_cache
+from router import CallbackRouter
+from sessions import GeneratedMessage, add_target, clear_selection, get_selected_ids, get_selected_targets, get_session_manager, message_target, run_session_sweeper, selection_count, toggle_target
+from targets import get_random_target, get_target_by_handle, get_yle_campaign_targets, get_yle_target_by_handle
+from ai_generator import generate_tweet, generate_instagram_caption, generate_finland_email, generate_smart_reply, get_generator
+from db import init_db, log_action, get_stats, checkpoint_sketches, start_snapshot_thread, get_broadcast
+from broadcast import get_runner, resume_broadcasts, start_broadcast, stop_broadcast, stop_sending
+from logs import log_metrics, set_update_id, setup_logging
 
 # Set up logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # States for conversation
@@ -54,7 +87,7 @@ def create_email_url(to: str, subject: str, body: str) -> str:
     return f"mailto:{to}?subject={encoded_subject}&body={encoded_body}"
 
 
-# Emergency email campaign - update these for each campaign
+# Emergency email campaign - update these (and campaigns.py) for each campaign
 # Current: Finland - Release of arrested protesters
 EMERGENCY_EMAIL_BODY = """Hyvä vastaanottaja,
 
@@ -69,7 +102,6 @@ Arvostan suuresti poliisin työtä yleisen järjestyksen ylläpitämiseksi, mutt
 Kiitos ajastanne ja huomiostanne."""
 
 EMERGENCY_EMAIL_SUBJECT = "Vetoomus pidätettyjen vapauttamisesta ja tilanteen oikeasuhtaisesta arvioinnista"
-EMERGENCY_EMAIL_TO = "viestinta.helsinki@poliisi.fi,Kirjaamo.UM@gov.fi,elina.valtonen@gov.fi"
 EMERGENCY_EMAIL_CC = ""  # Add CC recipient here if needed
 
 # Denmark Emergency - Request for reconsideration and release
@@ -84,7 +116,6 @@ Det anerkendes samtidig, at der er sket skade på ejendom, hvilket naturligvis e
 På denne baggrund anmodes der respektfuldt om, at politiet overvejer løsladelse, eventuelt med alternative eller mildere foranstaltninger, frem for fortsat frihedsberøvelse, indtil sagen måtte blive endeligt afgjort."""
 
 DENMARK_EMAIL_SUBJECT = "Anmodning om genovervejelse og løsladelse – politimæssig vurdering"
-DENMARK_EMAIL_TO = "udenrigsminister@um.dk,um@um.dk"
 
 # Yle Correction Email - Misleading article about Khamenei
 YLE_EMAIL_BODY = """Hyvä vastaanottaja,
@@ -102,25 +133,124 @@ Ylellä on tärkeä rooli luotettavana uutismediana, ja toivon, että artikkelin
 Kiitos ajastanne ja huomiostanne."""
 
 YLE_EMAIL_SUBJECT = "Huomio artikkelin harhaanjohtavaan sanamuotoon Iranin vallankäytöstä"
-YLE_EMAIL_TO = "oikaisu.verkko@yle.fi,yleinfo@yle.fi,uutiset@yle.fi"
 
-# Finland Embassy Closure Email
-FINLAND_EMBASSY_EMAIL_TO = "ALA-02@gov.fi,ALA-03@gov.fi,int.dep@eduskunta.fi,anna.sorto@eduskunta.fi,kaisa.mannisto@eduskunta.fi,ALA-10@gov.fi,ALA-01@gov.fi"
 
-# Sciences Po (Kevan Gafaïti) Email
-SCIENCESPO_EMAIL_TO = "accueil.enseignant@sciencespo.fr,media@sciencespo.fr,webmestre@sciencespo.fr,info@sciencespo-alumni.fr,integrite.scientifique@sciencespo.fr,claudine.lamaze@sciencespo.fr,marina.abelskaiagraziani@sciencespo.fr,benedicte.barbe@sciencespo.fr,vincent.morandi@sciencespo.fr,elsa.bedos@sciencespo.fr,helene.naudet@sciencespo.fr"
+class StatsCache:
+    """
+    Serves get_stats() results from memory for the /stats command.
+
+    Queries run in a worker thread so they never block the event loop. At most
+    one refresh is in flight at a time; while it runs, callers get the last
+    (possibly stale) result instead of triggering more queries.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value = None
+        self._computed_at = 0.0
+        self._refresh_task = None
+
+    async def _refresh(self) -> dict:
+        stats = await asyncio.to_thread(get_stats)
+        self._value = stats
+        self._computed_at = time.monotonic()
+        return stats
+
+    def _on_refresh_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            logger.error(f"Error refreshing stats: {task.exception()}")
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    async def get(self) -> tuple:
+        """Returns (stats, age_in_seconds), refreshing in the background when stale."""
+        age = time.monotonic() - self._computed_at
+        if self._value is not None and age < self.ttl:
+            return self._value, age
+
+        task = self._start_refresh()
+        if self._value is not None:
+            return self._value, age
+
+        # First call: nothing cached yet, wait for the shared refresh
+        await asyncio.shield(task)
+        return self._value, 0.0
+
+
+stats_cache = StatsCache(STATS_CACHE_TTL)
+
+
+def format_stats(stats: dict, age: float) -> str:
+    """Formats get_stats() output and per-campaign counts for the /stats command."""
+    actions = stats["actions_by_type"]
 
-# White House Email
-WHITEHOUSE_EMAIL_TO = "comments@whitehouse.gov"
+    lines = [
+        UI["stats_title"],
+        "",
+        f"👤 Users: {stats['total_users']} (new today: {stats['today_new_users']})",
+        f"🟢 Last hour: ~{stats['last_hour_users']}",
+        f"⚡ Actions: {stats['total_actions']} (today: {stats['today_actions']})",
+        "",
+        UI["stats_campaigns"],
+    ]
+    for campaign, info in CAMPAIGNS.items():
+        start_action, send_action = info["actions"]
+        started = actions.get(start_action, 0) if start_action else None
+        sent = actions.get(send_action, 0)
+        if not started and not sent:
+            continue
+        counts = f"{started} → {sent}" if started is not None else f"{sent}"
+        recent = stats["last_hour_campaign_users"].get(campaign)
+        if recent:
+            counts += f" (~{recent} users/1h)"
+        lines.append(f"• {campaign}: {counts}")
+
+    if stats["top_targets"]:
+        lines += ["", "🎯 Top targets:"]
+        lines += [f"• {handle}: {count}" for handle, count in stats["top_targets"].items()]
+
+    if stats["languages"]:
+        lines += ["", "🌐 " + ", ".join(f"{lang}: {count}" for lang, count in stats["languages"].items())]
+
+    sessions = get_session_manager().metrics()
+    lines += [
+        "",
+        f"🧠 Sessions: {sessions['live_sessions']} live, {sessions['bytes_held'] / 1024 / 1024:.1f} MB "
+        f"(evicted: {sessions['evicted_idle']} idle, {sessions['evicted_memory']} memory)",
+    ]
+
+    edits = render_cache.metrics()
+    lines.append(f"✏️ Edits: {edits['sent']} sent, {edits['skipped']} skipped as unchanged")
+    sends = outbound.metrics()
+    lines.append(
+        f"📤 Outbound: {sends['queued']} queued, {sends['coalesced']} coalesced, "
+        f"{sends['retry_after']} flood waits, {sends['failed']} failed"
+    )
 
-# JSN (Julkisen sanan neuvosto - Finnish Council for Mass Media) Email
-JSN_EMAIL_TO = "Eero.Hyvonen@jsn.fi,Susan.Heikkinen@jsn.fi,Jukka.Hiiro@jsn.fi,Laura.Juntunen@jsn.fi"
+    logs = log_metrics()
+    if logs["suppressed"] or logs["dropped"]:
+        lines.append(f"📝 Logs: {logs['suppressed']} repeats suppressed, {logs['dropped']} dropped")
+    runner = get_runner()
+    if runner is not None:
+        progress = runner.progress()
+        lines.append(f"📢 Broadcast #{runner.broadcast_id}: {progress['rate']:.1f} msg/s, {progress['left']} left")
+    api = get_generator().connection_metrics()
+    lines.append(
+        f"🔌 Anthropic: {api['requests']} requests, {api['reused']} on reused connections, "
+        f"{api['connections_opened']} connects ({api['connect_seconds']:.1f}s)"
+    )
 
-# France Foreign Ministry Email
-FRANCE_EMAIL_TO = "francois-xavier.bellamy@europarl.europa.eu,gregory.allione@europarl.europa.eu,mathilde.androuet@europarl.europa.eu,manon.aubry@europarl.europa.eu,jordan.bardella@europarl.europa.eu,nicolas.bay@europarl.europa.eu,christophe.bay@europarl.europa.eu,gilles.boyer@europarl.europa.eu,marie-luce.brasier-clain@europarl.europa.eu,melissa.camara@europarl.europa.eu,courrier.bruxelles-dfra@diplomatie.gouv.fr,presse.bruxelles-dfra@diplomatie.gouv.fr,mail.bruxelles-dfra@diplomatie.gouv.fr,rp.strasbourg-dfra@diplomatie.gouv.fr"
+    slowest = sorted(callbacks.timings().items(), key=lambda item: item[1]["mean"], reverse=True)[:3]
+    if slowest:
+        lines += ["", "⏱ Slowest buttons:"]
+        lines += [f"• {route}: {t['mean'] * 1000:.0f} ms avg ({t['calls']} calls)" for route, t in slowest]
 
-# Spain Foreign Ministry Email
-SPAIN_EMAIL_TO = "esteban.gonzalezpons@europarl.europa.eu,maravillas.abadiajover@europarl.europa.eu,pablo.ariasecheverria@europarl.europa.eu,isabel.benjumea@europarl.europa.eu,pilar.delcastillo@europarl.europa.eu,mariacarmen.crespodiaz@europarl.europa.eu,raul.delahoz@europarl.europa.eu,rosa.estaras@europarl.europa.eu,alma.ezcurra@europarl.europa.eu,sandra.gomezlopez@europarl.europa.eu,javi.lopez@europarl.europa.eu,juanfernando.lopezaguilar@europarl.europa.eu,cesar.luena@europarl.europa.eu,cristina.maestre@europarl.europa.eu,idoia.mendia@europarl.europa.eu,javier.morenosanchez@europarl.europa.eu,marcos.rossempere@europarl.europa.eu,nacho.sanchezamor@europarl.europa.eu,emb.bruselas@maec.es,Secretaria.Emb@reper.maec.es,alicia.cocero@reper.maec.es,sergi.farre@reper.maec.es,juan.hernandez@reper.maec.es,marta.bardon@reper.maec.es,secretaria.erpa@reper.maec.es,victoria.ortega@reper.maec.es,Cops.Espana@reper.maec.es,Laura.martinez@reper.maec.es,Asis.barrera@reper.maec.es,Nuno.santos@reper.maec.es,Antonio.leton@reper.maec.es,comunicacion-pres@reper.maec.es,javier.molina@reper.maec.es,carlos.gomez@reper.maec.es,Ae.Cjur@reper.maec.es,mariajose.ruizsanchez@reper.maec.es,luis.aguilera@reper.maec.es,yago.fernandez@reper.maec.es,Parlamentoue@reper.maec.es,rossana.rosello@reper.maec.es,Unidadpresencia@reper.maec.es,elena.campos@reper.maec.es,leticia.lorenzo@reper.maec.es,cesar.pla@reper.maec.es,Coecad@reper.maec.es,cecilia.rocha@reper.maec.es,rocio.perezds@reper.maec.es,informae@maec.es,consular@maec.es,informacion.consular@maec.es,dg.cdpr@maec.es,prensa@maec.es,sg.cedpr@maec.es,dg.diplomaciaeconomica@maec.es,protocolo@maec.es,se.aex@maec.es,polext@maec.es,dg.mamop@maec.es,dg.nnuuddhh@maec.es"
+    lines += ["", f"({int(age)}s ago)"]
+    return "\n".join(lines)
 
 
 def is_valid_handle_format(handle: str) -> bool:
@@ -133,7 +263,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles the /start command."""
     user = update.effective_user
     context.user_data["state"] = STATE_NONE
-    context.user_data["selected_targets"] = []
+    clear_selection(context.user_data)
 
     log_action(
         telegram_id=user.id,
@@ -147,7 +277,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
 
-    await update.message.reply_text(
+    await reply_text(
+        update.message,
         UI["welcome"] + "\n\n" + UI["select_platform"],
         reply_markup=reply_markup,
     )
@@ -165,7 +296,8 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
 
         # Validate handle format
         if not is_valid_handle_format(handle):
-            await update.message.reply_text(
+            await reply_text(
+                update.message,
                 "فرمت نام کاربری اشتباه است. نام کاربری توییتر باید:\n"
                 "- حداکثر ۱۵ کاراکتر باشد\n"
                 "- فقط شامل حروف، اعداد و _ باشد\n\n"
@@ -174,18 +306,8 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             return
 
         # Valid format - add to selected targets
-        target = {
-            "name": f"@{handle}",
-            "handle": handle,
-            "description": "Custom target",
-            "description_fa": "هدف سفارشی",
-            "tone": "respectful and urgent",
-        }
-
-        selected = context.user_data.get("selected_targets", [])
-        if not any(t["handle"] == handle for t in selected):
-            selected.append(target)
-            context.user_data["selected_targets"] = selected
+        add_target(context.user_data, handle)
+        selected = get_selected_targets(context.user_data)
 
         context.user_data["state"] = STATE_NONE
 
@@ -196,7 +318,8 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         ]
 
         targets_list = "\n".join([f"• @{t['handle']}" for t in selected])
-        await update.message.reply_text(
+        await reply_text(
+            update.message,
             f"@{handle} اضافه شد!\n\n"
             f"اهداف انتخاب شده:\n{targets_list}\n\n"
             "می‌خواهید هدف دیگری اضافه کنید؟",
@@ -223,7 +346,7 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
                 tweet_text = parts[1].strip()
 
         # Show generating message
-        generating_msg = await update.message.reply_text(UI["smart_reply_generating"])
+        generating_msg = await reply_text(update.message, UI["smart_reply_generating"])
 
         try:
             # Generate smart reply
@@ -233,7 +356,7 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             # Store data for potential regeneration
             context.user_data["smart_reply_tweet"] = tweet_text
             context.user_data["smart_reply_username"] = username
-            context.user_data["smart_reply_rejected"] = rejected + [reply]
+            context.user_data["smart_reply_rejected"] = (rejected + [reply])[-SMART_REPLY_MAX_REJECTED:]
             context.user_data["smart_reply_current"] = reply
 
             log_action(
@@ -261,7 +384,8 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
                 [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
             ]
 
-            await generating_msg.edit_text(
+            await edit_message(
+                generating_msg,
                 msg_text,
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode="Markdown",
@@ -272,1027 +396,1125 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
             keyboard = [
                 [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
             ]
-            await generating_msg.edit_text(
+            await edit_message(
+                generating_msg,
                 f"{UI['smart_reply_title']}\n\n"
                 f"❌ خطا در ساختن پاسخ. لطفاً دوباره تلاش کنید.\n\n{str(e)}",
                 reply_markup=InlineKeyboardMarkup(keyboard),
             )
 
 
+# Inline keyboard callbacks, registered below by callback_data or its prefix
+callbacks = CallbackRouter()
+
+
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles all callback queries from inline keyboards."""
+    if not await callbacks.dispatch(update, context):
+        # Stale or unknown button: stop the client's loading spinner
+        await update.callback_query.answer()
+
+
+@callbacks.route("noop")
+async def callback_noop(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Page indicator buttons do nothing."""
+    await update.callback_query.answer()
+
+
+@callbacks.prefix("platform_")
+async def callback_platform(update: Update, context: ContextTypes.DEFAULT_TYPE, platform: str) -> None:
+    """Platform selection - go directly to targets."""
     query = update.callback_query
     user = update.effective_user
-    data = query.data
-
-    # Platform selection - go directly to targets
-    if data.startswith("platform_"):
-        await query.answer()
-        platform = data.replace("platform_", "")
-        context.user_data["platform"] = platform
-        context.user_data["selected_targets"] = []
-        log_action(telegram_id=user.id, username=user.username, action="select_platform", platform=platform)
-
-        # Show target selection directly
-        await show_target_selection(query, context)
-
-    # Show targets (for adding more)
-    elif data == "show_targets":
-        await query.answer()
-        await show_target_selection(query, context)
-
-    # Toggle target selection (multi-select)
-    elif data.startswith("toggle_"):
-        await query.answer()
-        handle = data.replace("toggle_", "")
-        platform = context.user_data.get("platform", "twitter")
-
-        # Get targets based on platform
-        if platform == "instagram":
-            targets = get_targets_with_instagram()
-        else:
-            targets = get_all_targets()
-        target = next((t for t in targets if t["handle"] == handle), None)
+    await query.answer()
+    context.user_data["platform"] = platform
+    context.user_data["target_page"] = 0
+    clear_selection(context.user_data)
+    log_action(telegram_id=user.id, username=user.username, action="select_platform", platform=platform)
 
-        if target:
-            selected = context.user_data.get("selected_targets", [])
+    # Show target selection directly
+    await show_target_selection(query, context)
 
-            # Toggle selection
-            if any(t["handle"] == handle for t in selected):
-                selected = [t for t in selected if t["handle"] != handle]
-            else:
-                selected.append(target)
 
-            context.user_data["selected_targets"] = selected
+@callbacks.prefix("target_page_")
+async def callback_target_page(update: Update, context: ContextTypes.DEFAULT_TYPE, page: str) -> None:
+    """Target list pagination and category tabs."""
+    query = update.callback_query
+    await query.answer()
+    context.user_data["target_page"] = int(page) if page.isdigit() else 0
+    await show_target_selection(query, context)
 
-        # Refresh the target list
-        await show_target_selection(query, context)
 
-    # Enter custom handle (Twitter only)
-    elif data == "enter_custom":
-        await query.answer()
-        context.user_data["state"] = STATE_WAITING_CUSTOM_HANDLE
+@callbacks.route("show_targets")
+async def callback_show_targets(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Show targets (for adding more)."""
+    query = update.callback_query
+    await query.answer()
+    await show_target_selection(query, context)
 
-        keyboard = [[InlineKeyboardButton(UI["back"], callback_data="show_targets")]]
 
-        await query.edit_message_text(
-            "نام کاربری توییتر را وارد کنید:\n"
-            "(مثال: elonmusk یا @elonmusk)",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+@callbacks.prefix("toggle_")
+async def callback_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE, handle: str) -> None:
+    """Toggle target selection (multi-select)."""
+    query = update.callback_query
+    await query.answer()
+    platform = context.user_data.get("platform", "twitter")
 
-    # Random target selection
-    elif data == "target_random":
-        await query.answer()
-        target = get_random_target()
-        if target:
-            selected = context.user_data.get("selected_targets", [])
-            if not any(t["handle"] == target["handle"] for t in selected):
-                selected.append(target)
-                context.user_data["selected_targets"] = selected
-
-        # Go to language selection
-        await show_language_selection(query, context)
-
-    # Continue to language selection
-    elif data == "continue_to_language":
-        await query.answer()
-        selected = context.user_data.get("selected_targets", [])
-
-        if not selected:
-            await query.answer("لطفاً حداقل یک هدف انتخاب کنید", show_alert=True)
-            return
+    target = get_target_by_handle(handle)
+    if target and platform == "instagram" and not target.instagram:
+        target = None
 
-        await show_language_selection(query, context)
+    if target:
+        toggle_target(context.user_data, target)
 
-    # Language selection - Generate messages
-    elif data.startswith("lang_"):
-        await query.answer()
-        language = data.replace("lang_", "")
-        context.user_data["language"] = language
+    # Refresh the target list
+    await show_target_selection(query, context)
 
-        selected = context.user_data.get("selected_targets", [])
-        platform = context.user_data.get("platform", "twitter")
 
-        if not selected:
-            await query.edit_message_text(UI["error"])
-            return
+@callbacks.route("enter_custom")
+async def callback_enter_custom(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Enter custom handle (Twitter only)."""
+    query = update.callback_query
+    await query.answer()
+    context.user_data["state"] = STATE_WAITING_CUSTOM_HANDLE
 
-        for target in selected:
-            log_action(
-                telegram_id=user.id,
-                username=user.username,
-                action="generate",
-                target_handle=target["handle"],
-                language=language,
-                platform=platform,
-            )
+    keyboard = [[InlineKeyboardButton(UI["back"], callback_data="show_targets")]]
 
-        # Show loading message
-        await query.edit_message_text(
-            f"{UI['generating']}\n\nدر حال ساختن {len(selected)} پیام..."
-        )
+    await edit_message(
+        query,
+        "نام کاربری توییتر را وارد کنید:\n"
+        "(مثال: elonmusk یا @elonmusk)",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-        try:
-            # Generate messages for all targets
-            messages = []
-            for target in selected:
-                if platform == "instagram":
-                    message = generate_instagram_caption(target, language)
-                    instagram_handle = target.get("instagram", target["handle"])
-                    url = create_instagram_url(instagram_handle)
-                else:
-                    message = generate_tweet(target, language)
-                    url = create_twitter_intent_url(message)
-                messages.append({
-                    "target": target,
-                    "message": message,
-                    "url": url,
-                })
-
-            context.user_data["generated_messages"] = messages
-            context.user_data["current_message_index"] = 0
-
-            # Show first message
-            if platform == "instagram":
-                await show_instagram_message(query, context, 0)
-            else:
-                await show_message(query, context, 0)
 
-        except Exception as e:
-            logger.error(f"Error generating message: {e}")
-            await query.edit_message_text(
-                f"{UI['error']}\n\n{str(e)}",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]
-                ]),
-            )
+@callbacks.route("target_random")
+async def callback_target_random(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Random target selection."""
+    query = update.callback_query
+    await query.answer()
+    target = get_random_target()
+    if target:
+        add_target(context.user_data, target.handle)
 
-    # Navigate messages
-    elif data == "next_message":
-        await query.answer()
-        platform = context.user_data.get("platform", "twitter")
-        idx = context.user_data.get("current_message_index", 0) + 1
-        if platform == "instagram":
-            await show_instagram_message(query, context, idx)
-        else:
-            await show_message(query, context, idx)
+    # Go to language selection
+    await show_language_selection(query, context)
 
-    elif data == "prev_message":
-        await query.answer()
-        platform = context.user_data.get("platform", "twitter")
-        idx = context.user_data.get("current_message_index", 0) - 1
-        if platform == "instagram":
-            await show_instagram_message(query, context, idx)
-        else:
-            await show_message(query, context, idx)
-
-    # Regenerate current message
-    elif data == "regenerate_current":
-        await query.answer()
-        messages = context.user_data.get("generated_messages", [])
-        idx = context.user_data.get("current_message_index", 0)
-        language = context.user_data.get("language", "en")
-        platform = context.user_data.get("platform", "twitter")
-
-        if idx < len(messages):
-            target = messages[idx]["target"]
-            await query.edit_message_text(UI["generating"])
-
-            try:
-                if platform == "instagram":
-                    new_message = generate_instagram_caption(target, language)
-                    instagram_handle = target.get("instagram", target["handle"])
-                    new_url = create_instagram_url(instagram_handle)
-                else:
-                    new_message = generate_tweet(target, language)
-                    new_url = create_twitter_intent_url(new_message)
-                messages[idx]["message"] = new_message
-                messages[idx]["url"] = new_url
-                context.user_data["generated_messages"] = messages
-
-                if platform == "instagram":
-                    await show_instagram_message(query, context, idx)
-                else:
-                    await show_message(query, context, idx)
-            except Exception as e:
-                logger.error(f"Error regenerating: {e}")
-                if platform == "instagram":
-                    await show_instagram_message(query, context, idx)
-                else:
-                    await show_message(query, context, idx)
-
-    # Back to start
-    elif data == "back_to_start":
-        await query.answer()
-        context.user_data["state"] = STATE_NONE
-        context.user_data["selected_targets"] = []
 
-        keyboard = [
-            [InlineKeyboardButton(UI["jsn_button"], callback_data="jsn_email")],
-            [InlineKeyboardButton(UI["smart_reply_button"], callback_data="smart_reply")],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+@callbacks.route("continue_to_language")
+async def callback_continue_to_language(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Continue to language selection."""
+    query = update.callback_query
+    await query.answer()
 
-        await query.edit_message_text(
-            UI["welcome"] + "\n\n" + UI["select_platform"],
-            reply_markup=reply_markup,
-        )
+    if not selection_count(context.user_data):
+        await query.answer("لطفاً حداقل یک هدف انتخاب کنید", show_alert=True)
+        return
 
-    # Smart Reply - Ask user to send tweet
-    elif data == "smart_reply":
-        await query.answer()
-        context.user_data["state"] = STATE_WAITING_SMART_REPLY
-        context.user_data["smart_reply_rejected"] = []  # Reset rejected list
-        log_action(telegram_id=user.id, username=user.username, action="smart_reply_start", target_handle="")
+    await show_language_selection(query, context)
 
-        keyboard = [
-            [InlineKeyboardButton(UI["smart_reply_cancel"], callback_data="back_to_start")],
-        ]
 
-        await query.edit_message_text(
-            f"{UI['smart_reply_title']}\n\n{UI['smart_reply_instruction']}",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+@callbacks.prefix("lang_")
+async def callback_lang(update: Update, context: ContextTypes.DEFAULT_TYPE, language: str) -> None:
+    """Language selection - Generate messages."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    context.user_data["language"] = language
 
-    # Smart Reply - Regenerate (harsher)
-    elif data == "smart_reply_regen":
-        await query.answer("🔥 در حال ساختن نسخه تندتر...")
+    selected = get_selected_targets(context.user_data)
+    platform = context.user_data.get("platform", "twitter")
 
-        tweet_text = context.user_data.get("smart_reply_tweet", "")
-        username = context.user_data.get("smart_reply_username")
-        rejected = context.user_data.get("smart_reply_rejected", [])
+    if not selected:
+        await edit_message(query, UI["error"])
+        return
 
-        if not tweet_text:
-            await query.edit_message_text(
-                "❌ خطا: لطفاً دوباره شروع کنید.",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]]),
-            )
-            return
+    for target in selected:
+        log_action(
+            telegram_id=user.id,
+            username=user.username,
+            action="generate",
+            target_handle=target["handle"],
+            language=language,
+            platform=platform,
+        )
 
-        try:
-            # Generate new reply with rejected ones
-            reply = generate_smart_reply(tweet_text, username, rejected)
+    # Show loading message
+    await edit_message(
+        query,
+        f"{UI['generating']}\n\nدر حال ساختن {len(selected)} پیام..."
+    )
 
-            # Update rejected list
-            context.user_data["smart_reply_rejected"] = rejected + [reply]
-            context.user_data["smart_reply_current"] = reply
+    try:
+        # Generate messages for all targets
+        messages = []
+        for target in selected:
+            if platform == "instagram":
+                message = generate_instagram_caption(target, language)
+            else:
+                message = generate_tweet(target, language)
+            messages.append(GeneratedMessage(target.handle, message))
 
-            log_action(
-                telegram_id=user.id,
-                username=user.username,
-                action="smart_reply_regen",
-                target_handle=username or "unknown",
-            )
+        context.user_data["generated_messages"] = messages
+        context.user_data["current_message_index"] = 0
 
-            # Build message with all previous rejected replies
-            msg_text = f"{UI['smart_reply_title']}\n\n"
-            msg_text += f"📥 توییت اصلی:\n`{tweet_text[:150]}{'...' if len(tweet_text) > 150 else ''}`\n\n"
+        # Show first message
+        if platform == "instagram":
+            await show_instagram_message(query, context, 0)
+        else:
+            await show_message(query, context, 0)
+
+    except Exception as e:
+        logger.error(f"Error generating message: {e}")
+        await edit_message(
+            query,
+            f"{UI['error']}\n\n{str(e)}",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]
+            ]),
+        )
 
-            if len(rejected) > 0:
-                msg_text += "❌ رد شده‌ها:\n"
-                for i, rej in enumerate(rejected, 1):
-                    msg_text += f"{i}. ~{rej}~\n"
-                msg_text += "\n"
 
-            msg_text += f"✅ پیشنهاد جدید:\n`{reply}`\n\n"
-            msg_text += f"({len(reply)} کاراکتر)"
+@callbacks.route("next_message")
+async def callback_next_message(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Navigate messages - next."""
+    query = update.callback_query
+    await query.answer()
+    platform = context.user_data.get("platform", "twitter")
+    idx = context.user_data.get("current_message_index", 0) + 1
+    if platform == "instagram":
+        await show_instagram_message(query, context, idx)
+    else:
+        await show_message(query, context, idx)
 
-            keyboard = [
-                [InlineKeyboardButton("🔥 تند‌تر بزن!", callback_data="smart_reply_regen")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
 
-            await query.edit_message_text(
-                msg_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode="Markdown",
-            )
+@callbacks.route("prev_message")
+async def callback_prev_message(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Navigate messages - previous."""
+    query = update.callback_query
+    await query.answer()
+    platform = context.user_data.get("platform", "twitter")
+    idx = context.user_data.get("current_message_index", 0) - 1
+    if platform == "instagram":
+        await show_instagram_message(query, context, idx)
+    else:
+        await show_message(query, context, idx)
 
-        except Exception as e:
-            logger.error(f"Error regenerating smart reply: {e}")
-            await query.edit_message_text(
-                f"{UI['smart_reply_title']}\n\n❌ خطا: {str(e)}",
-                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]]),
-            )
 
-    # Yle Twitter Campaign - Show category selection
-    elif data == "yle_twitter":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="yle_twitter_start", target_handle="")
+@callbacks.route("regenerate_current")
+async def callback_regenerate_current(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Regenerate current message."""
+    query = update.callback_query
+    await query.answer()
+    messages = context.user_data.get("generated_messages", [])
+    idx = context.user_data.get("current_message_index", 0)
+    language = context.user_data.get("language", "en")
+    platform = context.user_data.get("platform", "twitter")
 
-        categories = UI["yle_twitter_categories"]
-        keyboard = [
-            [InlineKeyboardButton(categories["yle_journalists"], callback_data="yle_twitter_cat_yle_journalists")],
-            [InlineKeyboardButton(categories["finnish_leaders"], callback_data="yle_twitter_cat_finnish_leaders")],
-            [InlineKeyboardButton(categories["eu_officials"], callback_data="yle_twitter_cat_eu_officials")],
-            [InlineKeyboardButton(categories["hr_organizations"], callback_data="yle_twitter_cat_hr_organizations")],
-            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-        ]
+    if idx < len(messages):
+        target = message_target(messages[idx])
+        await edit_message(query, UI["generating"])
 
-        await query.edit_message_text(
-            f"{UI['yle_twitter_title']}\n\n"
-            f"{UI['yle_twitter_situation']}\n\n"
-            f"{UI['yle_twitter_select_category']}",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+        try:
+            if platform == "instagram":
+                new_message = generate_instagram_caption(target, language)
+            else:
+                new_message = generate_tweet(target, language)
+            messages[idx] = messages[idx]._replace(text=new_message)
 
-    # Yle Twitter Campaign - Show targets in category
-    elif data.startswith("yle_twitter_cat_"):
-        await query.answer()
-        category = data.replace("yle_twitter_cat_", "")
-        targets = get_yle_campaign_targets(category)
-
-        keyboard = []
-        for target in targets:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"@{target['handle']} - {target['name']}",
-                    callback_data=f"yle_twitter_target_{target['handle']}"
-                )
-            ])
-        keyboard.append([InlineKeyboardButton(UI["back"], callback_data="yle_twitter")])
-        keyboard.append([InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")])
-
-        await query.edit_message_text(
-            f"{UI['yle_twitter_title']}\n\n"
-            f"{UI['yle_twitter_select_target']}",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-        )
+            if platform == "instagram":
+                await show_instagram_message(query, context, idx)
+            else:
+                await show_message(query, context, idx)
+        except Exception as e:
+            logger.error(f"Error regenerating: {e}")
+            if platform == "instagram":
+                await show_instagram_message(query, context, idx)
+            else:
+                await show_message(query, context, idx)
 
-    # Yle Twitter Campaign - Generate tweet for target
-    elif data.startswith("yle_twitter_target_"):
-        await query.answer()
-        handle = data.replace("yle_twitter_target_", "")
-        target = get_yle_target_by_handle(handle)
 
-        if not target:
-            await query.edit_message_text("Target not found.")
-            return
+@callbacks.route("back_to_start")
+async def callback_back_to_start(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Back to start."""
+    query = update.callback_query
+    await query.answer()
+    context.user_data["state"] = STATE_NONE
+    clear_selection(context.user_data)
+
+    keyboard = [
+        [InlineKeyboardButton(UI["jsn_button"], callback_data="jsn_email")],
+        [InlineKeyboardButton(UI["smart_reply_button"], callback_data="smart_reply")],
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
 
-        category = target.get("category", "yle_journalists")
-        log_action(telegram_id=user.id, username=user.username, action="yle_twitter_generate", target_handle=handle)
+    await edit_message(
+        query,
+        UI["welcome"] + "\n\n" + UI["select_platform"],
+        reply_markup=reply_markup,
+    )
 
-        # Show generating message
-        await query.edit_message_text(
-            f"{UI['yle_twitter_title']}\n\n"
-            f"🎯 {target['name']} (@{target['handle']})\n\n"
-            f"{UI['yle_twitter_generating']}"
-        )
 
-        try:
-            from ai_generator import generate_yle_tweet
-            tweet = generate_yle_tweet(target, category)
+@callbacks.route("smart_reply")
+async def callback_smart_reply(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Smart Reply - Ask user to send tweet."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    context.user_data["state"] = STATE_WAITING_SMART_REPLY
+    context.user_data["smart_reply_rejected"] = []  # Reset rejected list
+    log_action(telegram_id=user.id, username=user.username, action="smart_reply_start", campaign="smart_reply")
 
-            # Create Twitter intent URL
-            tweet_url = create_twitter_intent_url(tweet)
+    keyboard = [
+        [InlineKeyboardButton(UI["smart_reply_cancel"], callback_data="back_to_start")],
+    ]
 
-            keyboard = [
-                [InlineKeyboardButton("🐦 بزن توییت", url=tweet_url)],
-                [InlineKeyboardButton(UI["back"], callback_data=f"yle_twitter_cat_{category}")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    await edit_message(
+        query,
+        f"{UI['smart_reply_title']}\n\n{UI['smart_reply_instruction']}",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-            lang_label = "🇫🇮 فنلاندی" if target.get("language") == "fi" else "🇬🇧 انگلیسی"
 
-            await query.edit_message_text(
-                f"{UI['yle_twitter_title']}\n\n"
-                f"🎯 {target['name']} (@{target['handle']})\n"
-                f"📝 زبان: {lang_label}\n\n"
-                f"پیش‌نمایش توییت:\n"
-                f"```\n{tweet}\n```\n\n"
-                f"({len(tweet)} کاراکتر)",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode="Markdown",
-            )
-        except Exception as e:
-            logger.error(f"Error generating Yle tweet: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data=f"yle_twitter_target_{handle}")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['yle_twitter_title']}\n\n"
-                f"❌ خطا در ساختن توییت. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+@callbacks.route("smart_reply_regen")
+async def callback_smart_reply_regen(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Smart Reply - Regenerate (harsher)."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer("🔥 در حال ساختن نسخه تندتر...")
 
-    # Yle Correction Email - Generate unique AI email
-    elif data == "yle_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="yle_email", target_handle=YLE_EMAIL_TO)
+    tweet_text = context.user_data.get("smart_reply_tweet", "")
+    username = context.user_data.get("smart_reply_username")
+    rejected = context.user_data.get("smart_reply_rejected", [])
 
-        # Show generating message
-        await query.edit_message_text(
-            f"{UI['yle_title']}\n\n"
-            f"{UI['yle_situation']}\n\n"
-            f"{UI['yle_generating']}"
+    if not tweet_text:
+        await edit_message(
+            query,
+            "❌ خطا: لطفاً دوباره شروع کنید.",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]]),
         )
+        return
 
-        try:
-            # Generate unique email using AI
-            from ai_generator import generate_yle_email
-            subject, body = generate_yle_email()
+    try:
+        # Generate new reply with rejected ones
+        reply = generate_smart_reply(tweet_text, username, rejected)
 
-            # Build URL with GitHub Pages redirect
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(YLE_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+        # Update rejected list
+        context.user_data["smart_reply_rejected"] = (rejected + [reply])[-SMART_REPLY_MAX_REJECTED:]
+        context.user_data["smart_reply_current"] = reply
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به Yle", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+        log_action(
+            telegram_id=user.id,
+            username=user.username,
+            action="smart_reply_regen",
+            target_handle=username or "unknown",
+        )
 
-            await query.edit_message_text(
-                f"{UI['yle_title']}\n\n"
-                f"{UI['yle_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Yle email: {e}")
-            # Fallback to static template
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(YLE_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(YLE_EMAIL_SUBJECT)
-            body_encoded = urllib.parse.quote_plus(YLE_EMAIL_BODY)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+        # Build message with all previous rejected replies
+        msg_text = f"{UI['smart_reply_title']}\n\n"
+        msg_text += f"📥 توییت اصلی:\n`{tweet_text[:150]}{'...' if len(tweet_text) > 150 else ''}`\n\n"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به Yle", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+        if len(rejected) > 0:
+            msg_text += "❌ رد شده‌ها:\n"
+            for i, rej in enumerate(rejected, 1):
+                msg_text += f"{i}. ~{rej}~\n"
+            msg_text += "\n"
 
-            await query.edit_message_text(
-                f"{UI['yle_title']}\n\n"
-                f"{UI['yle_email_explain']}\n\n"
-                "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+        msg_text += f"✅ پیشنهاد جدید:\n`{reply}`\n\n"
+        msg_text += f"({len(reply)} کاراکتر)"
 
-    # Finland Emergency - Generate unique AI email
-    elif data == "finland_emergency":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="emergency_email", target_handle=EMERGENCY_EMAIL_TO)
+        keyboard = [
+            [InlineKeyboardButton("🔥 تند‌تر بزن!", callback_data="smart_reply_regen")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-        # Show generating message
-        await query.edit_message_text(
-            f"{UI['finland_title']}\n\n"
-            f"{UI['finland_situation']}\n\n"
-            f"{UI['finland_generating']}"
+        await edit_message(
+            query,
+            msg_text,
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode="Markdown",
         )
 
-        try:
-            # Generate unique email using AI
-            subject, body = generate_finland_email()
+    except Exception as e:
+        logger.error(f"Error regenerating smart reply: {e}")
+        await edit_message(
+            query,
+            f"{UI['smart_reply_title']}\n\n❌ خطا: {str(e)}",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")]]),
+        )
 
-            # Build URL with GitHub Pages redirect
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(EMERGENCY_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+@callbacks.route("yle_twitter")
+async def callback_yle_twitter(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Yle Twitter Campaign - Show category selection."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="yle_twitter_start", campaign="yle_twitter")
 
-            await query.edit_message_text(
-                f"{UI['finland_title']}\n\n"
-                f"{UI['finland_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Finland email: {e}")
-            # Fallback to static template
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(EMERGENCY_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(EMERGENCY_EMAIL_SUBJECT)
-            body_encoded = urllib.parse.quote_plus(EMERGENCY_EMAIL_BODY)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+    categories = UI["yle_twitter_categories"]
+    keyboard = [
+        [InlineKeyboardButton(categories["yle_journalists"], callback_data="yle_twitter_cat_yle_journalists")],
+        [InlineKeyboardButton(categories["finnish_leaders"], callback_data="yle_twitter_cat_finnish_leaders")],
+        [InlineKeyboardButton(categories["eu_officials"], callback_data="yle_twitter_cat_eu_officials")],
+        [InlineKeyboardButton(categories["hr_organizations"], callback_data="yle_twitter_cat_hr_organizations")],
+        [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+    ]
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    await edit_message(
+        query,
+        f"{UI['yle_twitter_title']}\n\n"
+        f"{UI['yle_twitter_situation']}\n\n"
+        f"{UI['yle_twitter_select_category']}",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-            await query.edit_message_text(
-                f"{UI['finland_title']}\n\n"
-                f"{UI['finland_email_explain']}\n\n"
-                "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+
+@callbacks.prefix("yle_twitter_cat_")
+async def callback_yle_twitter_cat(update: Update, context: ContextTypes.DEFAULT_TYPE, category: str) -> None:
+    """Yle Twitter Campaign - Show targets in category."""
+    query = update.callback_query
+    await query.answer()
+    targets = get_yle_campaign_targets(category)
+
+    keyboard = []
+    for target in targets:
+        keyboard.append([
+            InlineKeyboardButton(
+                f"@{target['handle']} - {target['name']}",
+                callback_data=f"yle_twitter_target_{target['handle']}"
             )
+        ])
+    keyboard.append([InlineKeyboardButton(UI["back"], callback_data="yle_twitter")])
+    keyboard.append([InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")])
 
-    # Denmark Emergency - Generate unique AI email
-    elif data == "denmark_emergency":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="denmark_email", target_handle=DENMARK_EMAIL_TO)
+    await edit_message(
+        query,
+        f"{UI['yle_twitter_title']}\n\n"
+        f"{UI['yle_twitter_select_target']}",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-        # Show generating message
-        await query.edit_message_text(
-            f"{UI['denmark_title']}\n\n"
-            f"{UI['denmark_situation']}\n\n"
-            f"{UI['denmark_generating']}"
-        )
 
-        try:
-            # Generate unique email using AI
-            from ai_generator import generate_denmark_email
-            subject, body = generate_denmark_email()
+@callbacks.prefix("yle_twitter_target_")
+async def callback_yle_twitter_target(update: Update, context: ContextTypes.DEFAULT_TYPE, handle: str) -> None:
+    """Yle Twitter Campaign - Generate tweet for target."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    target = get_yle_target_by_handle(handle)
 
-            # Build URL with GitHub Pages redirect
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(DENMARK_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+    if not target:
+        await edit_message(query, "Target not found.")
+        return
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    category = target.get("category", "yle_journalists")
+    log_action(telegram_id=user.id, username=user.username, action="yle_twitter_generate", target_handle=handle)
 
-            await query.edit_message_text(
-                f"{UI['denmark_title']}\n\n"
-                f"{UI['denmark_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Denmark email: {e}")
-            # Fallback to static template
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(DENMARK_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(DENMARK_EMAIL_SUBJECT)
-            body_encoded = urllib.parse.quote_plus(DENMARK_EMAIL_BODY)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+    # Show generating message
+    await edit_message(
+        query,
+        f"{UI['yle_twitter_title']}\n\n"
+        f"🎯 {target['name']} (@{target['handle']})\n\n"
+        f"{UI['yle_twitter_generating']}"
+    )
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    try:
+        from ai_generator import generate_yle_tweet
+        tweet = generate_yle_tweet(target, category)
 
-            await query.edit_message_text(
-                f"{UI['denmark_title']}\n\n"
-                f"{UI['denmark_email_explain']}\n\n"
-                "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+        # Create Twitter intent URL
+        tweet_url = create_twitter_intent_url(tweet)
 
+        keyboard = [
+            [InlineKeyboardButton("🐦 بزن توییت", url=tweet_url)],
+            [InlineKeyboardButton(UI["back"], callback_data=f"yle_twitter_cat_{category}")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-    # Military Support Email Campaign
-    elif data == "military_support_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="military_support_start", target_handle="")
+        lang_label = "🇫🇮 فنلاندی" if target.get("language") == "fi" else "🇬🇧 انگلیسی"
 
-        await query.edit_message_text(
-            f"{UI['military_support_title']}\n\n"
-            f"{UI['military_support_situation']}\n\n"
-            f"{UI['military_support_generating']}"
+        await edit_message(
+            query,
+            f"{UI['yle_twitter_title']}\n\n"
+            f"🎯 {target['name']} (@{target['handle']})\n"
+            f"📝 زبان: {lang_label}\n\n"
+            f"پیش‌نمایش توییت:\n"
+            f"```\n{tweet}\n```\n\n"
+            f"({len(tweet)} کاراکتر)",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode="Markdown",
+        )
+    except Exception as e:
+        logger.error(f"Error generating Yle tweet: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data=f"yle_twitter_target_{handle}")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['yle_twitter_title']}\n\n"
+            f"❌ خطا در ساختن توییت. لطفاً دوباره تلاش کنید.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-        try:
-            from ai_generator import generate_military_support_email
-            subject, body = generate_military_support_email()
-
-            log_action(telegram_id=user.id, username=user.username, action="military_support_email", target_handle=FINLAND_EMBASSY_EMAIL_TO, language="en")
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(FINLAND_EMBASSY_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+@callbacks.route("yle_email")
+async def callback_yle_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Yle Correction Email - Generate unique AI email."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="yle_email", campaign="yle_email")
+
+    # Show generating message
+    await edit_message(
+        query,
+        f"{UI['yle_title']}\n\n"
+        f"{UI['yle_situation']}\n\n"
+        f"{UI['yle_generating']}"
+    )
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه و پارلمان فنلاند", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    try:
+        # Generate unique email using AI
+        from ai_generator import generate_yle_email
+        subject, body = generate_yle_email()
 
-            await query.edit_message_text(
-                f"{UI['military_support_title']}\n\n"
-                f"{UI['military_support_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating military support email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="military_support_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['military_support_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+        # Build URL with GitHub Pages redirect
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(YLE_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-    # Finland Embassy Closure Email Campaign
-    elif data == "finland_embassy_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="finland_embassy_start", target_handle="")
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به Yle", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-        await query.edit_message_text(
-            f"{UI['finland_embassy_title']}\n\n"
-            f"{UI['finland_embassy_situation']}\n\n"
-            f"{UI['finland_embassy_generating']}"
+        await edit_message(
+            query,
+            f"{UI['yle_title']}\n\n"
+            f"{UI['yle_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
         )
+    except Exception as e:
+        logger.error(f"Error generating Yle email: {e}")
+        # Fallback to static template
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(YLE_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(YLE_EMAIL_SUBJECT)
+        body_encoded = urllib.parse.quote_plus(YLE_EMAIL_BODY)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-        try:
-            from ai_generator import generate_finland_embassy_email
-            subject, body = generate_finland_embassy_email()
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به Yle", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-            log_action(telegram_id=user.id, username=user.username, action="finland_embassy_email", target_handle=FINLAND_EMBASSY_EMAIL_TO, language="fi")
+        await edit_message(
+            query,
+            f"{UI['yle_title']}\n\n"
+            f"{UI['yle_email_explain']}\n\n"
+            "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(FINLAND_EMBASSY_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه و پارلمان فنلاند", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+@callbacks.route("finland_emergency")
+async def callback_finland_emergency(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Finland Emergency - Generate unique AI email."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="emergency_email", campaign="finland_emergency")
+
+    # Show generating message
+    await edit_message(
+        query,
+        f"{UI['finland_title']}\n\n"
+        f"{UI['finland_situation']}\n\n"
+        f"{UI['finland_generating']}"
+    )
 
-            await query.edit_message_text(
-                f"{UI['finland_embassy_title']}\n\n"
-                f"{UI['finland_embassy_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Finland embassy email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="finland_embassy_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['finland_embassy_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+    try:
+        # Generate unique email using AI
+        subject, body = generate_finland_email()
 
-    # White House Energy Infrastructure Email Campaign
-    elif data == "whitehouse_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="whitehouse_start", target_handle="")
+        # Build URL with GitHub Pages redirect
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(EMERGENCY_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-        await query.edit_message_text(
-            f"{UI['whitehouse_title']}\n\n"
-            f"{UI['whitehouse_situation']}\n\n"
-            f"{UI['whitehouse_generating']}"
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+
+        await edit_message(
+            query,
+            f"{UI['finland_title']}\n\n"
+            f"{UI['finland_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
         )
+    except Exception as e:
+        logger.error(f"Error generating Finland email: {e}")
+        # Fallback to static template
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(EMERGENCY_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(EMERGENCY_EMAIL_SUBJECT)
+        body_encoded = urllib.parse.quote_plus(EMERGENCY_EMAIL_BODY)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-        try:
-            from ai_generator import generate_whitehouse_email
-            subject, body = generate_whitehouse_email()
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-            log_action(telegram_id=user.id, username=user.username, action="whitehouse_email", target_handle=WHITEHOUSE_EMAIL_TO, language="en")
+        await edit_message(
+            query,
+            f"{UI['finland_title']}\n\n"
+            f"{UI['finland_email_explain']}\n\n"
+            "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(WHITEHOUSE_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به کاخ سفید", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+@callbacks.route("denmark_emergency")
+async def callback_denmark_emergency(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Denmark Emergency - Generate unique AI email."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="denmark_email", campaign="denmark")
+
+    # Show generating message
+    await edit_message(
+        query,
+        f"{UI['denmark_title']}\n\n"
+        f"{UI['denmark_situation']}\n\n"
+        f"{UI['denmark_generating']}"
+    )
 
-            await query.edit_message_text(
-                f"{UI['whitehouse_title']}\n\n"
-                f"{UI['whitehouse_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating White House email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="whitehouse_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['whitehouse_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+    try:
+        # Generate unique email using AI
+        from ai_generator import generate_denmark_email
+        subject, body = generate_denmark_email()
 
-    # JSN (Finnish Council for Mass Media) Email Campaign
-    elif data == "jsn_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="jsn_start", target_handle="")
+        # Build URL with GitHub Pages redirect
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(DENMARK_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-        await query.edit_message_text(
-            f"{UI['jsn_title']}\n\n"
-            f"{UI['jsn_situation']}\n\n"
-            f"{UI['jsn_generating']}"
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+
+        await edit_message(
+            query,
+            f"{UI['denmark_title']}\n\n"
+            f"{UI['denmark_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
         )
+    except Exception as e:
+        logger.error(f"Error generating Denmark email: {e}")
+        # Fallback to static template
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(DENMARK_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(DENMARK_EMAIL_SUBJECT)
+        body_encoded = urllib.parse.quote_plus(DENMARK_EMAIL_BODY)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-        try:
-            from ai_generator import generate_jsn_email
-            subject, body = generate_jsn_email()
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+
+        await edit_message(
+            query,
+            f"{UI['denmark_title']}\n\n"
+            f"{UI['denmark_email_explain']}\n\n"
+            "✅ ایمیل آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
 
-            log_action(telegram_id=user.id, username=user.username, action="jsn_email", target_handle=JSN_EMAIL_TO, language="fi")
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(JSN_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+@callbacks.route("military_support_email")
+async def callback_military_support_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Military Support Email Campaign."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="military_support_start", campaign="military_support")
+
+    await edit_message(
+        query,
+        f"{UI['military_support_title']}\n\n"
+        f"{UI['military_support_situation']}\n\n"
+        f"{UI['military_support_generating']}"
+    )
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به JSN", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    try:
+        from ai_generator import generate_military_support_email
+        subject, body = generate_military_support_email()
 
-            await query.edit_message_text(
-                f"{UI['jsn_title']}\n\n"
-                f"{UI['jsn_email_explain']}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating JSN email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="jsn_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['jsn_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+        log_action(telegram_id=user.id, username=user.username, action="military_support_email", campaign="military_support", language="en")
 
-    # Sciences Po Campaign - Show language selection
-    elif data == "sciencespo_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="sciencespo_start", target_handle="")
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(FINLAND_EMBASSY_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
         keyboard = [
-            [InlineKeyboardButton("🇬🇧 English", callback_data="sciencespo_lang_en")],
-            [InlineKeyboardButton("🇫🇷 Français", callback_data="sciencespo_lang_fr")],
+            [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه و پارلمان فنلاند", url=email_page_url)],
             [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
         ]
 
-        await query.edit_message_text(
-            f"{UI['sciencespo_title']}\n\n"
-            f"{UI['sciencespo_situation']}\n\n"
-            f"{UI['sciencespo_select_language']}",
+        await edit_message(
+            query,
+            f"{UI['military_support_title']}\n\n"
+            f"{UI['military_support_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating military support email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="military_support_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['military_support_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
             reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-    # Sciences Po Campaign - Generate email in selected language
-    elif data.startswith("sciencespo_lang_"):
-        await query.answer()
-        language = data.replace("sciencespo_lang_", "")
-        log_action(telegram_id=user.id, username=user.username, action="sciencespo_email", target_handle=SCIENCESPO_EMAIL_TO, language=language)
 
-        await query.edit_message_text(
-            f"{UI['sciencespo_title']}\n\n"
-            f"{UI['sciencespo_generating']}"
-        )
+@callbacks.route("finland_embassy_email")
+async def callback_finland_embassy_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Finland Embassy Closure Email Campaign."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="finland_embassy_start", campaign="finland_embassy")
+
+    await edit_message(
+        query,
+        f"{UI['finland_embassy_title']}\n\n"
+        f"{UI['finland_embassy_situation']}\n\n"
+        f"{UI['finland_embassy_generating']}"
+    )
 
-        try:
-            from ai_generator import generate_sciencespo_email
-            subject, body = generate_sciencespo_email(language)
+    try:
+        from ai_generator import generate_finland_embassy_email
+        subject, body = generate_finland_embassy_email()
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(SCIENCESPO_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+        log_action(telegram_id=user.id, username=user.username, action="finland_embassy_email", campaign="finland_embassy", language="fi")
 
-            lang_label = "🇫🇷 فرانسوی" if language == "fr" else "🇬🇧 انگلیسی"
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(FINLAND_EMBASSY_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به Sciences Po", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه و پارلمان فنلاند", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-            await query.edit_message_text(
-                f"{UI['sciencespo_title']}\n\n"
-                f"{UI['sciencespo_email_explain']}\n\n"
-                f"📝 زبان: {lang_label}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Sciences Po email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="sciencespo_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['sciencespo_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+        await edit_message(
+            query,
+            f"{UI['finland_embassy_title']}\n\n"
+            f"{UI['finland_embassy_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating Finland embassy email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="finland_embassy_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['finland_embassy_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
 
-    # France Foreign Ministry Email Campaign - Show language selection
-    elif data == "france_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="france_email_start", target_handle="")
+
+@callbacks.route("whitehouse_email")
+async def callback_whitehouse_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """White House Energy Infrastructure Email Campaign."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="whitehouse_start", campaign="whitehouse")
+
+    await edit_message(
+        query,
+        f"{UI['whitehouse_title']}\n\n"
+        f"{UI['whitehouse_situation']}\n\n"
+        f"{UI['whitehouse_generating']}"
+    )
+
+    try:
+        from ai_generator import generate_whitehouse_email
+        subject, body = generate_whitehouse_email()
+
+        log_action(telegram_id=user.id, username=user.username, action="whitehouse_email", campaign="whitehouse", language="en")
+
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(WHITEHOUSE_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
         keyboard = [
-            [InlineKeyboardButton("🇬🇧 English", callback_data="france_lang_en")],
-            [InlineKeyboardButton("🇫🇷 Français", callback_data="france_lang_fr")],
+            [InlineKeyboardButton("📧 ارسال ایمیل به کاخ سفید", url=email_page_url)],
             [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
         ]
 
-        await query.edit_message_text(
-            f"{UI['france_title']}\n\n"
-            f"{UI['france_situation']}\n\n"
-            "زبان ایمیل را انتخاب کنید:",
+        await edit_message(
+            query,
+            f"{UI['whitehouse_title']}\n\n"
+            f"{UI['whitehouse_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating White House email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="whitehouse_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['whitehouse_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
             reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-    # France Foreign Ministry - Generate email in selected language
-    elif data.startswith("france_lang_"):
-        await query.answer()
-        language = data.replace("france_lang_", "")
-        log_action(telegram_id=user.id, username=user.username, action="france_email", target_handle=FRANCE_EMAIL_TO, language=language)
 
-        await query.edit_message_text(
-            f"{UI['france_title']}\n\n"
-            f"{UI['france_generating']}"
+@callbacks.route("jsn_email")
+async def callback_jsn_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """JSN (Finnish Council for Mass Media) Email Campaign."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="jsn_start", campaign="jsn")
+
+    await edit_message(
+        query,
+        f"{UI['jsn_title']}\n\n"
+        f"{UI['jsn_situation']}\n\n"
+        f"{UI['jsn_generating']}"
+    )
+
+    try:
+        from ai_generator import generate_jsn_email
+        subject, body = generate_jsn_email()
+
+        log_action(telegram_id=user.id, username=user.username, action="jsn_email", campaign="jsn", language="fi")
+
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(JSN_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به JSN", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+
+        await edit_message(
+            query,
+            f"{UI['jsn_title']}\n\n"
+            f"{UI['jsn_email_explain']}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating JSN email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="jsn_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['jsn_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-        try:
-            from ai_generator import generate_france_email
-            subject, body = generate_france_email(language)
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(FRANCE_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+@callbacks.route("sciencespo_email")
+async def callback_sciencespo_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Sciences Po Campaign - Show language selection."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="sciencespo_start", campaign="sciencespo")
 
-            lang_label = "🇫🇷 فرانسوی" if language == "fr" else "🇬🇧 انگلیسی"
+    keyboard = [
+        [InlineKeyboardButton("🇬🇧 English", callback_data="sciencespo_lang_en")],
+        [InlineKeyboardButton("🇫🇷 Français", callback_data="sciencespo_lang_fr")],
+        [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+    ]
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه فرانسه", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+    await edit_message(
+        query,
+        f"{UI['sciencespo_title']}\n\n"
+        f"{UI['sciencespo_situation']}\n\n"
+        f"{UI['sciencespo_select_language']}",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-            await query.edit_message_text(
-                f"{UI['france_title']}\n\n"
-                f"{UI['france_email_explain']}\n\n"
-                f"📝 زبان: {lang_label}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating France email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="france_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['france_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
 
-    # Spain Foreign Ministry Email Campaign - Show language selection
-    elif data == "spain_email":
-        await query.answer()
-        log_action(telegram_id=user.id, username=user.username, action="spain_email_start", target_handle="")
+@callbacks.prefix("sciencespo_lang_")
+async def callback_sciencespo_lang(update: Update, context: ContextTypes.DEFAULT_TYPE, language: str) -> None:
+    """Sciences Po Campaign - Generate email in selected language."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="sciencespo_email", campaign="sciencespo", language=language)
+
+    await edit_message(
+        query,
+        f"{UI['sciencespo_title']}\n\n"
+        f"{UI['sciencespo_generating']}"
+    )
+
+    try:
+        from ai_generator import generate_sciencespo_email
+        subject, body = generate_sciencespo_email(language)
+
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(SCIENCESPO_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+
+        lang_label = "🇫🇷 فرانسوی" if language == "fr" else "🇬🇧 انگلیسی"
 
         keyboard = [
-            [InlineKeyboardButton("🇬🇧 English", callback_data="spain_lang_en")],
-            [InlineKeyboardButton("🇪🇸 Español", callback_data="spain_lang_es")],
+            [InlineKeyboardButton("📧 ارسال ایمیل به Sciences Po", url=email_page_url)],
             [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
         ]
 
-        await query.edit_message_text(
-            f"{UI['spain_title']}\n\n"
-            f"{UI['spain_situation']}\n\n"
-            "زبان ایمیل را انتخاب کنید:",
+        await edit_message(
+            query,
+            f"{UI['sciencespo_title']}\n\n"
+            f"{UI['sciencespo_email_explain']}\n\n"
+            f"📝 زبان: {lang_label}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating Sciences Po email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="sciencespo_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['sciencespo_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
             reply_markup=InlineKeyboardMarkup(keyboard),
         )
 
-    # Spain Foreign Ministry - Generate email in selected language
-    elif data.startswith("spain_lang_"):
-        await query.answer()
-        language = data.replace("spain_lang_", "")
-        log_action(telegram_id=user.id, username=user.username, action="spain_email", target_handle=SPAIN_EMAIL_TO, language=language)
 
-        await query.edit_message_text(
-            f"{UI['spain_title']}\n\n"
-            f"{UI['spain_generating']}"
-        )
+@callbacks.route("france_email")
+async def callback_france_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """France Foreign Ministry Email Campaign - Show language selection."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="france_email_start", campaign="france")
 
-        try:
-            from ai_generator import generate_spain_email
-            subject, body = generate_spain_email(language)
+    keyboard = [
+        [InlineKeyboardButton("🇬🇧 English", callback_data="france_lang_en")],
+        [InlineKeyboardButton("🇫🇷 Français", callback_data="france_lang_fr")],
+        [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+    ]
 
-            email_page_base = "https://aliemam.github.io/voice-for-iran/"
-            bcc_encoded = urllib.parse.quote(SPAIN_EMAIL_TO, safe='')
-            sub_encoded = urllib.parse.quote_plus(subject)
-            body_encoded = urllib.parse.quote_plus(body)
-            email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+    await edit_message(
+        query,
+        f"{UI['france_title']}\n\n"
+        f"{UI['france_situation']}\n\n"
+        "زبان ایمیل را انتخاب کنید:",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-            lang_label = "🇪🇸 اسپانیایی" if language == "es" else "🇬🇧 انگلیسی"
 
-            keyboard = [
-                [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه اسپانیا", url=email_page_url)],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
+@callbacks.prefix("france_lang_")
+async def callback_france_lang(update: Update, context: ContextTypes.DEFAULT_TYPE, language: str) -> None:
+    """France Foreign Ministry - Generate email in selected language."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="france_email", campaign="france", language=language)
 
-            await query.edit_message_text(
-                f"{UI['spain_title']}\n\n"
-                f"{UI['spain_email_explain']}\n\n"
-                f"📝 زبان: {lang_label}\n\n"
-                "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
-        except Exception as e:
-            logger.error(f"Error generating Spain email: {e}")
-            keyboard = [
-                [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="spain_email")],
-                [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
-            ]
-            await query.edit_message_text(
-                f"{UI['spain_title']}\n\n"
-                f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-            )
+    await edit_message(
+        query,
+        f"{UI['france_title']}\n\n"
+        f"{UI['france_generating']}"
+    )
 
+    try:
+        from ai_generator import generate_france_email
+        subject, body = generate_france_email(language)
 
-async def show_target_selection(query, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Shows the target selection screen."""
-    platform = context.user_data.get("platform", "twitter")
-    selected = context.user_data.get("selected_targets", [])
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(FRANCE_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
 
-    # Get targets based on platform
-    if platform == "instagram":
-        targets = get_targets_with_instagram()
-    else:
-        targets = get_all_targets()
+        lang_label = "🇫🇷 فرانسوی" if language == "fr" else "🇬🇧 انگلیسی"
 
-    keyboard = []
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه فرانسه", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
 
-    # Custom handle option (Twitter only)
-    if platform == "twitter":
-        keyboard.append([
-            InlineKeyboardButton(
-                "✏️ وارد کردن نام کاربری دلخواه",
-                callback_data="enter_custom"
-            )
-        ])
+        await edit_message(
+            query,
+            f"{UI['france_title']}\n\n"
+            f"{UI['france_email_explain']}\n\n"
+            f"📝 زبان: {lang_label}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating France email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="france_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['france_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
 
-    # Show all targets with selection indicator and Persian description
-    for target in targets:
-        is_selected = any(t["handle"] == target["handle"] for t in selected)
-        prefix = "✅ " if is_selected else ""
 
-        # Show appropriate handle based on platform
-        if platform == "instagram":
-            display_handle = target.get("instagram", target["handle"])
-        else:
-            display_handle = target["handle"]
+@callbacks.route("spain_email")
+async def callback_spain_email(update: Update, context: ContextTypes.DEFAULT_TYPE, arg: str) -> None:
+    """Spain Foreign Ministry Email Campaign - Show language selection."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="spain_email_start", campaign="spain")
 
-        # Include Persian description
-        desc_fa = target.get("description_fa", "")
-        button_text = f"{prefix}{target['name']}\n{desc_fa}"
+    keyboard = [
+        [InlineKeyboardButton("🇬🇧 English", callback_data="spain_lang_en")],
+        [InlineKeyboardButton("🇪🇸 Español", callback_data="spain_lang_es")],
+        [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+    ]
 
-        keyboard.append([
-            InlineKeyboardButton(
-                button_text,
-                callback_data=f"toggle_{target['handle']}"
-            )
-        ])
+    await edit_message(
+        query,
+        f"{UI['spain_title']}\n\n"
+        f"{UI['spain_situation']}\n\n"
+        "زبان ایمیل را انتخاب کنید:",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+    )
 
-    # If targets selected, show continue button
-    if selected:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"✅ ادامه با {len(selected)} هدف انتخاب شده",
-                callback_data="continue_to_language"
-            )
-        ])
 
-    keyboard.append([InlineKeyboardButton(UI["back"], callback_data="back_to_start")])
+@callbacks.prefix("spain_lang_")
+async def callback_spain_lang(update: Update, context: ContextTypes.DEFAULT_TYPE, language: str) -> None:
+    """Spain Foreign Ministry - Generate email in selected language."""
+    query = update.callback_query
+    user = update.effective_user
+    await query.answer()
+    log_action(telegram_id=user.id, username=user.username, action="spain_email", campaign="spain", language=language)
+
+    await edit_message(
+        query,
+        f"{UI['spain_title']}\n\n"
+        f"{UI['spain_generating']}"
+    )
+
+    try:
+        from ai_generator import generate_spain_email
+        subject, body = generate_spain_email(language)
+
+        email_page_base = "https://aliemam.github.io/voice-for-iran/"
+        bcc_encoded = urllib.parse.quote(SPAIN_EMAIL_TO, safe='')
+        sub_encoded = urllib.parse.quote_plus(subject)
+        body_encoded = urllib.parse.quote_plus(body)
+        email_page_url = f"{email_page_base}?to=&bcc={bcc_encoded}&sub={sub_encoded}&body={body_encoded}"
+
+        lang_label = "🇪🇸 اسپانیایی" if language == "es" else "🇬🇧 انگلیسی"
+
+        keyboard = [
+            [InlineKeyboardButton("📧 ارسال ایمیل به وزارت خارجه اسپانیا", url=email_page_url)],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+
+        await edit_message(
+            query,
+            f"{UI['spain_title']}\n\n"
+            f"{UI['spain_email_explain']}\n\n"
+            f"📝 زبان: {lang_label}\n\n"
+            "✅ ایمیل منحصربه‌فرد آماده است! روی دکمه زیر کلیک کنید:",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+    except Exception as e:
+        logger.error(f"Error generating Spain email: {e}")
+        keyboard = [
+            [InlineKeyboardButton("🔄 تلاش مجدد", callback_data="spain_email")],
+            [InlineKeyboardButton(UI["start_over"], callback_data="back_to_start")],
+        ]
+        await edit_message(
+            query,
+            f"{UI['spain_title']}\n\n"
+            f"❌ خطا در ساختن ایمیل. لطفاً دوباره تلاش کنید.",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+        )
+
+
+async def show_target_selection(query, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows the target selection screen (the page the user was last on)."""
+    platform = context.user_data.get("platform", "twitter")
+    selected_count = selection_count(context.user_data)
+
+    reply_markup, page, category = target_keyboard(
+        platform,
+        context.user_data.get("target_page", 0),
+        get_selected_ids(context.user_data),
+        selected_count,
+    )
+    context.user_data["target_page"] = page
 
+    category_text = f"\n\n{category}" if category else ""
     selected_text = ""
-    if selected:
-        selected_text = f"\n\n✅ انتخاب شده: {len(selected)} هدف"
+    if selected_count:
+        selected_text = f"\n\n✅ انتخاب شده: {selected_count} هدف"
 
-    await query.edit_message_text(
-        UI["select_target"] + "\n(می‌توانید چند هدف انتخاب کنید)" + selected_text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+    await edit_message(
+        query,
+        UI["select_target"] + "\n(می‌توانید چند هدف انتخاب کنید)" + category_text + selected_text,
+        reply_markup=reply_markup,
     )
 
 
 async def show_language_selection(query, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Shows the language selection screen."""
-    selected = context.user_data.get("selected_targets", [])
+    selected = get_selected_targets(context.user_data)
     platform = context.user_data.get("platform", "twitter")
 
     keyboard = []
@@ -1313,7 +1535,8 @@ async def show_language_selection(query, context: ContextTypes.DEFAULT_TYPE) ->
     else:
         targets_list = ", ".join([f"@{t['handle']}" for t in selected])
 
-    await query.edit_message_text(
+    await edit_message(
+        query,
         f"اهداف: {targets_list}\n\n{UI['select_language']}",
         reply_markup=InlineKeyboardMarkup(keyboard),
     )
@@ -1331,9 +1554,9 @@ async def show_message(query, context: ContextTypes.DEFAULT_TYPE, index: int) ->
     context.user_data["current_message_index"] = index
 
     msg = messages[index]
-    target = msg["target"]
-    message = msg["message"]
-    tweet_url = msg["url"]
+    target = message_target(msg)
+    message = msg.text
+    tweet_url = create_twitter_intent_url(message)
 
     keyboard = []
 
@@ -1357,7 +1580,8 @@ async def show_message(query, context: ContextTypes.DEFAULT_TYPE, index: int) ->
     target_name = target.get("name", f"@{target['handle']}")
     target_desc = target.get("description_fa", "")
 
-    await query.edit_message_text(
+    await edit_message(
+        query,
         f"برای {target_name}:\n{target_desc}\n\n"
         f"{UI['tweet_preview']}\n\n"
         f"```\n{message}\n```\n\n"
@@ -1380,10 +1604,10 @@ async def show_instagram_message(query, context: ContextTypes.DEFAULT_TYPE, inde
     context.user_data["current_message_index"] = index
 
     msg = messages[index]
-    target = msg["target"]
-    message = msg["message"]
-    instagram_url = msg["url"]
+    target = message_target(msg)
+    message = msg.text
     instagram_handle = target.get("instagram", target["handle"])
+    instagram_url = create_instagram_url(instagram_handle)
 
     keyboard = []
 
@@ -1407,7 +1631,8 @@ async def show_instagram_message(query, context: ContextTypes.DEFAULT_TYPE, inde
     target_name = target.get("name", f"@{instagram_handle}")
     target_desc = target.get("description_fa", "")
 
-    await query.edit_message_text(
+    await edit_message(
+        query,
         f"برای {target_name}:\n{target_desc}\n\n"
         f"{UI['instagram_preview']}\n\n{message}\n\n({len(message)} کاراکتر)\n\n"
         f"{UI['copy_instruction']}",
@@ -1434,26 +1659,204 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 هر پیام منحصر به فرد است و توسط هوش مصنوعی ساخته می‌شود.
 """
-    await update.message.reply_text(help_text)
+    await reply_text(update.message, help_text)
+
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles the /stats command (admins only)."""
+    user = update.effective_user
+    if user is None or user.id not in ADMIN_IDS:
+        return
+
+    try:
+        stats, age = await stats_cache.get()
+    except Exception as e:
+        logger.error(f"Error getting stats: {e}")
+        await reply_text(update.message, UI["error"])
+        return
+
+    await reply_text(update.message, format_stats(stats, age))
+
+
+def format_broadcast(broadcast: dict) -> str:
+    """Formats a broadcast's counters, plus rate and ETA if it is being sent, for /broadcast."""
+    lines = [
+        f"📢 Broadcast #{broadcast['id']}: {broadcast['status']}",
+        f"✅ {broadcast['sent']} sent, 🚫 {broadcast['blocked']} blocked, ⚠️ {broadcast['failed']} failed",
+    ]
+    runner = get_runner()
+    if runner is not None and runner.broadcast_id == broadcast["id"]:
+        progress = runner.progress()
+        eta = f"{progress['eta'] / 60:.0f} min" if progress["eta"] is not None else "?"
+        lines.append(f"⏩ {progress['rate']:.1f} msg/s, {progress['left']} left, ETA {eta}")
+    return "\n".join(lines)
+
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handles /broadcast (admins only).
+
+    "/broadcast <message>" sends the message to every user; "/broadcast"
+    alone shows the progress of the latest broadcast.
+    """
+    user = update.effective_user
+    if user is None or user.id not in ADMIN_IDS:
+        return
+
+    parts = update.message.text.split(maxsplit=1)
+    try:
+        if len(parts) > 1:
+            runner = await start_broadcast(context.bot, parts[1])
+            await reply_text(update.message, f"📢 Broadcast #{runner.broadcast_id} started")
+            return
+        broadcast = await asyncio.to_thread(get_broadcast)
+    except ValueError as e:
+        await reply_text(update.message, f"⚠️ {e}")
+        return
+    except Exception as e:
+        logger.error(f"Error handling /broadcast: {e}")
+        await reply_text(update.message, UI["error"])
+        return
+
+    await reply_text(update.message, format_broadcast(broadcast) if broadcast else "📢 No broadcasts yet")
+
+
+async def broadcast_stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles /broadcast_stop (admins only): cancels the broadcast being sent."""
+    user = update.effective_user
+    if user is None or user.id not in ADMIN_IDS:
+        return
+
+    try:
+        stopped = await stop_broadcast()
+    except Exception as e:
+        logger.error(f"Error stopping broadcast: {e}")
+        await reply_text(update.message, UI["error"])
+        return
+    await reply_text(update.message, "📢 Broadcast stopped" if stopped else "📢 No broadcast is being sent")
+
+
+async def track_session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Before any handler runs: tags log records with the update id and marks
+    the user's session as used, restoring it if it was spilled.
+    """
+    set_update_id(update.update_id)
+    if update.effective_user:
+        get_session_manager().touch(update.effective_user.id, context.user_data)
+
+
+async def measure_session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Records the size of the user's session after the handlers have run."""
+    if update.effective_user:
+        get_session_manager().measure(update.effective_user.id, context.user_data)
+
+
+def _http_version() -> str:
+    if not BOT_HTTP2:
+        return "1.1"
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("BOT_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        return "1.1"
+    return "2"
+
+
+def build_request(pool_size: int, read_timeout: float) -> HTTPXRequest:
+    """
+    Creates a Bot API request object with the configured pool, timeouts and HTTP version.
+
+    Args:
+        pool_size: Maximum connections (all kept alive when idle)
+        read_timeout: Seconds to wait for a response
+
+    Returns:
+        The request object to pass to ApplicationBuilder
+    """
+    return HTTPXRequest(
+        connection_pool_size=pool_size,
+        connect_timeout=BOT_CONNECT_TIMEOUT,
+        read_timeout=read_timeout,
+        write_timeout=BOT_WRITE_TIMEOUT,
+        pool_timeout=BOT_POOL_TIMEOUT,
+        http_version=_http_version(),
+        # Replaces the limits HTTPXRequest builds from connection_pool_size,
+        # to keep idle connections longer than httpx's 5s default
+        httpx_kwargs={
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=BOT_KEEPALIVE_SECONDS,
+            )
+        },
+    )
+
+
+async def warm_up_connections(application: Application, count: int = BOT_WARMUP_CONNECTIONS) -> None:
+    """Opens up to count pooled connections to the Bot API with concurrent getMe calls."""
+    start = time.monotonic()
+    results = await asyncio.gather(*(application.bot.get_me() for _ in range(count)), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, Exception)]
+    if failed:
+        logger.error(f"Error warming up Bot API connections: {failed[0]}")
+    else:
+        logger.info(f"Warmed up {count} Bot API connections in {time.monotonic() - start:.2f}s")
+
+
+async def post_init(application: Application) -> None:
+    """Starts background tasks once the event loop is running."""
+    application.bot_data["session_sweeper"] = asyncio.create_task(run_session_sweeper(application))
+    if BOT_WARMUP_CONNECTIONS > 0:
+        await warm_up_connections(application)
+    await resume_broadcasts(application.bot)
+
+
+async def post_shutdown(application: Application) -> None:
+    """Stops background tasks."""
+    stop_sending()
+    sweeper = application.bot_data.pop("session_sweeper", None)
+    if sweeper:
+        sweeper.cancel()
 
 
 def main() -> None:
     """Main function to run the bot."""
     # Initialize database
     init_db()
+    start_snapshot_thread()
+
+    # Open Anthropic API connections now rather than on the first user's request
+    get_generator().warm_up()
 
     # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(build_request(BOT_POOL_SIZE, BOT_READ_TIMEOUT))
+        # get_updates adds the long-poll timeout to this read timeout itself
+        .get_updates_request(build_request(1, BOT_READ_TIMEOUT))
+        .concurrent_updates(BOT_CONCURRENT_UPDATES if BOT_CONCURRENT_UPDATES > 1 else False)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
-    # Add handlers
+    # Add handlers; session tracking runs in the groups before and after them
+    application.add_handler(TypeHandler(Update, track_session), group=-1)
+    application.add_handler(TypeHandler(Update, measure_session), group=1)
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("broadcast_stop", broadcast_stop_command))
     application.add_handler(CallbackQueryHandler(handle_callback))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
 
     # Run the bot
     logger.info("Starting Voice for Iran bot...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    application.run_polling(allowed_updates=Update.ALL_TYPES, timeout=BOT_POLL_TIMEOUT)
+
+    # Keep the last minute of distinct-user sketches across restarts
+    checkpoint_sketches()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""
+Admin broadcasts to everyone who has used the bot.
+
+Recipients are read from the users table a page (BROADCAST_BATCH_SIZE) at
+a time, in telegram_id order, and sent through outbound.py's low-priority
+lane: as fast as the global rate allows while leaving room for replies to
+interactive users, and slowing down on RetryAfter. After each page the
+position and counters are checkpointed to the broadcasts table, so a
+broadcast interrupted by a restart resumes where it stopped (a page may be
+sent twice if the bot crashes mid-page). Users who have blocked the bot
+are recorded and skipped by later broadcasts.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+
+from telegram.error import BadRequest, Forbidden
+
+from config import BROADCAST_BATCH_SIZE
+from db import (
+    count_broadcast_recipients,
+    create_broadcast,
+    get_broadcast,
+    get_broadcast_recipients,
+    get_running_broadcasts,
+    save_broadcast_progress,
+    set_broadcast_status,
+)
+from outbound import outbound
+
+logger = logging.getLogger(__name__)
+
+
+def _unreachable(error: Exception) -> bool:
+    """Returns whether a send failed because the user can no longer be messaged."""
+    if isinstance(error, Forbidden):
+        # Bot blocked, user deactivated
+        return True
+    return isinstance(error, BadRequest) and "chat not found" in str(error).lower()
+
+
+class BroadcastRunner:
+    """Sends one broadcast, resuming from its checkpoint, and tracks this run's progress."""
+
+    def __init__(self, broadcast_id: int, bot, batch_size: int = BROADCAST_BATCH_SIZE):
+        self.broadcast_id = broadcast_id
+        self.bot = bot
+        self.batch_size = batch_size
+        self.task = None
+        self.started = time.monotonic()
+        # Recipients left when this run started, and handled since
+        self.remaining = None
+        self.processed = 0
+
+    async def run(self) -> None:
+        """Sends to every remaining recipient and marks the broadcast done."""
+        broadcast = await asyncio.to_thread(get_broadcast, self.broadcast_id)
+        text = broadcast["text"]
+        cursor = broadcast["last_telegram_id"]
+        self.remaining = await asyncio.to_thread(count_broadcast_recipients, cursor)
+        self.started = time.monotonic()
+        logger.info(f"Broadcast {self.broadcast_id}: sending to {self.remaining} users")
+
+        while True:
+            recipients = await asyncio.to_thread(get_broadcast_recipients, cursor, self.batch_size)
+            if not recipients:
+                break
+
+            results = await asyncio.gather(
+                *(
+                    outbound.submit(
+                        telegram_id,
+                        functools.partial(self.bot.send_message, chat_id=telegram_id, text=text),
+                        low_priority=True,
+                    )
+                    for telegram_id in recipients
+                ),
+                return_exceptions=True,
+            )
+
+            sent, failed, blocked = 0, 0, []
+            for telegram_id, result in zip(recipients, results):
+                if not isinstance(result, Exception):
+                    sent += 1
+                elif _unreachable(result):
+                    blocked.append(telegram_id)
+                else:
+                    failed += 1
+                    logger.error(f"Broadcast {self.broadcast_id}: error sending to {telegram_id}: {result}")
+
+            cursor = recipients[-1]
+            await asyncio.to_thread(save_broadcast_progress, self.broadcast_id, cursor, sent, failed, blocked)
+            self.processed += len(recipients)
+
+        await asyncio.to_thread(set_broadcast_status, self.broadcast_id, "done")
+        logger.info(f"Broadcast {self.broadcast_id}: done in {time.monotonic() - self.started:.0f}s")
+
+    def progress(self) -> dict:
+        """Returns recipients handled and left in this run, messages per second and ETA in seconds."""
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        left = max(0, (self.remaining or 0) - self.processed)
+        return {
+            "processed": self.processed,
+            "left": left,
+            "rate": rate,
+            "eta": left / rate if rate else None,
+        }
+
+
+_runner = None
+
+
+def get_runner():
+    """Returns the runner of the broadcast being sent, or None."""
+    if _runner is not None and _runner.task is not None and not _runner.task.done():
+        return _runner
+    return None
+
+
+def _start(broadcast_id: int, bot) -> BroadcastRunner:
+    global _runner
+    _runner = BroadcastRunner(broadcast_id, bot)
+    _runner.task = asyncio.create_task(_run_logged(_runner))
+    return _runner
+
+
+async def _run_logged(runner: BroadcastRunner) -> None:
+    try:
+        await runner.run()
+    except asyncio.CancelledError:
+        # Left 'running' unless stop_broadcast() cancelled it, so it resumes on restart
+        raise
+    except Exception as e:
+        logger.error(f"Broadcast {runner.broadcast_id} stopped: {e}")
+
+
+async def start_broadcast(bot, text: str) -> BroadcastRunner:
+    """
+    Records a new broadcast and starts sending it in the background.
+
+    Args:
+        bot: The telegram Bot to send with
+        text: Message to send to every user
+
+    Returns:
+        The runner sending it
+
+    Raises:
+        ValueError: If a broadcast is already being sent
+    """
+    if get_runner() is not None:
+        raise ValueError("a broadcast is already being sent")
+    broadcast_id = await asyncio.to_thread(create_broadcast, text)
+    return _start(broadcast_id, bot)
+
+
+async def resume_broadcasts(bot) -> None:
+    """Resumes the broadcast that was being sent when the bot stopped, if any."""
+    running = await asyncio.to_thread(get_running_broadcasts)
+    # Only one is sent at a time; older ones left running are abandoned
+    for broadcast_id in running[:-1]:
+        await asyncio.to_thread(set_broadcast_status, broadcast_id, "cancelled")
+    if running:
+        logger.info(f"Resuming broadcast {running[-1]}")
+        _start(running[-1], bot)
+
+
+async def stop_broadcast() -> bool:
+    """Cancels the broadcast being sent; returns False if there is none."""
+    runner = get_runner()
+    if runner is None:
+        return False
+    runner.task.cancel()
+    await asyncio.to_thread(set_broadcast_status, runner.broadcast_id, "cancelled")
+    return True
+
+
+def stop_sending() -> None:
+    """Stops sending on shutdown without cancelling the broadcast, so it resumes on restart."""
+    runner = get_runner()
+    if runner is not None:
+        runner.task.cancel()
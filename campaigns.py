@@ -0,0 +1,51 @@
+"""
+Email campaigns: who each one writes to and which logged actions belong to it.
+
+Kept apart from bot.py so db.init_db() (and scripts/setup_db.sh, which runs
+it without the bot) always registers the campaigns, including when it
+migrates an old usage_logs table.
+"""
+
+# Finland emergency - release of arrested protesters
+EMERGENCY_EMAIL_TO = "viestinta.helsinki@poliisi.fi,Kirjaamo.UM@gov.fi,elina.valtonen@gov.fi"
+
+# Denmark emergency - request for reconsideration and release
+DENMARK_EMAIL_TO = "udenrigsminister@um.dk,um@um.dk"
+
+# Yle correction - misleading article about Khamenei
+YLE_EMAIL_TO = "oikaisu.verkko@yle.fi,yleinfo@yle.fi,uutiset@yle.fi"
+
+# Finland Embassy Closure Email
+FINLAND_EMBASSY_EMAIL_TO = "ALA-02@gov.fi,ALA-03@gov.fi,int.dep@eduskunta.fi,anna.sorto@eduskunta.fi,kaisa.mannisto@eduskunta.fi,ALA-10@gov.fi,ALA-01@gov.fi"
+
+# Sciences Po (Kevan Gafaïti) Email
+SCIENCESPO_EMAIL_TO = "accueil.enseignant@sciencespo.fr,media@sciencespo.fr,webmestre@sciencespo.fr,info@sciencespo-alumni.fr,integrite.scientifique@sciencespo.fr,claudine.lamaze@sciencespo.fr,marina.abelskaiagraziani@sciencespo.fr,benedicte.barbe@sciencespo.fr,vincent.morandi@sciencespo.fr,elsa.bedos@sciencespo.fr,helene.naudet@sciencespo.fr"
+
+# White House Email
+WHITEHOUSE_EMAIL_TO = "comments@whitehouse.gov"
+
+# JSN (Julkisen sanan neuvosto - Finnish Council for Mass Media) Email
+JSN_EMAIL_TO = "Eero.Hyvonen@jsn.fi,Susan.Heikkinen@jsn.fi,Jukka.Hiiro@jsn.fi,Laura.Juntunen@jsn.fi"
+
+# France Foreign Ministry Email
+FRANCE_EMAIL_TO = "francois-xavier.bellamy@europarl.europa.eu,gregory.allione@europarl.europa.eu,mathilde.androuet@europarl.europa.eu,manon.aubry@europarl.europa.eu,jordan.bardella@europarl.europa.eu,nicolas.bay@europarl.europa.eu,christophe.bay@europarl.europa.eu,gilles.boyer@europarl.europa.eu,marie-luce.brasier-clain@europarl.europa.eu,melissa.camara@europarl.europa.eu,courrier.bruxelles-dfra@diplomatie.gouv.fr,presse.bruxelles-dfra@diplomatie.gouv.fr,mail.bruxelles-dfra@diplomatie.gouv.fr,rp.strasbourg-dfra@diplomatie.gouv.fr"
+
+# Spain Foreign Ministry Email
+SPAIN_EMAIL_TO = "esteban.gonzalezpons@europarl.europa.eu,maravillas.abadiajover@europarl.europa.eu,pablo.ariasecheverria@europarl.europa.eu,isabel.benjumea@europarl.europa.eu,pilar.delcastillo@europarl.europa.eu,mariacarmen.crespodiaz@europarl.europa.eu,raul.delahoz@europarl.europa.eu,rosa.estaras@europarl.europa.eu,alma.ezcurra@europarl.europa.eu,sandra.gomezlopez@europarl.europa.eu,javi.lopez@europarl.europa.eu,juanfernando.lopezaguilar@europarl.europa.eu,cesar.luena@europarl.europa.eu,cristina.maestre@europarl.europa.eu,idoia.mendia@europarl.europa.eu,javier.morenosanchez@europarl.europa.eu,marcos.rossempere@europarl.europa.eu,nacho.sanchezamor@europarl.europa.eu,emb.bruselas@maec.es,Secretaria.Emb@reper.maec.es,alicia.cocero@reper.maec.es,sergi.farre@reper.maec.es,juan.hernandez@reper.maec.es,marta.bardon@reper.maec.es,secretaria.erpa@reper.maec.es,victoria.ortega@reper.maec.es,Cops.Espana@reper.maec.es,Laura.martinez@reper.maec.es,Asis.barrera@reper.maec.es,Nuno.santos@reper.maec.es,Antonio.leton@reper.maec.es,comunicacion-pres@reper.maec.es,javier.molina@reper.maec.es,carlos.gomez@reper.maec.es,Ae.Cjur@reper.maec.es,mariajose.ruizsanchez@reper.maec.es,luis.aguilera@reper.maec.es,yago.fernandez@reper.maec.es,Parlamentoue@reper.maec.es,rossana.rosello@reper.maec.es,Unidadpresencia@reper.maec.es,elena.campos@reper.maec.es,leticia.lorenzo@reper.maec.es,cesar.pla@reper.maec.es,Coecad@reper.maec.es,cecilia.rocha@reper.maec.es,rocio.perezds@reper.maec.es,informae@maec.es,consular@maec.es,informacion.consular@maec.es,dg.cdpr@maec.es,prensa@maec.es,sg.cedpr@maec.es,dg.diplomaciaeconomica@maec.es,protocolo@maec.es,se.aex@maec.es,polext@maec.es,dg.mamop@maec.es,dg.nnuuddhh@maec.es"
+
+# Campaign registry: start/send actions as logged by handle_callback and the
+# recipient list, which is stored once in the campaigns table
+CAMPAIGNS = {
+    "jsn": {"actions": ("jsn_start", "jsn_email"), "recipients": JSN_EMAIL_TO},
+    "spain": {"actions": ("spain_email_start", "spain_email"), "recipients": SPAIN_EMAIL_TO},
+    "france": {"actions": ("france_email_start", "france_email"), "recipients": FRANCE_EMAIL_TO},
+    "sciencespo": {"actions": ("sciencespo_start", "sciencespo_email"), "recipients": SCIENCESPO_EMAIL_TO},
+    "whitehouse": {"actions": ("whitehouse_start", "whitehouse_email"), "recipients": WHITEHOUSE_EMAIL_TO},
+    "finland_embassy": {"actions": ("finland_embassy_start", "finland_embassy_email"), "recipients": FINLAND_EMBASSY_EMAIL_TO},
+    "military_support": {"actions": ("military_support_start", "military_support_email"), "recipients": FINLAND_EMBASSY_EMAIL_TO},
+    "yle_twitter": {"actions": ("yle_twitter_start", "yle_twitter_generate"), "recipients": None},
+    "yle_email": {"actions": (None, "yle_email"), "recipients": YLE_EMAIL_TO},
+    "denmark": {"actions": (None, "denmark_email"), "recipients": DENMARK_EMAIL_TO},
+    "finland_emergency": {"actions": (None, "emergency_email"), "recipients": EMERGENCY_EMAIL_TO},
+    "smart_reply": {"actions": ("smart_reply_start", "smart_reply_generate"), "recipients": None},
+}
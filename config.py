@@ -6,13 +6,104 @@ load_dotenv()
 # Telegram
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Admins allowed to use /stats and /broadcast (comma-separated Telegram IDs)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_TELEGRAM_IDS", "").split(",") if i.strip()}
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "30"))  # seconds
+
 # Anthropic
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL")  # e.g. scripts/fake_anthropic.py; unset = the real API
 CLAUDE_MODEL = "claude-haiku-4-5-20251001"
 CLAUDE_MODEL_SMART = "claude-haiku-4-5-20251001"  # Same cheap Haiku — text-gen task doesn't need Opus
+# Anthropic API HTTP connections, shared by every generation call
+ANTHROPIC_POOL_SIZE = int(os.getenv("ANTHROPIC_POOL_SIZE", "10"))
+ANTHROPIC_KEEPALIVE_SECONDS = float(os.getenv("ANTHROPIC_KEEPALIVE_SECONDS", "120"))  # idle pooled connections are kept this long
+ANTHROPIC_CONNECT_TIMEOUT = float(os.getenv("ANTHROPIC_CONNECT_TIMEOUT", "5"))
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "60"))  # per request, reading the response included
+ANTHROPIC_HTTP2 = os.getenv("ANTHROPIC_HTTP2", "false").lower() in ("1", "true", "yes")  # needs the h2 package
+ANTHROPIC_WARMUP_CONNECTIONS = int(os.getenv("ANTHROPIC_WARMUP_CONNECTIONS", "2"))  # opened at startup
 
 # Database
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "usage.db")
+DB_READER_POOL_SIZE = int(os.getenv("DB_READER_POOL_SIZE", "4"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))  # per connection
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "128"))
+
+# Retention - usage_logs rows older than this are moved to ARCHIVE_DIR
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "90"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+ARCHIVE_DIR = os.path.join(os.path.dirname(DB_PATH), "archive")
+
+# Distinct-user sketches (HyperLogLog) per campaign per minute
+SKETCH_PRECISION = int(os.getenv("SKETCH_PRECISION", "10"))  # 2^10 registers = 1 KB, ~3.25% std error
+SKETCH_MEMORY_MINUTES = int(os.getenv("SKETCH_MEMORY_MINUTES", "120"))  # kept in memory, older ones in SQLite
+SKETCH_CHECKPOINT_SECONDS = int(os.getenv("SKETCH_CHECKPOINT_SECONDS", "60"))
+# Checkpointed minute sketches older than this are merged into hourly ones,
+# and hourly ones older than SKETCH_HOURLY_DAYS into daily ones (retention.py)
+SKETCH_MINUTE_HOURS = int(os.getenv("SKETCH_MINUTE_HOURS", "24"))
+SKETCH_HOURLY_DAYS = int(os.getenv("SKETCH_HOURLY_DAYS", "30"))
+
+# Read-only copy of the database that reports and scripts read from
+SNAPSHOT_PATH = os.path.join(os.path.dirname(DB_PATH), "analytics.db")
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", "300"))  # seconds; 0 = reports read the live database
+SNAPSHOT_PAGES_PER_STEP = int(os.getenv("SNAPSHOT_PAGES_PER_STEP", "256"))
+
+# Cohort bitmaps - usage_events rows folded in per transaction
+COHORT_BATCH_SIZE = int(os.getenv("COHORT_BATCH_SIZE", "5000"))
+
+# Targets data file; edits are picked up without a restart
+TARGETS_PATH = os.path.join(os.path.dirname(DB_PATH), "targets.json")
+TARGETS_RELOAD_SECONDS = float(os.getenv("TARGETS_RELOAD_SECONDS", "5"))  # how often its mtime is checked
+
+# Per-user sessions (context.user_data): idle ones and the least recently
+# used ones beyond the memory ceiling are dropped, or spilled to disk and
+# restored on the user's next interaction
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", str(6 * 3600)))  # seconds
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_SWEEP_SECONDS = int(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+SESSION_SPILL = os.getenv("SESSION_SPILL", "false").lower() in ("1", "true", "yes")
+SESSION_SPILL_DIR = os.path.join(os.path.dirname(DB_PATH), "sessions")
+SESSION_SPILL_DAYS = int(os.getenv("SESSION_SPILL_DAYS", "30"))  # spilled sessions older than this are deleted
+SMART_REPLY_MAX_REJECTED = int(os.getenv("SMART_REPLY_MAX_REJECTED", "10"))  # earlier replies kept per session
+
+# Target selection keyboard - targets per page (Telegram allows 100 buttons per keyboard)
+TARGETS_PAGE_SIZE = int(os.getenv("TARGETS_PAGE_SIZE", "8"))
+
+# Hashes of the last text/keyboard sent per message, to skip identical edits
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "50000"))
+
+# Telegram Bot API HTTP connections. Outbound calls (sends, edits, answers)
+# and long polling for updates use separate pools
+BOT_POOL_SIZE = int(os.getenv("BOT_POOL_SIZE", "16"))
+BOT_KEEPALIVE_SECONDS = float(os.getenv("BOT_KEEPALIVE_SECONDS", "60"))  # idle pooled connections are kept this long
+BOT_CONNECT_TIMEOUT = float(os.getenv("BOT_CONNECT_TIMEOUT", "5"))
+BOT_READ_TIMEOUT = float(os.getenv("BOT_READ_TIMEOUT", "10"))
+BOT_WRITE_TIMEOUT = float(os.getenv("BOT_WRITE_TIMEOUT", "10"))
+BOT_POOL_TIMEOUT = float(os.getenv("BOT_POOL_TIMEOUT", "5"))  # wait for a free connection
+BOT_HTTP2 = os.getenv("BOT_HTTP2", "false").lower() in ("1", "true", "yes")  # needs the h2 package
+BOT_POLL_TIMEOUT = int(os.getenv("BOT_POLL_TIMEOUT", "30"))  # getUpdates long-poll seconds
+BOT_WARMUP_CONNECTIONS = int(os.getenv("BOT_WARMUP_CONNECTIONS", "4"))  # opened at startup
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "1"))  # 1 = one update at a time
+
+# Outbound Telegram calls - Telegram allows about 30 messages/s overall and
+# about 1/s per chat; edits and sends wait for a slot rather than fail
+OUTBOUND_GLOBAL_PER_SECOND = float(os.getenv("OUTBOUND_GLOBAL_PER_SECOND", "25"))
+OUTBOUND_CHAT_PER_SECOND = float(os.getenv("OUTBOUND_CHAT_PER_SECOND", "1"))
+OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "3"))  # calls a chat may make back to back
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+OUTBOUND_INTERACTIVE_RESERVE = float(os.getenv("OUTBOUND_INTERACTIVE_RESERVE", "5"))  # global slots broadcasts leave free
+
+# Broadcasts - recipients are read and progress checkpointed this many at a time
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+
+# Logging - written by a background thread; repeated identical warnings and
+# errors within LOG_DEDUP_SECONDS are counted instead of logged again
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped
+LOG_DEDUP_SECONDS = float(os.getenv("LOG_DEDUP_SECONDS", "60"))
 
 # Supported output languages
 LANGUAGES = {
@@ -38,6 +129,10 @@ UI = {
     "select_platform": "لطفاً پلتفرم را انتخاب کنید:",
     "select_category": "چه کسی را می‌خواهید مخاطب قرار دهید؟",
     "select_target": "لطفاً یک هدف انتخاب کنید:",
+    "target_categories": {
+        "general": "📋 عمومی",
+        "trump_senator": "🇺🇸 سناتورهای نزدیک به ترامپ",
+    },
     "select_language": "پیام به چه زبانی نوشته شود؟",
     "generating": "در حال ساختن پیام منحصربه‌فرد...",
     "tweet_preview": "پیش‌نمایش توییت:",
@@ -210,4 +305,8 @@ https://x.com/i/status/2015762003592114510""",
     "smart_reply_generating": "🧠 در حال تحلیل و ساختن پاسخ هوشمند...",
     "smart_reply_preview": "پاسخ پیشنهادی:",
     "smart_reply_cancel": "لغو",
+
+    # Admin stats
+    "stats_title": "📊 آمار استفاده",
+    "stats_campaigns": "📣 کمپین‌ها (شروع ← ارسال):",
 }
@@ -2,48 +2,890 @@
 SQLite database handler for usage logging.
 """
 
+import logging
 import sqlite3
 import os
-from datetime import datetime
-from config import DB_PATH
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import (
+    DB_PATH,
+    DB_READER_POOL_SIZE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    SKETCH_CHECKPOINT_SECONDS,
+    SKETCH_HOURLY_DAYS,
+    SKETCH_MINUTE_HOURS,
+    COHORT_BATCH_SIZE,
+    SNAPSHOT_PATH,
+    SNAPSHOT_INTERVAL,
+    SNAPSHOT_PAGES_PER_STEP,
+)
+from bitmaps import RoaringBitmap
+from campaigns import CAMPAIGNS
+from sketches import HyperLogLog, SketchStore
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Keeps one writer connection and a small pool of reader connections open.
+
+    All connections run in WAL mode so readers never block the writer, and
+    each connection keeps its own prepared-statement cache for the lifetime
+    of the process instead of reconnecting on every call.
+    """
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = DB_READER_POOL_SIZE):
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._readers = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """Opens a new connection with the tuning pragmas applied."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        # Lets retention.py hand freed pages back to the OS without a full
+        # VACUUM. Must precede journal_mode, and only takes effect on new
+        # files (or after one full VACUUM).
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _get_writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._reader_lock:
+            if self._reader_count < self.pool_size:
+                self._reader_count += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect(readonly=True)
+            except Exception:
+                with self._reader_lock:
+                    self._reader_count -= 1
+                raise
+        return self._readers.get()
+
+    @contextmanager
+    def writer(self):
+        """Yields the shared writer connection inside a transaction."""
+        with self._write_lock:
+            conn = self._get_writer()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def reader(self):
+        """Yields a pooled read-only connection."""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            # Never hand a connection with an open read transaction back to the pool
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    def warm(self) -> None:
+        """Opens the writer and every reader up front, off the request path."""
+        with self._write_lock:
+            self._get_writer()
+        conns = [self._acquire_reader() for _ in range(self.pool_size)]
+        for conn in conns:
+            self._readers.put(conn)
+
+    def close(self) -> None:
+        """Closes all open connections."""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._reader_lock:
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._reader_count = 0
+
+
+# Singleton instance
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> ConnectionManager:
+    """Returns the singleton ConnectionManager instance."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager()
+    return _manager
 
 
 def get_connection():
-    """Returns a database connection."""
-    # Ensure data directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    """Returns a new tuned database connection for one-off use."""
+    return get_manager()._connect()
+
+
+def connect_readonly(path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    Opens a connection that SQLite itself refuses to write through.
+
+    Used by offline tools such as analytics.py: the file is opened with
+    mode=ro, so they can never take the write lock the bot needs, and no
+    schema or journal pragmas are issued.
+
+    Args:
+        path: Database file to open
+
+    Returns:
+        Read-only sqlite3 connection
+    """
+    conn = sqlite3.connect(
+        f"file:{path}?mode=ro",
+        uri=True,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+    )
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+# Analytics snapshot
+#
+# Reports read a periodic copy of the database (SNAPSHOT_PATH) instead of
+# the live file, so a heavy query can never hold up log_action().
+
+_snapshot_conn = None
+_snapshot_id = None
+_snapshot_lock = threading.Lock()
+
+
+def refresh_snapshot(path: str = SNAPSHOT_PATH, pages: int = SNAPSHOT_PAGES_PER_STEP) -> None:
+    """
+    Copies the live database to path with SQLite's online backup API.
+
+    The copy runs inside one read transaction on its own connection, so it
+    is a consistent point-in-time image and commits from the bot neither
+    wait for it nor restart it. Pages are copied in steps of `pages`, with a
+    short sleep in between, and the finished file replaces the previous
+    snapshot atomically.
+
+    Args:
+        path: Snapshot file to write
+        pages: Pages copied per backup step
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    source = get_manager()._connect(readonly=True)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        source.backup(target, pages=pages, sleep=0.005)
+        source.rollback()
+        # The copy inherits WAL mode; a plain rollback-journal file can be
+        # opened read-only without -wal/-shm side files
+        target.execute("PRAGMA journal_mode=DELETE")
+        target.close()
+        os.replace(tmp_path, path)
+    finally:
+        source.close()
+        target.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def start_snapshot_thread(interval: int = SNAPSHOT_INTERVAL):
+    """
+    Refreshes the snapshot every `interval` seconds in a daemon thread,
+    starting immediately.
+
+    Returns:
+        The started thread, or None when snapshots are disabled
+    """
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            try:
+                refresh_snapshot()
+            except Exception as e:
+                logger.error(f"Error refreshing analytics snapshot: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="db-snapshot", daemon=True)
+    thread.start()
+    return thread
+
+
+@contextmanager
+def _report_reader():
+    """
+    Yields a connection for reporting queries: the analytics snapshot when
+    snapshots are enabled and one exists, otherwise a live pooled reader.
+    """
+    if SNAPSHOT_INTERVAL <= 0 or not os.path.exists(SNAPSHOT_PATH):
+        with get_manager().reader() as conn:
+            yield conn
+        return
+
+    global _snapshot_conn, _snapshot_id
+    with _snapshot_lock:
+        # A refresh replaces the file, so a new inode means a new snapshot
+        stat = os.stat(SNAPSHOT_PATH)
+        snapshot_id = (stat.st_ino, stat.st_mtime_ns)
+        if _snapshot_conn is None or snapshot_id != _snapshot_id:
+            if _snapshot_conn is not None:
+                _snapshot_conn.close()
+            _snapshot_conn = connect_readonly(SNAPSHOT_PATH)
+            _snapshot_id = snapshot_id
+        yield _snapshot_conn
+
 
+# Lookup tables for repeated strings. Every table has (id, name); campaigns
+# additionally store their recipient list once instead of in every row.
+_LOOKUP_TABLES = ("actions", "targets", "target_categories", "languages", "platforms", "campaigns")
 
-def init_db():
-    """Initializes the database schema."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# name -> id caches, only touched while holding the writer lock
+_lookup_ids = {table: {} for table in _LOOKUP_TABLES}
+_campaign_by_action = {}
 
+# telegram_ids already in the users table, so log_action() can skip the
+# insert attempt and the new-user counter for returning users
+_known_users = set()
+
+# Per-minute HyperLogLog sketches of telegram_ids, keyed by campaign id
+# (0 = all users), checkpointed to user_sketches
+_sketches = SketchStore()
+_last_sketch_checkpoint = 0.0
+
+
+def _create_schema(cursor: sqlite3.Cursor) -> None:
+    for table in _LOOKUP_TABLES:
+        extra = "recipients TEXT," if table == "campaigns" else ""
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                {extra}
+                created_at INTEGER NOT NULL DEFAULT (strftime('%s', 'now'))
+            )
+        """)
+
+    # Which campaign an action belongs to, so log_action() can tag rows
+    # without every call site passing the campaign
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_actions (
+            action_id INTEGER PRIMARY KEY REFERENCES actions(id),
+            campaign_id INTEGER NOT NULL REFERENCES campaigns(id)
+        )
+    """)
+
+    # One row per user action; ts is a UTC unix epoch
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usage_logs (
+        CREATE TABLE IF NOT EXISTS usage_events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             telegram_id INTEGER NOT NULL,
             username TEXT,
+            action_id INTEGER NOT NULL REFERENCES actions(id),
+            target_id INTEGER REFERENCES targets(id),
+            category_id INTEGER REFERENCES target_categories(id),
+            campaign_id INTEGER REFERENCES campaigns(id),
+            language_id INTEGER REFERENCES languages(id),
+            platform_id INTEGER REFERENCES platforms(id),
+            ts INTEGER NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_telegram_id ON usage_events(telegram_id)
+    """)
+
+    # Covering indexes for the time-range and per-action helpers below
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_ts_action ON usage_events(ts, action_id)
+    """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_action_target ON usage_events(action_id, target_id)
+    """)
+
+    # Compatibility view with the original usage_logs columns, so ad-hoc
+    # queries and the shell scripts keep working
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS usage_logs AS
+        SELECT
+            usage_events.id AS id,
+            usage_events.telegram_id AS telegram_id,
+            usage_events.username AS username,
+            actions.name AS action,
+            targets.name AS target_handle,
+            target_categories.name AS target_category,
+            languages.name AS language,
+            platforms.name AS platform,
+            datetime(usage_events.ts, 'unixepoch') AS timestamp,
+            campaigns.name AS campaign,
+            usage_events.ts AS ts
+        FROM usage_events
+        JOIN actions ON actions.id = usage_events.action_id
+        LEFT JOIN targets ON targets.id = usage_events.target_id
+        LEFT JOIN target_categories ON target_categories.id = usage_events.category_id
+        LEFT JOIN languages ON languages.id = usage_events.language_id
+        LEFT JOIN platforms ON platforms.id = usage_events.platform_id
+        LEFT JOIN campaigns ON campaigns.id = usage_events.campaign_id
+    """)
+
+    # One row per user, maintained by log_action() so unique-user counts
+    # never need COUNT(DISTINCT) over usage_events
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            telegram_id INTEGER PRIMARY KEY,
+            first_seen INTEGER NOT NULL,
+            last_seen INTEGER NOT NULL,
+            last_language_id INTEGER REFERENCES languages(id),
+            action_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    # New users per UTC day ('YYYY-MM-DD'); the total is a sum over days
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users_daily_new (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    # Checkpointed HyperLogLog registers per campaign per minute
+    # (minute = epoch // 60, campaign_id 0 = all users)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sketches (
+            campaign_id INTEGER NOT NULL,
+            minute INTEGER NOT NULL,
+            registers BLOB NOT NULL,
+            PRIMARY KEY (campaign_id, minute)
+        ) WITHOUT ROWID
+    """)
+
+    # Older sketches merged by compact_sketches(): span is 60 (an hour) or
+    # 1440 (a UTC day) minutes starting at start_minute
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sketches_rollup (
+            campaign_id INTEGER NOT NULL,
+            span INTEGER NOT NULL,
+            start_minute INTEGER NOT NULL,
+            registers BLOB NOT NULL,
+            PRIMARY KEY (campaign_id, span, start_minute)
+        ) WITHOUT ROWID
+    """)
+
+    # Cohort store: users numbered densely so their bitmaps stay compact,
+    # one compressed bitmap per cohort name, and how far usage_events has
+    # been folded in
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cohort_users (
+            seq INTEGER PRIMARY KEY,
+            telegram_id INTEGER NOT NULL UNIQUE
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cohorts (
+            name TEXT PRIMARY KEY,
+            bitmap BLOB NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cohort_progress (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_event_id INTEGER NOT NULL
+        )
+    """)
+
+    # Pre-aggregated counters, maintained by log_action(). Missing
+    # dimensions are stored as '' so they take part in the primary key.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_rollup_hourly (
+            hour TEXT NOT NULL,
+            action TEXT NOT NULL,
+            target_handle TEXT NOT NULL DEFAULT '',
+            language TEXT NOT NULL DEFAULT '',
+            platform TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, action, target_handle, language, platform)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usage_rollup_totals (
             action TEXT NOT NULL,
-            target_handle TEXT,
-            target_category TEXT,
-            language TEXT,
-            platform TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            target_handle TEXT NOT NULL DEFAULT '',
+            language TEXT NOT NULL DEFAULT '',
+            platform TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (action, target_handle, language, platform)
+        ) WITHOUT ROWID
+    """)
+
+    # Admin broadcasts to past users. Recipients are read from users in
+    # telegram_id order; last_telegram_id is where a resumed broadcast
+    # continues, and the counters are cumulative over every run.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            created_at INTEGER NOT NULL,
+            finished_at INTEGER,
+            last_telegram_id INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0
         )
     """)
 
+    # Users a broadcast could not reach (bot blocked, account deleted);
+    # skipped by later broadcasts unless they have used the bot since
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS blocked_users (
+            telegram_id INTEGER PRIMARY KEY,
+            blocked_at INTEGER NOT NULL
+        )
+    """)
+
+
+def _migrate_legacy_logs(cursor: sqlite3.Cursor) -> None:
+    """
+    Converts the original flat usage_logs table (renamed to usage_logs_legacy)
+    into usage_events plus lookup tables, keeping row ids.
+
+    Rows whose target_handle holds an email recipient list are attached to
+    the campaign registered for their action; unregistered ones get a
+    campaign named after the action.
+    """
+    for table, column in (
+        ("actions", "action"),
+        ("target_categories", "target_category"),
+        ("languages", "language"),
+        ("platforms", "platform"),
+    ):
+        cursor.execute(
+            f"""
+            INSERT OR IGNORE INTO {table} (name)
+            SELECT DISTINCT {column} FROM usage_logs_legacy WHERE {column} != ''
+            """
+        )
+
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_telegram_id ON usage_logs(telegram_id)
+        INSERT OR IGNORE INTO targets (name)
+        SELECT DISTINCT target_handle FROM usage_logs_legacy
+        WHERE target_handle != '' AND instr(target_handle, '@') = 0
     """)
 
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON usage_logs(timestamp)
+        INSERT OR IGNORE INTO campaigns (name, recipients)
+        SELECT action, MAX(target_handle) FROM usage_logs_legacy
+        WHERE instr(target_handle, '@') > 0
+          AND action NOT IN (
+              SELECT actions.name FROM campaign_actions
+              JOIN actions ON actions.id = campaign_actions.action_id
+          )
+        GROUP BY action
+    """)
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO campaign_actions (action_id, campaign_id)
+        SELECT actions.id, campaigns.id FROM campaigns
+        JOIN actions ON actions.name = campaigns.name
+    """)
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO usage_events
+        (id, telegram_id, username, action_id, target_id, category_id, campaign_id, language_id, platform_id, ts)
+        SELECT
+            l.id, l.telegram_id, l.username, a.id, t.id, tc.id, ca.campaign_id, lg.id, p.id,
+            CAST(strftime('%s', COALESCE(l.timestamp, 'now')) AS INTEGER)
+        FROM usage_logs_legacy l
+        JOIN actions a ON a.name = l.action
+        LEFT JOIN targets t ON t.name = l.target_handle
+        LEFT JOIN target_categories tc ON tc.name = l.target_category
+        LEFT JOIN languages lg ON lg.name = l.language
+        LEFT JOIN platforms p ON p.name = l.platform
+        LEFT JOIN campaign_actions ca ON ca.action_id = a.id
+    """)
+
+    cursor.execute("DROP TABLE usage_logs_legacy")
+
+    # Recipient lists were also used as rollup keys; fold them into ''.
+    # The rollups may include rows already archived by retention.py, so they
+    # are rewritten in place rather than rebuilt from usage_events.
+    cursor.execute("""
+        INSERT INTO usage_rollup_hourly (hour, action, target_handle, language, platform, count)
+        SELECT hour, action, '', language, platform, SUM(count) FROM usage_rollup_hourly
+        WHERE instr(target_handle, '@') > 0
+        GROUP BY hour, action, language, platform
+        ON CONFLICT (hour, action, target_handle, language, platform)
+        DO UPDATE SET count = count + excluded.count
+    """)
+    cursor.execute("DELETE FROM usage_rollup_hourly WHERE instr(target_handle, '@') > 0")
+    cursor.execute("""
+        INSERT INTO usage_rollup_totals (action, target_handle, language, platform, count)
+        SELECT action, '', language, platform, SUM(count) FROM usage_rollup_totals
+        WHERE instr(target_handle, '@') > 0
+        GROUP BY action, language, platform
+        ON CONFLICT (action, target_handle, language, platform)
+        DO UPDATE SET count = count + excluded.count
+    """)
+    cursor.execute("DELETE FROM usage_rollup_totals WHERE instr(target_handle, '@') > 0")
+
+
+def _clear_lookup_cache(campaigns: bool = True) -> None:
+    """Drops cached lookup ids, e.g. after a rolled-back transaction."""
+    for ids in _lookup_ids.values():
+        ids.clear()
+    if campaigns:
+        _campaign_by_action.clear()
+
+
+def _load_campaign_actions(conn: sqlite3.Connection) -> None:
+    _campaign_by_action.clear()
+    rows = conn.execute("""
+        SELECT actions.name, campaign_actions.campaign_id FROM campaign_actions
+        JOIN actions ON actions.id = campaign_actions.action_id
     """)
+    _campaign_by_action.update(rows.fetchall())
+
+
+def _lookup_id(conn: sqlite3.Connection, table: str, name: str):
+    """Returns the id for a lookup value, inserting it on first use."""
+    if not name:
+        return None
+    ids = _lookup_ids[table]
+    lookup_id = ids.get(name)
+    if lookup_id is None:
+        conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+        lookup_id = conn.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        ids[name] = lookup_id
+    return lookup_id
+
+
+def _register_campaign(conn: sqlite3.Connection, name: str, recipients: str = None, actions: tuple = ()) -> None:
+    conn.execute(
+        """
+        INSERT INTO campaigns (name, recipients) VALUES (?, ?)
+        ON CONFLICT (name) DO UPDATE SET recipients = excluded.recipients
+        """,
+        (name, recipients),
+    )
+    campaign_id = _lookup_id(conn, "campaigns", name)
+    for action in actions:
+        if not action:
+            continue
+        conn.execute(
+            """
+            INSERT INTO campaign_actions (action_id, campaign_id) VALUES (?, ?)
+            ON CONFLICT (action_id) DO UPDATE SET campaign_id = excluded.campaign_id
+            """,
+            (_lookup_id(conn, "actions", action), campaign_id),
+        )
+        _campaign_by_action[action] = campaign_id
 
-    conn.commit()
-    conn.close()
+
+def register_campaign(name: str, recipients: str = None, actions: tuple = ()) -> None:
+    """
+    Creates or updates a campaign.
+
+    Args:
+        name: Campaign key (e.g. "jsn")
+        recipients: Comma-separated email recipients, stored once
+        actions: Action names that belong to this campaign; log_action()
+                 tags rows with these actions with the campaign
+    """
+    try:
+        with get_manager().writer() as conn:
+            _register_campaign(conn, name, recipients, actions)
+    except Exception:
+        _clear_lookup_cache()
+        raise
+
+
+def get_campaigns() -> dict:
+    """Returns {campaign name: [action names]} for all registered campaigns."""
+    with get_manager().reader() as conn:
+        rows = conn.execute("""
+            SELECT campaigns.name, actions.name FROM campaigns
+            LEFT JOIN campaign_actions ON campaign_actions.campaign_id = campaigns.id
+            LEFT JOIN actions ON actions.id = campaign_actions.action_id
+            ORDER BY campaigns.id, actions.id
+        """).fetchall()
+
+    campaigns = {}
+    for campaign, action in rows:
+        campaigns.setdefault(campaign, [])
+        if action:
+            campaigns[campaign].append(action)
+    return campaigns
+
+
+def _reattach_campaign_events(cursor: sqlite3.Cursor) -> None:
+    """
+    Moves rows left under a campaign named after their action onto the
+    campaign the action is registered to.
+
+    Databases migrated before the registry was known (e.g. by an older
+    setup_db.sh) got one such campaign per email action, and NULL campaigns
+    for start actions; registering the real campaigns afterwards did not
+    move those rows. Cheap to check when there is nothing to repair.
+    """
+    stale = [
+        row[0]
+        for row in cursor.execute("""
+            SELECT campaigns.id FROM campaigns
+            JOIN actions ON actions.name = campaigns.name
+            JOIN campaign_actions ON campaign_actions.action_id = actions.id
+            WHERE campaign_actions.campaign_id != campaigns.id
+        """)
+    ]
+    if not stale:
+        return
+
+    placeholders = ", ".join("?" * len(stale))
+    cursor.execute(
+        f"""
+        UPDATE usage_events
+        SET campaign_id = (
+            SELECT campaign_id FROM campaign_actions WHERE action_id = usage_events.action_id
+        )
+        WHERE action_id IN (SELECT action_id FROM campaign_actions)
+          AND (campaign_id IS NULL OR campaign_id IN ({placeholders}))
+        """,
+        stale,
+    )
+    cursor.execute(
+        f"""
+        DELETE FROM campaigns
+        WHERE id IN ({placeholders})
+          AND id NOT IN (SELECT campaign_id FROM campaign_actions)
+          AND id NOT IN (SELECT campaign_id FROM user_sketches)
+          AND id NOT IN (SELECT campaign_id FROM user_sketches_rollup)
+        """,
+        stale,
+    )
+    _clear_lookup_cache()
+    logger.info(f"Moved events of {len(stale)} action-named campaigns onto their registered campaigns")
+
+
+def init_db(campaigns: dict = None):
+    """
+    Initializes the database schema, migrating the original flat usage_logs
+    table if one is found.
+
+    Args:
+        campaigns: {name: {"recipients": str, "actions": tuple}} registry to
+                   register before migrating old rows; defaults to
+                   campaigns.CAMPAIGNS
+    """
+    manager = get_manager()
+    _clear_lookup_cache()
+    if campaigns is None:
+        campaigns = CAMPAIGNS
+
+    try:
+        with manager.writer() as conn:
+            cursor = conn.cursor()
+            # DDL, migration and backfill commit (or roll back) together
+            cursor.execute("BEGIN IMMEDIATE")
+
+            existing = cursor.execute(
+                "SELECT type FROM sqlite_master WHERE name = 'usage_logs'"
+            ).fetchone()
+            if existing and existing[0] == "table":
+                cursor.execute("ALTER TABLE usage_logs RENAME TO usage_logs_legacy")
+
+            _create_schema(cursor)
+
+            for name, campaign in campaigns.items():
+                _register_campaign(conn, name, campaign.get("recipients"), campaign.get("actions", ()))
+
+            legacy = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'usage_logs_legacy'"
+            ).fetchone()
+            if legacy:
+                _migrate_legacy_logs(cursor)
+                _clear_lookup_cache()
+            _reattach_campaign_events(cursor)
+
+            # Backfill rollups for databases created before they existed
+            has_rollups = cursor.execute("SELECT 1 FROM usage_rollup_totals LIMIT 1").fetchone()
+            has_events = cursor.execute("SELECT 1 FROM usage_events LIMIT 1").fetchone()
+            if has_events and not has_rollups:
+                _rebuild_rollups(conn)
+
+            # Same for the users table
+            has_users = cursor.execute("SELECT 1 FROM users LIMIT 1").fetchone()
+            if has_events and not has_users:
+                _rebuild_users(conn)
+
+            _load_campaign_actions(conn)
+            _known_users.clear()
+            _known_users.update(row[0] for row in cursor.execute("SELECT telegram_id FROM users"))
+
+            # Resume the in-memory sketch window where the last run left off
+            rows = cursor.execute(
+                "SELECT campaign_id, minute, registers FROM user_sketches WHERE minute >= ?",
+                (_sketches.oldest_minute(int(time.time())),),
+            )
+            for campaign_id, minute, registers in rows:
+                _sketches.load(campaign_id, minute, registers)
+    except Exception:
+        _clear_lookup_cache()
+        raise
+
+    manager.warm()
+
+
+def _rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Recomputes both rollup tables from usage_logs on the given connection."""
+    conn.execute("DELETE FROM usage_rollup_hourly")
+    conn.execute("DELETE FROM usage_rollup_totals")
+    conn.execute(
+        """
+        INSERT INTO usage_rollup_hourly (hour, action, target_handle, language, platform, count)
+        SELECT strftime('%Y-%m-%d %H:00:00', ts, 'unixepoch'), action,
+               COALESCE(target_handle, ''), COALESCE(language, ''), COALESCE(platform, ''),
+               COUNT(*)
+        FROM usage_logs
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO usage_rollup_totals (action, target_handle, language, platform, count)
+        SELECT action, target_handle, language, platform, SUM(count)
+        FROM usage_rollup_hourly
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+
+def rebuild_rollups() -> None:
+    """
+    Recomputes the rollup tables from the raw usage_logs.
+
+    Only needed to repair the counters (e.g. after rows were edited by hand);
+    log_action() keeps them current on every write. Rows already moved out
+    by retention.py are not counted after a rebuild.
+    """
+    with get_manager().writer() as conn:
+        _rebuild_rollups(conn)
+
+
+def _rebuild_users(conn: sqlite3.Connection) -> None:
+    """Recomputes users and users_daily_new from usage_events on the given connection."""
+    conn.execute("DELETE FROM users")
+    conn.execute("DELETE FROM users_daily_new")
+    conn.execute(
+        """
+        INSERT INTO users (telegram_id, first_seen, last_seen, last_language_id, action_count)
+        SELECT
+            telegram_id, MIN(ts), MAX(ts),
+            (SELECT language_id FROM usage_events AS latest
+             WHERE latest.telegram_id = usage_events.telegram_id AND latest.language_id IS NOT NULL
+             ORDER BY latest.id DESC LIMIT 1),
+            COUNT(*)
+        FROM usage_events
+        GROUP BY telegram_id
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO users_daily_new (day, count)
+        SELECT date(first_seen, 'unixepoch'), COUNT(*) FROM users
+        GROUP BY 1
+        """
+    )
+
+
+_TOUCH_USER_SQL = """
+    UPDATE users SET last_seen = ?, action_count = action_count + 1,
+        last_language_id = COALESCE(?, last_language_id)
+    WHERE telegram_id = ?
+"""
+
+
+def _record_user(conn: sqlite3.Connection, telegram_id: int, language_id, ts: int) -> None:
+    """Updates the user's row, creating it (and counting a new user) on first sight."""
+    if telegram_id in _known_users:
+        updated = conn.execute(_TOUCH_USER_SQL, (ts, language_id, telegram_id)).rowcount
+        if updated:
+            return
+
+    inserted = conn.execute(
+        """
+        INSERT OR IGNORE INTO users (telegram_id, first_seen, last_seen, last_language_id, action_count)
+        VALUES (?, ?, ?, ?, 1)
+        """,
+        (telegram_id, ts, ts, language_id),
+    ).rowcount
+    if inserted:
+        conn.execute(
+            """
+            INSERT INTO users_daily_new (day, count) VALUES (?, 1)
+            ON CONFLICT (day) DO UPDATE SET count = count + 1
+            """,
+            (time.strftime("%Y-%m-%d", time.gmtime(ts)),),
+        )
+    else:
+        # Row exists but this process had not seen it yet
+        conn.execute(_TOUCH_USER_SQL, (ts, language_id, telegram_id))
 
 
 def log_action(
@@ -54,6 +896,7 @@ def log_action(
     target_category: str = None,
     language: str = None,
     platform: str = None,
+    campaign: str = None,
 ):
     """
     Logs a user action.
@@ -67,120 +910,850 @@ def log_action(
         target_category: Target category
         language: Output language selected
         platform: Platform (twitter, instagram)
+        campaign: Campaign name; defaults to the campaign registered for
+                  the action, if any
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    ts = int(time.time())
 
-    cursor.execute(
-        """
-        INSERT INTO usage_logs
-        (telegram_id, username, action, target_handle, target_category, language, platform)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-        (telegram_id, username, action, target_handle, target_category, language, platform),
-    )
+    try:
+        with get_manager().writer() as conn:
+            action_id = _lookup_id(conn, "actions", action)
+            if campaign:
+                campaign_id = _lookup_id(conn, "campaigns", campaign)
+            else:
+                campaign_id = _campaign_by_action.get(action)
+            language_id = _lookup_id(conn, "languages", language)
 
-    conn.commit()
-    conn.close()
+            conn.execute(
+                """
+                INSERT INTO usage_events
+                (telegram_id, username, action_id, target_id, category_id, campaign_id, language_id, platform_id, ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    telegram_id,
+                    username,
+                    action_id,
+                    _lookup_id(conn, "targets", target_handle),
+                    _lookup_id(conn, "target_categories", target_category),
+                    campaign_id,
+                    language_id,
+                    _lookup_id(conn, "platforms", platform),
+                    ts,
+                ),
+            )
 
+            _record_user(conn, telegram_id, language_id, ts)
 
-def get_user_count() -> int:
-    """Returns the number of unique users."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(DISTINCT telegram_id) FROM usage_logs")
-    result = cursor.fetchone()[0]
-    conn.close()
+            dimensions = (action, target_handle or "", language or "", platform or "")
+            conn.execute(
+                """
+                INSERT INTO usage_rollup_hourly (hour, action, target_handle, language, platform, count)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT (hour, action, target_handle, language, platform)
+                DO UPDATE SET count = count + 1
+                """,
+                (time.strftime("%Y-%m-%d %H:00:00", time.gmtime(ts)),) + dimensions,
+            )
+            conn.execute(
+                """
+                INSERT INTO usage_rollup_totals (action, target_handle, language, platform, count)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT (action, target_handle, language, platform)
+                DO UPDATE SET count = count + 1
+                """,
+                dimensions,
+            )
+    except Exception:
+        # Campaign ids are only written by init_db()/register_campaign()
+        _clear_lookup_cache(campaigns=False)
+        raise
+
+    # Only once committed, so a rolled-back insert is retried next time
+    _known_users.add(telegram_id)
+
+    _sketches.add(0, telegram_id, ts)
+    if campaign_id:
+        _sketches.add(campaign_id, telegram_id, ts)
+    if time.time() - _last_sketch_checkpoint >= SKETCH_CHECKPOINT_SECONDS:
+        try:
+            checkpoint_sketches()
+        except Exception as e:
+            # The event itself is committed; the buckets stay dirty for next time
+            logger.error(f"Error checkpointing sketches: {e}")
+
+
+def checkpoint_sketches() -> int:
+    """
+    Writes changed sketch buckets to user_sketches and drops old ones from memory.
+
+    Called from log_action() every SKETCH_CHECKPOINT_SECONDS, and should be
+    called once on shutdown.
+
+    Returns:
+        Number of buckets written
+    """
+    global _last_sketch_checkpoint
+    now = time.time()
+    _last_sketch_checkpoint = now
+
+    dirty = _sketches.take_dirty()
+    if dirty:
+        try:
+            with get_manager().writer() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO user_sketches (campaign_id, minute, registers) VALUES (?, ?, ?)
+                    ON CONFLICT (campaign_id, minute) DO UPDATE SET registers = excluded.registers
+                    """,
+                    dirty,
+                )
+        except Exception:
+            _sketches.mark_dirty(dirty)
+            raise
+    _sketches.prune(int(now))
+    return len(dirty)
+
+
+def _fold_sketches(conn: sqlite3.Connection, rows, span: int) -> int:
+    """Merges (campaign_id, minute, registers) rows into span-minute rollup rows."""
+    merged = {}
+    for campaign_id, minute, registers in rows:
+        key = (campaign_id, minute // span * span)
+        sketch = HyperLogLog.from_bytes(registers)
+        if key in merged:
+            merged[key].merge(sketch)
+        else:
+            merged[key] = sketch
+
+    for (campaign_id, start), sketch in merged.items():
+        # A bucket checkpointed late may land in a span that was already folded
+        existing = conn.execute(
+            "SELECT registers FROM user_sketches_rollup WHERE campaign_id = ? AND span = ? AND start_minute = ?",
+            (campaign_id, span, start),
+        ).fetchone()
+        if existing:
+            sketch.merge(HyperLogLog.from_bytes(existing[0]))
+        conn.execute(
+            """
+            INSERT INTO user_sketches_rollup (campaign_id, span, start_minute, registers) VALUES (?, ?, ?, ?)
+            ON CONFLICT (campaign_id, span, start_minute) DO UPDATE SET registers = excluded.registers
+            """,
+            (campaign_id, span, start, sketch.to_bytes()),
+        )
+    return len(merged)
+
+
+def compact_sketches(now: int = None) -> dict:
+    """
+    Merges old checkpointed sketches into coarser ones, bounding user_sketches.
+
+    Minute sketches older than SKETCH_MINUTE_HOURS become one sketch per
+    hour, and hourly ones older than SKETCH_HOURLY_DAYS one per UTC day.
+    With 1 KB sketches (SKETCH_PRECISION 10), each campaign, plus the
+    all-users key, then holds at most 1440 minute rows per day kept
+    (1.4 MB at the default 24 hours) and 24 hourly rows per day kept
+    (720 KB at the default 30 days), plus 1 KB per older day (365 KB a
+    year) instead of 1.4 MB per day. Windows reaching into compacted
+    history are widened to whole hours or days. Run by retention.py; each
+    day is folded in its own short write transaction.
+
+    Args:
+        now: Current epoch, defaults to time.time()
+
+    Returns:
+        Dict with the hourly and daily rows written
+    """
+    now_minute = int(now if now is not None else time.time()) // 60
+    # Only whole hours and days are folded
+    minute_cutoff = (now_minute - SKETCH_MINUTE_HOURS * 60) // 60 * 60
+    hour_cutoff = (now_minute - SKETCH_HOURLY_DAYS * 1440) // 1440 * 1440
+    result = {"hourly": 0, "daily": 0}
+
+    for table, column, span_filter, cutoff, span, name in (
+        ("user_sketches", "minute", "", minute_cutoff, 60, "hourly"),
+        ("user_sketches_rollup", "start_minute", "AND span = 60", hour_cutoff, 1440, "daily"),
+    ):
+        with get_manager().reader() as conn:
+            oldest = conn.execute(
+                f"SELECT MIN({column}) FROM {table} WHERE {column} < ? {span_filter}", (cutoff,)
+            ).fetchone()[0]
+        if oldest is None:
+            continue
+        for day_start in range(oldest // 1440 * 1440, cutoff, 1440):
+            day_end = min(day_start + 1440, cutoff)
+            with get_manager().writer() as conn:
+                rows = conn.execute(
+                    f"""
+                    SELECT campaign_id, {column}, registers FROM {table}
+                    WHERE {column} >= ? AND {column} < ? {span_filter}
+                    """,
+                    (day_start, day_end),
+                ).fetchall()
+                if not rows:
+                    continue
+                result[name] += _fold_sketches(conn, rows, span)
+                conn.execute(
+                    f"DELETE FROM {table} WHERE {column} >= ? AND {column} < ? {span_filter}",
+                    (day_start, day_end),
+                )
     return result
 
 
+def _campaign_ids(conn: sqlite3.Connection) -> dict:
+    return dict(conn.execute("SELECT name, id FROM campaigns").fetchall())
+
+
+def get_unique_users(campaign: str = None, minutes: int = 60) -> int:
+    """
+    Returns the approximate number of distinct users in the last N minutes.
+
+    Served from the HyperLogLog sketches: recent minutes from memory, older
+    ones from user_sketches. The estimate has a standard error of about
+    3.25% at the default SKETCH_PRECISION.
+
+    Args:
+        campaign: Campaign name, or None for all users
+        minutes: Window length, ending with the current minute
+    """
+    now = int(time.time())
+    end_minute = now // 60 + 1
+    start_minute = end_minute - minutes
+    oldest_in_memory = _sketches.oldest_minute(now)
+
+    with get_manager().reader() as conn:
+        if campaign is None:
+            key = 0
+        else:
+            key = _campaign_ids(conn).get(campaign)
+            if key is None:
+                return 0
+
+        sketch = _sketches.window(key, max(start_minute, oldest_in_memory), end_minute, now)
+        if start_minute < oldest_in_memory:
+            rows = conn.execute(
+                """
+                SELECT registers FROM user_sketches
+                WHERE campaign_id = ? AND minute >= ? AND minute < ?
+                """,
+                (key, start_minute, oldest_in_memory),
+            )
+            for (registers,) in rows:
+                sketch.merge(HyperLogLog(sketch.precision, registers))
+            # Compacted hours and days overlapping the window; the window is
+            # widened to their boundaries
+            rows = conn.execute(
+                """
+                SELECT registers FROM user_sketches_rollup
+                WHERE campaign_id = ? AND start_minute < ? AND start_minute + span > ?
+                """,
+                (key, oldest_in_memory, start_minute),
+            )
+            for (registers,) in rows:
+                sketch.merge(HyperLogLog(sketch.precision, registers))
+
+    return sketch.count()
+
+
+def get_unique_users_by_campaign(minutes: int = 60) -> dict:
+    """Returns {campaign name: approximate distinct users} for the last N minutes."""
+    with get_manager().reader() as conn:
+        names = _campaign_ids(conn)
+    counts = {name: get_unique_users(name, minutes) for name in names}
+    return {name: count for name, count in counts.items() if count}
+
+
+def get_user_count() -> int:
+    """Returns the number of unique users, including users whose rows were archived."""
+    with _report_reader() as conn:
+        return conn.execute("SELECT COALESCE(SUM(count), 0) FROM users_daily_new").fetchone()[0]
+
+
+def get_new_users(days: int = 7) -> list:
+    """Returns (day, new_users) rows for the last N UTC days, newest first."""
+    since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - days * 86400))
+    with _report_reader() as conn:
+        cursor = conn.execute(
+            "SELECT day, count FROM users_daily_new WHERE day >= ? ORDER BY day DESC",
+            (since,),
+        )
+        return cursor.fetchall()
+
+
 def get_action_count(action: str = None) -> int:
     """Returns the count of actions, optionally filtered by type."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with _report_reader() as conn:
+        if action:
+            cursor = conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM usage_rollup_totals WHERE action = ?",
+                (action,),
+            )
+        else:
+            cursor = conn.execute("SELECT COALESCE(SUM(count), 0) FROM usage_rollup_totals")
+        return cursor.fetchone()[0]
+
 
-    if action:
-        cursor.execute("SELECT COUNT(*) FROM usage_logs WHERE action = ?", (action,))
+def get_recent_logs(limit: int = 50) -> list:
+    """Returns recent log entries."""
+    with _report_reader() as conn:
+        cursor = conn.execute(
+            """
+            SELECT telegram_id, username, action, target_handle, language, platform, timestamp
+            FROM usage_logs
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        return cursor.fetchall()
+
+
+def get_stats() -> dict:
+    """
+    Returns usage statistics.
+
+    Counts come from the rollup tables in the analytics snapshot, whose size
+    depends on the number of distinct actions/targets/languages rather than
+    on the length of history. Last-hour users come live from the sketches.
+    """
+    with _report_reader() as conn:
+        cursor = conn.cursor()
+
+        stats = {}
+
+        # Total users
+        cursor.execute("SELECT COALESCE(SUM(count), 0) FROM users_daily_new")
+        stats["total_users"] = cursor.fetchone()[0]
+
+        # New users today
+        cursor.execute("SELECT count FROM users_daily_new WHERE day = date('now')")
+        row = cursor.fetchone()
+        stats["today_new_users"] = row[0] if row else 0
+
+        # Total actions
+        cursor.execute("SELECT COALESCE(SUM(count), 0) FROM usage_rollup_totals")
+        stats["total_actions"] = cursor.fetchone()[0]
+
+        # Actions by type
+        cursor.execute(
+            """
+            SELECT action, SUM(count) AS n FROM usage_rollup_totals
+            GROUP BY action ORDER BY n DESC
+            """
+        )
+        stats["actions_by_type"] = dict(cursor.fetchall())
+
+        # Top targets
+        cursor.execute(
+            """
+            SELECT target_handle, SUM(count) AS n FROM usage_rollup_totals
+            WHERE target_handle != ''
+            GROUP BY target_handle ORDER BY n DESC LIMIT 10
+            """
+        )
+        stats["top_targets"] = dict(cursor.fetchall())
+
+        # Languages used
+        cursor.execute(
+            """
+            SELECT language, SUM(count) AS n FROM usage_rollup_totals
+            WHERE language != ''
+            GROUP BY language ORDER BY n DESC
+            """
+        )
+        stats["languages"] = dict(cursor.fetchall())
+
+        # Today's activity
+        cursor.execute(
+            """
+            SELECT COALESCE(SUM(count), 0) FROM usage_rollup_hourly
+            WHERE hour >= strftime('%Y-%m-%d 00:00:00', 'now')
+            """
+        )
+        stats["today_actions"] = cursor.fetchone()[0]
+
+    # Approximate distinct users in the last hour, from the sketches
+    stats["last_hour_users"] = get_unique_users(minutes=60)
+    stats["last_hour_campaign_users"] = get_unique_users_by_campaign(minutes=60)
+
+    return stats
+
+
+# Time-range queries
+#
+# usage_events.ts is an integer UTC epoch. Comparing the bare column against
+# epoch bounds lets SQLite search idx_events_ts_action instead of evaluating
+# a date function for every row.
+
+_ACTIONS_BETWEEN_SQL = """
+    SELECT actions.name, COUNT(*) FROM usage_events
+    JOIN actions ON actions.id = usage_events.action_id
+    WHERE usage_events.ts >= ? AND usage_events.ts < ?
+    GROUP BY usage_events.action_id ORDER BY COUNT(*) DESC
+"""
+
+_LOGS_BETWEEN_SQL = """
+    SELECT telegram_id, username, action, target_handle, language, platform, timestamp
+    FROM usage_logs
+    WHERE ts >= ? AND ts < ?
+    ORDER BY ts DESC
+    LIMIT ?
+"""
+
+_DAILY_ACTIVITY_SQL = """
+    SELECT date(ts, 'unixepoch') AS day, COUNT(*), COUNT(DISTINCT telegram_id)
+    FROM usage_events
+    WHERE ts >= ? AND ts < ?
+    GROUP BY day ORDER BY day DESC
+"""
+
+_TARGETS_FOR_ACTION_SQL = """
+    SELECT targets.name, COUNT(*) FROM usage_events
+    JOIN targets ON targets.id = usage_events.target_id
+    WHERE usage_events.action_id = (SELECT id FROM actions WHERE name = ?)
+    GROUP BY usage_events.target_id ORDER BY COUNT(*) DESC
+    LIMIT ?
+"""
+
+
+def _to_epoch(value: datetime) -> int:
+    """Converts a datetime to a UTC epoch; naive datetimes are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _now_upper_bound() -> datetime:
+    """Returns an exclusive upper bound that includes rows written this second."""
+    return datetime.now(timezone.utc).replace(microsecond=0) + timedelta(seconds=1)
+
+
+def time_range(hours: int = 0, days: int = 0, end: datetime = None) -> tuple:
+    """
+    Returns (start, end) bounds covering the last N hours/days.
+
+    Args:
+        hours: Number of hours to look back
+        days: Number of days to look back
+        end: Upper bound (exclusive), defaults to now
+
+    Returns:
+        Tuple of (start, end) datetimes in UTC
+    """
+    if end is None:
+        end = _now_upper_bound()
+    return end - timedelta(hours=hours, days=days), end
+
+
+def get_action_counts_between(start: datetime, end: datetime) -> dict:
+    """Returns action counts for rows with start <= timestamp < end."""
+    with _report_reader() as conn:
+        cursor = conn.execute(_ACTIONS_BETWEEN_SQL, (_to_epoch(start), _to_epoch(end)))
+        return dict(cursor.fetchall())
+
+
+def get_action_counts_since(hours: int = 0, days: int = 0) -> dict:
+    """Returns action counts for the last N hours/days."""
+    return get_action_counts_between(*time_range(hours=hours, days=days))
+
+
+def get_logs_between(start: datetime, end: datetime, limit: int = 50) -> list:
+    """Returns log entries with start <= timestamp < end, newest first."""
+    with _report_reader() as conn:
+        cursor = conn.execute(_LOGS_BETWEEN_SQL, (_to_epoch(start), _to_epoch(end), limit))
+        return cursor.fetchall()
+
+
+def get_daily_activity(days: int = 7) -> list:
+    """Returns (day, actions, unique_users) rows for the last N days, newest first."""
+    end = _now_upper_bound()
+    start = (end - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    with _report_reader() as conn:
+        cursor = conn.execute(_DAILY_ACTIVITY_SQL, (_to_epoch(start), _to_epoch(end)))
+        return cursor.fetchall()
+
+
+def get_target_counts_for_action(action: str, limit: int = 10) -> dict:
+    """Returns the most targeted handles for one action type."""
+    with _report_reader() as conn:
+        cursor = conn.execute(_TARGETS_FOR_ACTION_SQL, (action, limit))
+        return dict(cursor.fetchall())
+
+
+def explain_query_plan(sql: str, params: tuple = (), conn: sqlite3.Connection = None) -> list:
+    """Returns the detail strings of SQLite's EXPLAIN QUERY PLAN for a query."""
+    if conn is not None:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
     else:
-        cursor.execute("SELECT COUNT(*) FROM usage_logs")
+        with get_manager().reader() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[3] for row in rows]
+
+
+def check_query_plans(conn: sqlite3.Connection = None) -> None:
+    """
+    Verifies that the time-range helpers are served from their indexes.
 
-    result = cursor.fetchone()[0]
-    conn.close()
+    Args:
+        conn: Connection to check, defaults to a pooled reader
+
+    Raises:
+        RuntimeError: If a query falls back to scanning usage_events or stops
+            using the expected index.
+    """
+    now = _to_epoch(datetime.now(timezone.utc))
+    expectations = [
+        (_ACTIONS_BETWEEN_SQL, (now, now), "COVERING INDEX idx_events_ts_action"),
+        (_LOGS_BETWEEN_SQL, (now, now, 1), "INDEX idx_events_ts_action"),
+        (_DAILY_ACTIVITY_SQL, (now, now), "INDEX idx_events_ts_action"),
+        (_TARGETS_FOR_ACTION_SQL, ("generate", 1), "COVERING INDEX idx_events_action_target"),
+    ]
+
+    for sql, params, expected in expectations:
+        plan = explain_query_plan(sql, params, conn)
+        table_steps = [step for step in plan if "usage_events" in step]
+        if not any(expected in step for step in table_steps) or any(
+            step.startswith("SCAN") for step in table_steps
+        ):
+            raise RuntimeError(
+                f"Unexpected query plan (wanted {expected}): {plan}\n{sql.strip()}"
+            )
+
+
+# Cohorts
+#
+# Sets of users per UTC day ("day:2026-01-31"), per campaign
+# ("campaign:jsn") and per campaign per day ("campaign:jsn:2026-01-31"),
+# stored as compressed bitmaps of cohort_users.seq. update_cohorts() folds
+# new usage_events rows in; set operations then never touch the log.
+
+
+def cohort_name(campaign: str = None, day=None) -> str:
+    """
+    Returns the stored name of a cohort.
+
+    Args:
+        campaign: Campaign name, or None for all users
+        day: date or "YYYY-MM-DD", or None for all time (campaigns only)
+    """
+    day = day.isoformat() if hasattr(day, "isoformat") else day
+    if campaign is None:
+        if day is None:
+            raise ValueError("a cohort needs a campaign, a day, or both")
+        return f"day:{day}"
+    return f"campaign:{campaign}:{day}" if day else f"campaign:{campaign}"
+
+
+def _cohort_seqs(conn: sqlite3.Connection, telegram_ids: set) -> dict:
+    """Returns {telegram_id: seq}, numbering users not seen before."""
+    ids = list(telegram_ids)
+    conn.executemany("INSERT OR IGNORE INTO cohort_users (telegram_id) VALUES (?)", [(i,) for i in ids])
+    seqs = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        rows = conn.execute(
+            f"SELECT telegram_id, seq FROM cohort_users WHERE telegram_id IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        seqs.update(rows.fetchall())
+    return seqs
+
+
+def update_cohorts(batch_size: int = COHORT_BATCH_SIZE) -> int:
+    """
+    Folds usage_events rows added since the last call into the cohort bitmaps.
+
+    Each batch is one short write transaction, so the bot's writes are never
+    held up for long. Cohorts keep their members after retention.py removes
+    the underlying rows.
+
+    Args:
+        batch_size: Rows processed per transaction
+
+    Returns:
+        Number of rows processed
+    """
+    processed = 0
+    while True:
+        with get_manager().writer() as conn:
+            row = conn.execute("SELECT last_event_id FROM cohort_progress WHERE id = 1").fetchone()
+            last_id = row[0] if row else 0
+            rows = conn.execute(
+                """
+                SELECT usage_events.id, usage_events.telegram_id, usage_events.ts, campaigns.name
+                FROM usage_events
+                LEFT JOIN campaigns ON campaigns.id = usage_events.campaign_id
+                WHERE usage_events.id > ?
+                ORDER BY usage_events.id
+                LIMIT ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return processed
+
+            seqs = _cohort_seqs(conn, {row[1] for row in rows})
+            members = {}
+            for _, telegram_id, ts, campaign in rows:
+                day = time.strftime("%Y-%m-%d", time.gmtime(ts))
+                seq = seqs[telegram_id]
+                members.setdefault(cohort_name(day=day), set()).add(seq)
+                if campaign:
+                    members.setdefault(cohort_name(campaign), set()).add(seq)
+                    members.setdefault(cohort_name(campaign, day), set()).add(seq)
+
+            for name, new_members in members.items():
+                stored = conn.execute("SELECT bitmap FROM cohorts WHERE name = ?", (name,)).fetchone()
+                bitmap = RoaringBitmap.from_bytes(stored[0]) if stored else RoaringBitmap()
+                bitmap.update(new_members)
+                conn.execute(
+                    """
+                    INSERT INTO cohorts (name, bitmap) VALUES (?, ?)
+                    ON CONFLICT (name) DO UPDATE SET bitmap = excluded.bitmap
+                    """,
+                    (name, bitmap.to_bytes()),
+                )
+
+            conn.execute(
+                """
+                INSERT INTO cohort_progress (id, last_event_id) VALUES (1, ?)
+                ON CONFLICT (id) DO UPDATE SET last_event_id = excluded.last_event_id
+                """,
+                (rows[-1][0],),
+            )
+
+        processed += len(rows)
+        if len(rows) < batch_size:
+            return processed
+
+
+def _load_cohorts(names: tuple, refresh: bool) -> list:
+    if refresh:
+        update_cohorts()
+    with get_manager().reader() as conn:
+        bitmaps = []
+        for name in names:
+            row = conn.execute("SELECT bitmap FROM cohorts WHERE name = ?", (name,)).fetchone()
+            bitmaps.append(RoaringBitmap.from_bytes(row[0]) if row else RoaringBitmap())
+    return bitmaps
+
+
+def get_cohort(name: str, refresh: bool = True) -> RoaringBitmap:
+    """
+    Returns a cohort's members as a bitmap of cohort_users.seq values.
+
+    Args:
+        name: Cohort name from cohort_name()
+        refresh: Fold in new log rows first
+    """
+    return _load_cohorts((name,), refresh)[0]
+
+
+def cohort_intersection(*names: str, refresh: bool = True) -> RoaringBitmap:
+    """Returns the users who are in every named cohort."""
+    bitmaps = _load_cohorts(names, refresh)
+    result = bitmaps[0]
+    for bitmap in bitmaps[1:]:
+        result = result & bitmap
     return result
 
 
-def get_recent_logs(limit: int = 50) -> list:
-    """Returns recent log entries."""
-    conn = get_connection()
-    cursor = conn.cursor()
+def cohort_union(*names: str, refresh: bool = True) -> RoaringBitmap:
+    """Returns the users who are in any named cohort."""
+    result = RoaringBitmap()
+    for bitmap in _load_cohorts(names, refresh):
+        result |= bitmap
+    return result
 
-    cursor.execute(
-        """
-        SELECT telegram_id, username, action, target_handle, language, platform, timestamp
-        FROM usage_logs
-        ORDER BY timestamp DESC
-        LIMIT ?
-        """,
-        (limit,),
-    )
 
-    results = cursor.fetchall()
-    conn.close()
+def cohort_difference(name: str, *others: str, refresh: bool = True) -> RoaringBitmap:
+    """Returns the users in the first cohort who are in none of the others."""
+    bitmaps = _load_cohorts((name,) + others, refresh)
+    result = bitmaps[0]
+    for bitmap in bitmaps[1:]:
+        result = result - bitmap
+    return result
+
+
+def get_cohort_members(bitmap: RoaringBitmap) -> list:
+    """Maps a cohort bitmap back to telegram_ids."""
+    seqs = list(bitmap)
+    telegram_ids = []
+    with get_manager().reader() as conn:
+        for start in range(0, len(seqs), 500):
+            chunk = seqs[start : start + 500]
+            rows = conn.execute(
+                f"SELECT telegram_id FROM cohort_users WHERE seq IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            telegram_ids.extend(row[0] for row in rows)
+    return telegram_ids
+
+
+def get_campaign_overlap(campaign: str, other: str) -> dict:
+    """
+    Compares the users of two campaigns, e.g. how many JSN users came back
+    for the next campaign.
+
+    Returns:
+        Dict with the size of each campaign, users in both, and users only
+        in the first
+    """
+    first, second = _load_cohorts((cohort_name(campaign), cohort_name(other)), refresh=True)
+    return {
+        campaign: len(first),
+        other: len(second),
+        "both": len(first & second),
+        f"only_{campaign}": len(first - second),
+    }
+
+
+def get_campaign_retention(campaign: str, offsets: tuple = (1, 7, 30)) -> list:
+    """
+    Returns day-N retention for each day's cohort of a campaign.
+
+    A user in the campaign's cohort for day D counts as retained at N if
+    they did anything in the bot on day D+N.
+
+    Args:
+        campaign: Campaign name
+        offsets: Day offsets N to report
+
+    Returns:
+        List of (day, cohort size, {N: retained users}) tuples, oldest first
+    """
+    update_cohorts()
+    prefix = cohort_name(campaign) + ":"
+    with get_manager().reader() as conn:
+        # Primary key range over "campaign:<name>:..." names
+        days = [
+            row[0][len(prefix):]
+            for row in conn.execute(
+                "SELECT name FROM cohorts WHERE name > ? AND name < ? ORDER BY name",
+                (prefix, prefix + "\uffff"),
+            )
+        ]
+
+    results = []
+    for day in days:
+        start = datetime.strptime(day, "%Y-%m-%d").date()
+        names = [cohort_name(campaign, day)] + [cohort_name(day=start + timedelta(days=n)) for n in offsets]
+        cohort, *later = _load_cohorts(tuple(names), refresh=False)
+        results.append((day, len(cohort), {n: len(cohort & active) for n, active in zip(offsets, later)}))
     return results
 
 
-def get_stats() -> dict:
-    """Returns usage statistics."""
-    conn = get_connection()
-    cursor = conn.cursor()
+_BROADCAST_COLUMNS = ("id", "text", "status", "created_at", "finished_at", "last_telegram_id", "sent", "blocked", "failed")
 
-    stats = {}
+# Users after a cursor position, minus those blocked since they last used the bot
+_RECIPIENTS_SQL = """
+    FROM users
+    LEFT JOIN blocked_users ON blocked_users.telegram_id = users.telegram_id
+    WHERE users.telegram_id > ?
+      AND (blocked_users.telegram_id IS NULL OR users.last_seen > blocked_users.blocked_at)
+"""
 
-    # Total users
-    cursor.execute("SELECT COUNT(DISTINCT telegram_id) FROM usage_logs")
-    stats["total_users"] = cursor.fetchone()[0]
 
-    # Total actions
-    cursor.execute("SELECT COUNT(*) FROM usage_logs")
-    stats["total_actions"] = cursor.fetchone()[0]
+def create_broadcast(text: str) -> int:
+    """Records a new running broadcast and returns its id."""
+    with get_manager().writer() as conn:
+        cursor = conn.execute(
+            "INSERT INTO broadcasts (text, created_at) VALUES (?, ?)",
+            (text, int(time.time())),
+        )
+        return cursor.lastrowid
 
-    # Actions by type
-    cursor.execute(
-        """
-        SELECT action, COUNT(*) FROM usage_logs
-        GROUP BY action ORDER BY COUNT(*) DESC
-        """
-    )
-    stats["actions_by_type"] = dict(cursor.fetchall())
 
-    # Top targets
-    cursor.execute(
-        """
-        SELECT target_handle, COUNT(*) FROM usage_logs
-        WHERE target_handle IS NOT NULL
-        GROUP BY target_handle ORDER BY COUNT(*) DESC LIMIT 10
-        """
-    )
-    stats["top_targets"] = dict(cursor.fetchall())
+def get_broadcast(broadcast_id: int = None):
+    """
+    Returns a broadcast as a dict, or None if there is none.
 
-    # Languages used
-    cursor.execute(
-        """
-        SELECT language, COUNT(*) FROM usage_logs
-        WHERE language IS NOT NULL
-        GROUP BY language ORDER BY COUNT(*) DESC
-        """
-    )
-    stats["languages"] = dict(cursor.fetchall())
+    Args:
+        broadcast_id: Broadcast to fetch; defaults to the most recent one
+    """
+    sql = f"SELECT {', '.join(_BROADCAST_COLUMNS)} FROM broadcasts"
+    with get_manager().reader() as conn:
+        if broadcast_id is None:
+            row = conn.execute(f"{sql} ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = conn.execute(f"{sql} WHERE id = ?", (broadcast_id,)).fetchone()
+    return dict(zip(_BROADCAST_COLUMNS, row)) if row else None
 
-    # Today's activity
-    cursor.execute(
-        """
-        SELECT COUNT(*) FROM usage_logs
-        WHERE date(timestamp) = date('now')
-        """
-    )
-    stats["today_actions"] = cursor.fetchone()[0]
 
-    conn.close()
-    return stats
+def get_running_broadcasts() -> list:
+    """Returns the ids of broadcasts that were running when the bot last stopped."""
+    with get_manager().reader() as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id")]
+
+
+def get_broadcast_recipients(after: int, limit: int) -> list:
+    """
+    Returns the next page of broadcast recipients.
+
+    Args:
+        after: Last telegram_id already handled (0 to start)
+        limit: Page size
+
+    Returns:
+        Up to limit telegram_ids greater than after, in ascending order
+    """
+    with get_manager().reader() as conn:
+        rows = conn.execute(
+            f"SELECT users.telegram_id {_RECIPIENTS_SQL} ORDER BY users.telegram_id LIMIT ?",
+            (after, limit),
+        )
+        return [row[0] for row in rows]
+
+
+def count_broadcast_recipients(after: int = 0) -> int:
+    """Returns how many recipients remain after a cursor position."""
+    with get_manager().reader() as conn:
+        return conn.execute(f"SELECT COUNT(*) {_RECIPIENTS_SQL}", (after,)).fetchone()[0]
+
+
+def save_broadcast_progress(
+    broadcast_id: int,
+    last_telegram_id: int,
+    sent: int,
+    failed: int,
+    blocked_ids: list = (),
+    status: str = None,
+) -> None:
+    """
+    Checkpoints a broadcast after a page of recipients, in one transaction.
+
+    Args:
+        broadcast_id: Broadcast being sent
+        last_telegram_id: Last recipient of the page; a resumed broadcast starts after it
+        sent: Messages delivered in this page
+        failed: Messages that failed for other reasons in this page
+        blocked_ids: Recipients that have blocked the bot or no longer exist
+        status: New status ('done', 'cancelled'), or None to leave it running
+    """
+    now = int(time.time())
+    with get_manager().writer() as conn:
+        conn.execute(
+            """
+            UPDATE broadcasts SET last_telegram_id = ?, sent = sent + ?, blocked = blocked + ?,
+                failed = failed + ?, status = COALESCE(?, status),
+                finished_at = CASE WHEN ? IS NULL THEN finished_at ELSE ? END
+            WHERE id = ?
+            """,
+            (last_telegram_id, sent, len(blocked_ids), failed, status, status, now, broadcast_id),
+        )
+        conn.executemany(
+            """
+            INSERT INTO blocked_users (telegram_id, blocked_at) VALUES (?, ?)
+            ON CONFLICT (telegram_id) DO UPDATE SET blocked_at = excluded.blocked_at
+            """,
+            [(telegram_id, now) for telegram_id in blocked_ids],
+        )
+
+
+def set_broadcast_status(broadcast_id: int, status: str) -> None:
+    """Marks a broadcast 'running', 'done' or 'cancelled'."""
+    with get_manager().writer() as conn:
+        conn.execute(
+            "UPDATE broadcasts SET status = ?, finished_at = CASE WHEN ? = 'running' THEN NULL ELSE ? END WHERE id = ?",
+            (status, status, int(time.time()), broadcast_id),
+        )
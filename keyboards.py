@@ -0,0 +1,136 @@
+"""
+Inline keyboards for target selection.
+
+A layout is built once per platform per target list (targets.py swaps in a
+new list on reload): targets are grouped by category, split into pages of
+TARGETS_PAGE_SIZE, and every button is created up front in both its plain
+and its selected (✅) form, along with each page's navigation rows.
+Rendering a page for a session only picks one of the two buttons per row
+from the session's selection bitset, so a toggle costs the same however
+many targets there are.
+"""
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import TARGETS_PAGE_SIZE, UI
+from targets import get_all_targets, get_target_id, get_targets_with_instagram
+
+_GENERAL = "general"
+
+_CUSTOM_BUTTON = InlineKeyboardButton("✏️ وارد کردن نام کاربری دلخواه", callback_data="enter_custom")
+_BACK_BUTTON = InlineKeyboardButton(UI["back"], callback_data="back_to_start")
+
+
+class _Layout:
+    """Precomputed pages of one platform's target list."""
+
+    __slots__ = ("targets", "pages", "categories", "grouped", "nav_rows")
+
+    def __init__(self, targets: tuple):
+        self.targets = targets
+        groups = {_GENERAL: []}
+        for target in targets:
+            groups.setdefault(target.category or _GENERAL, []).append(target)
+        groups = {category: members for category, members in groups.items() if members}
+
+        # Per page: ((target id, plain button, selected button), ...)
+        self.pages = []
+        self.categories = []
+        first_pages = {}
+        for category, members in groups.items():
+            first_pages[category] = len(self.pages)
+            for start in range(0, len(members), TARGETS_PAGE_SIZE):
+                self.pages.append(tuple(_target_row(t) for t in members[start : start + TARGETS_PAGE_SIZE]))
+                self.categories.append(category)
+
+        self.grouped = len(first_pages) > 1
+        # Navigation rows only depend on the page number
+        self.nav_rows = [
+            _nav_rows(page, len(self.pages), category, first_pages) for page, category in enumerate(self.categories)
+        ]
+
+
+def _target_row(target) -> tuple:
+    label = f"{target.name}\n{target.description_fa}"
+    callback_data = f"toggle_{target.handle}"
+    return (
+        get_target_id(target.handle),
+        InlineKeyboardButton(label, callback_data=callback_data),
+        InlineKeyboardButton(f"✅ {label}", callback_data=callback_data),
+    )
+
+
+def _nav_rows(page: int, page_count: int, category: str, first_pages: dict) -> list:
+    rows = []
+    if len(first_pages) > 1:
+        labels = UI["target_categories"]
+        rows.append([
+            InlineKeyboardButton(
+                ("▪️ " if c == category else "") + labels.get(c, c),
+                callback_data=f"target_page_{first}",
+            )
+            for c, first in first_pages.items()
+        ])
+    if page_count > 1:
+        row = []
+        if page > 0:
+            row.append(InlineKeyboardButton("⬅️ قبلی", callback_data=f"target_page_{page - 1}"))
+        row.append(InlineKeyboardButton(f"{page + 1}/{page_count}", callback_data="noop"))
+        if page < page_count - 1:
+            row.append(InlineKeyboardButton("بعدی ➡️", callback_data=f"target_page_{page + 1}"))
+        rows.append(row)
+    return rows
+
+
+# platform -> layout of the target list it was built from
+_layouts = {}
+
+
+def _get_layout(platform: str) -> _Layout:
+    targets = get_targets_with_instagram() if platform == "instagram" else get_all_targets()
+    layout = _layouts.get(platform)
+    if layout is None or layout.targets is not targets:
+        layout = _layouts[platform] = _Layout(targets)
+    return layout
+
+
+def target_keyboard(platform: str, page: int, selected_ids: int, selected_count: int) -> tuple:
+    """
+    Builds the target selection keyboard for one page.
+
+    Args:
+        platform: "twitter" or "instagram"
+        page: Requested page; clamped to the pages that exist
+        selected_ids: Bitset of selected target ids (sessions.get_selected_ids)
+        selected_count: Number of selected targets, including custom handles
+
+    Returns:
+        (InlineKeyboardMarkup, page actually shown, category label of that
+        page or None if the targets have no categories)
+    """
+    layout = _get_layout(platform)
+    page = max(0, min(page, len(layout.pages) - 1))
+
+    keyboard = []
+    # Custom handle option (Twitter only)
+    if platform == "twitter":
+        keyboard.append([_CUSTOM_BUTTON])
+    if layout.pages:
+        keyboard += [
+            [selected if target_id is not None and selected_ids >> target_id & 1 else plain]
+            for target_id, plain, selected in layout.pages[page]
+        ]
+        keyboard += layout.nav_rows[page]
+
+    # If targets selected, show continue button
+    if selected_count:
+        keyboard.append([
+            InlineKeyboardButton(f"✅ ادامه با {selected_count} هدف انتخاب شده", callback_data="continue_to_language")
+        ])
+    keyboard.append([_BACK_BUTTON])
+
+    label = None
+    if layout.grouped:
+        category = layout.categories[page]
+        label = UI["target_categories"].get(category, category)
+    return InlineKeyboardMarkup(keyboard), page, label
@@ -0,0 +1,160 @@
+"""
+Non-blocking structured logging.
+
+setup_logging() points the root logger at a QueueHandler: a log call only
+builds the record and puts it on a bounded queue, and a background
+QueueListener thread formats it (one JSON object per line, or plain text)
+and writes it out. Exception tracebacks are formatted on that thread too.
+
+Warnings and errors repeated with the same text within LOG_DEDUP_SECONDS
+are dropped before they are queued; the next one let through carries the
+number suppressed in "repeated". If the queue is full, records are dropped
+and counted rather than making the caller wait.
+
+Every record carries the id of the Telegram update being handled when it
+was logged (set_update_id), so the lines of one update can be grouped.
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from config import LOG_DEDUP_SECONDS, LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE
+
+_TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(update_id)s] %(message)s"
+
+_update_id = contextvars.ContextVar("update_id", default=None)
+
+
+def set_update_id(update_id) -> None:
+    """Sets the correlation id logged with records from the current update's context."""
+    _update_id.set(update_id)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "update_id", None) is not None:
+            entry["update_id"] = record.update_id
+        if getattr(record, "repeated", 0):
+            entry["repeated"] = record.repeated
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DuplicateFilter(logging.Filter):
+    """Drops warnings and errors whose text was logged within the last window seconds."""
+
+    def __init__(self, window: float, size: int = 1024):
+        super().__init__()
+        self.window = window
+        self.size = size
+        self.suppressed = 0
+        # (logger, level, message) -> [time let through, suppressed since]
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                self.suppressed += 1
+                return False
+            if entry is not None and entry[1]:
+                record.repeated = entry[1]
+            self._seen[key] = [now, 0]
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.size:
+                self._seen.popitem(last=False)
+        return True
+
+
+class _BackgroundHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, leaves the traceback for the listener
+        # thread to format; only the message is resolved here
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.update_id = _update_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_duplicates = None
+
+
+def setup_logging() -> None:
+    """Routes all logging through the background queue. Safe to call more than once."""
+    global _handler, _duplicates
+    if _handler is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(_TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _duplicates = _DuplicateFilter(LOG_DEDUP_SECONDS)
+    _handler = _BackgroundHandler(log_queue)
+    _handler.addFilter(_duplicates)
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(LOG_LEVEL)
+    # httpx logs every request at INFO, including each getUpdates long poll
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    # Flushes what is still queued on exit
+    atexit.register(listener.stop)
+
+
+def log_metrics() -> dict:
+    """Returns records waiting to be written, dropped on a full queue and suppressed as repeats."""
+    if _handler is None:
+        return {"queued": 0, "dropped": 0, "suppressed": 0}
+    return {
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "suppressed": _duplicates.suppressed,
+    }
@@ -0,0 +1,234 @@
+"""
+Outbound scheduler for Telegram sends and edits.
+
+Every send or edit is queued per chat and sent by that chat's worker, in
+order, within two token buckets: a per-chat one (OUTBOUND_CHAT_PER_SECOND,
+bursts of OUTBOUND_CHAT_BURST) and a global one (OUTBOUND_GLOBAL_PER_SECOND)
+shared by all chats, so bursts wait for a slot instead of hitting Telegram's
+flood limits.
+
+An edit queued for a message that already has an edit waiting replaces it:
+only the latest content is sent and the superseded caller gets None back.
+RetryAfter pauses the chat for the time Telegram asks and then retries;
+timeouts and network errors are retried with exponential backoff.
+
+Low-priority calls (broadcasts) share the global bucket but only take a
+token while more than OUTBOUND_INTERACTIVE_RESERVE are left, so replies to
+users always find capacity; a RetryAfter on one pauses the whole low lane.
+Within a chat, interactive calls are sent before low-priority ones queued
+earlier, so a reply never waits behind a broadcast message.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from config import (
+    OUTBOUND_CHAT_BURST,
+    OUTBOUND_CHAT_PER_SECOND,
+    OUTBOUND_GLOBAL_PER_SECOND,
+    OUTBOUND_INTERACTIVE_RESERVE,
+    OUTBOUND_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows rate acquisitions per second on average, up to burst at once."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, reserve: float = 0) -> None:
+        """Waits until a token is available, leaving reserve tokens for other callers, and takes it."""
+        while True:
+            self._refill()
+            if self.tokens >= 1 + reserve:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 + reserve - self.tokens) / self.rate)
+
+    def release(self) -> None:
+        """Returns a token taken by acquire() that ended up unused."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    delay = error.retry_after
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+class _Chat:
+    __slots__ = ("pending", "bucket", "blocked_until", "worker")
+
+    def __init__(self, rate: float, burst: float):
+        # coalesce key -> (send, future, low priority); sends get a unique key
+        self.pending = OrderedDict()
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.worker = None
+
+
+class OutboundScheduler:
+    """Per-chat queues of Telegram API calls sharing a global rate budget."""
+
+    def __init__(
+        self,
+        global_rate: float = OUTBOUND_GLOBAL_PER_SECOND,
+        chat_rate: float = OUTBOUND_CHAT_PER_SECOND,
+        chat_burst: float = OUTBOUND_CHAT_BURST,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+        interactive_reserve: float = OUTBOUND_INTERACTIVE_RESERVE,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # Capped so the low lane can still take a token from a full bucket
+        self.interactive_reserve = min(interactive_reserve, max(0, global_rate - 1))
+        self._global = TokenBucket(global_rate, global_rate)
+        self._low_blocked_until = 0.0
+        self._chats = {}
+        self._counters = {"sent": 0, "coalesced": 0, "retry_after": 0, "retried": 0, "failed": 0}
+
+    def submit(self, chat_id, send, coalesce_key=None, low_priority: bool = False) -> asyncio.Future:
+        """
+        Queues an API call for a chat.
+
+        Args:
+            chat_id: Chat the call targets; calls to one chat are sent in order, interactive ones first
+            send: Zero-argument coroutine function making the call (may be called again on retry)
+            coalesce_key: Calls with the same key replace a queued, unsent one (e.g. edits of one message)
+            low_priority: Send only with capacity left over from interactive traffic
+
+        Returns:
+            Future resolving to send()'s result, or None if a later call superseded it
+        """
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _Chat(self.chat_rate, self.chat_burst)
+
+        future = asyncio.get_running_loop().create_future()
+        key = coalesce_key if coalesce_key is not None else object()
+        superseded = chat.pending.get(key)
+        # Replacing keeps the queue position, so the latest content goes out
+        # when the superseded call would have
+        chat.pending[key] = (send, future, low_priority)
+        if superseded:
+            self._counters["coalesced"] += 1
+            if not superseded[1].done():
+                superseded[1].set_result(None)
+
+        if chat.worker is None or chat.worker.done():
+            chat.worker = asyncio.create_task(self._drain(chat_id, chat))
+        return future
+
+    @staticmethod
+    def _next_key(chat: _Chat):
+        """Returns the key of the oldest interactive call, else of the oldest low-priority one."""
+        for key, (_, _, low_priority) in chat.pending.items():
+            if not low_priority:
+                return key
+        return next(iter(chat.pending), None)
+
+    async def _drain(self, chat_id, chat: _Chat) -> None:
+        while chat.pending:
+            low_priority = chat.pending[self._next_key(chat)][2]
+            blocked_until = max(chat.blocked_until, self._low_blocked_until) if low_priority else chat.blocked_until
+            delay = blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await chat.bucket.acquire()
+            await self._global.acquire(self.interactive_reserve if low_priority else 0)
+            if not chat.pending:
+                break
+            # An interactive call may have arrived, or the low lane been
+            # paused, while this worker waited for tokens
+            key = self._next_key(chat)
+            if chat.pending[key][2] and self._low_blocked_until > time.monotonic():
+                chat.bucket.release()
+                self._global.release()
+                continue
+            send, future, low_priority = chat.pending.pop(key)
+            if future.cancelled():
+                # The caller gave up waiting (e.g. a stopped broadcast)
+                continue
+            await self._run(chat, key, send, future, low_priority)
+        if self._chats.get(chat_id) is chat and not chat.pending:
+            del self._chats[chat_id]
+
+    async def _run(self, chat: _Chat, key, send, future: asyncio.Future, low_priority: bool = False) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = await send()
+            except RetryAfter as e:
+                error = e
+                self._counters["retry_after"] += 1
+                delay = _retry_after_seconds(e)
+                logger.warning(f"Telegram flood limit, pausing chat for {delay:.0f}s")
+                chat.blocked_until = time.monotonic() + delay
+                if low_priority:
+                    # Flood limits during a broadcast apply to the bot, not one chat
+                    self._low_blocked_until = max(self._low_blocked_until, chat.blocked_until)
+                await asyncio.sleep(delay)
+            except BadRequest as e:
+                self._fail(future, e)
+                return
+            except NetworkError as e:
+                # Includes TimedOut
+                if attempt == self.max_retries:
+                    self._fail(future, e)
+                    return
+                error = e
+                self._counters["retried"] += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+            except Exception as e:
+                self._fail(future, e)
+                return
+            else:
+                self._counters["sent"] += 1
+                if not future.done():
+                    future.set_result(result)
+                return
+
+            if key in chat.pending:
+                # A newer call for the same message arrived while this one waited
+                self._counters["coalesced"] += 1
+                if not future.done():
+                    future.set_result(None)
+                return
+
+        # Still flood limited after every retry
+        self._fail(future, error)
+
+    def _fail(self, future: asyncio.Future, error: Exception) -> None:
+        self._counters["failed"] += 1
+        if not future.done():
+            future.set_exception(error)
+
+    def metrics(self) -> dict:
+        """Returns queued calls, active chats and send/coalesce/retry counters."""
+        return {
+            "queued": sum(len(chat.pending) for chat in self._chats.values()),
+            "active_chats": len(self._chats),
+            **self._counters,
+        }
+
+
+outbound = OutboundScheduler()
+
+
+async def reply_text(message, text: str, **kwargs):
+    """Sends a reply to message through the scheduler and returns the sent Message."""
+    return await outbound.submit(message.chat_id, lambda: message.reply_text(text, **kwargs))
@@ -0,0 +1,121 @@
+"""
+Skips Telegram message edits that would not change anything.
+
+Telegram rejects an edit whose text and keyboard equal the current ones
+("message is not modified"), after it has already cost an API call and a
+flood-limit token. edit_message() remembers a hash of what it last sent to
+each message and does not call the API when the new content hashes the
+same; any edit that fails forgets the message, so the next one is sent.
+Edits that are sent go through outbound.py's per-chat scheduler.
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+
+from telegram.error import BadRequest
+
+from config import RENDER_CACHE_SIZE
+from outbound import outbound
+
+logger = logging.getLogger(__name__)
+
+
+def _render_hash(text: str, reply_markup, kwargs: dict) -> bytes:
+    markup = reply_markup.to_dict() if reply_markup is not None else None
+    payload = json.dumps([text, markup, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+class RenderCache:
+    """LRU map of (chat id, message id) -> hash of the last content sent to it."""
+
+    def __init__(self, size: int = RENDER_CACHE_SIZE):
+        self.size = size
+        self._hashes = OrderedDict()
+        self.sent = 0
+        self.skipped = 0
+
+    def unchanged(self, key, digest: bytes) -> bool:
+        """Returns whether digest is what was last sent to the message."""
+        if key is not None and self._hashes.get(key) == digest:
+            self._hashes.move_to_end(key)
+            return True
+        return False
+
+    def remember(self, key, digest: bytes) -> None:
+        if key is None:
+            return
+        self._hashes[key] = digest
+        self._hashes.move_to_end(key)
+        while len(self._hashes) > self.size:
+            self._hashes.popitem(last=False)
+
+    def forget(self, key) -> None:
+        self._hashes.pop(key, None)
+
+    def metrics(self) -> dict:
+        """Returns edits sent, edits skipped and messages tracked."""
+        return {"sent": self.sent, "skipped": self.skipped, "tracked": len(self._hashes)}
+
+
+render_cache = RenderCache()
+
+
+def _message_key(target):
+    """Returns the cache key of the message a CallbackQuery or Message refers to."""
+    if hasattr(target, "edit_message_text"):
+        if target.inline_message_id:
+            return ("inline", target.inline_message_id)
+        target = target.message
+        if target is None:
+            return None
+    return (target.chat.id, target.message_id)
+
+
+async def edit_message(target, text: str, reply_markup=None, **kwargs) -> bool:
+    """
+    Edits a message's text and keyboard unless they are already what would be sent.
+
+    The edit goes through the outbound scheduler; if a newer edit of the same
+    message is queued before this one is sent, only the newer one is sent.
+
+    Args:
+        target: The CallbackQuery whose message to edit, or a Message
+        text: New message text
+        reply_markup: New inline keyboard, if any
+        **kwargs: Passed on to edit_message_text (e.g. parse_mode)
+
+    Returns:
+        True if the edit was sent, False if it was skipped or superseded
+    """
+    key = _message_key(target)
+    digest = _render_hash(text, reply_markup, kwargs)
+    if render_cache.unchanged(key, digest):
+        render_cache.skipped += 1
+        return False
+
+    edit = target.edit_message_text if hasattr(target, "edit_message_text") else target.edit_text
+
+    async def send() -> bool:
+        try:
+            await edit(text, reply_markup=reply_markup, **kwargs)
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                raise
+            # Sent earlier by a path that bypassed the cache, or before a restart
+            render_cache.skipped += 1
+            return False
+        render_cache.sent += 1
+        return True
+
+    # Remembered when queued, so an identical edit right behind it is skipped
+    render_cache.remember(key, digest)
+    chat_id = key[0] if key else None
+    try:
+        return bool(await outbound.submit(chat_id, send, coalesce_key=("edit", key) if key else None))
+    except Exception:
+        if render_cache.unchanged(key, digest):
+            render_cache.forget(key)
+        raise
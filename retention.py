@@ -0,0 +1,304 @@
+"""
+Retention and archival for usage_events.
+
+Rows older than RETENTION_DAYS are written to gzip-compressed CSV files
+partitioned by day under data/archive/, then deleted from SQLite in small
+batches so the bot's writer is never held up for long. The rollup tables
+and cohort bitmaps are left untouched, so get_stats() totals and cohort
+queries still include archived history. Old HyperLogLog sketches are
+merged into hourly and daily ones (db.compact_sketches).
+
+Usage:
+    python retention.py                # archive + delete + incremental vacuum
+    python retention.py --days 30      # override RETENTION_DAYS
+    python retention.py --dry-run      # only show what would be archived
+    python retention.py --migrate-vacuum  # once, for databases created before auto_vacuum
+"""
+
+import argparse
+import calendar
+import csv
+import glob
+import gzip
+import logging
+import os
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from config import ARCHIVE_DIR, RETENTION_DAYS, RETENTION_BATCH_SIZE
+from db import compact_sketches, get_manager, update_cohorts
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = [
+    "id",
+    "telegram_id",
+    "username",
+    "action",
+    "target_handle",
+    "target_category",
+    "language",
+    "platform",
+    "timestamp",
+    "campaign",
+]
+
+# usage_logs-YYYY-MM-DD-<first id>-<last id>.csv.gz
+_ARCHIVE_NAME = re.compile(r"usage_logs-(\d{4}-\d{2}-\d{2})-(\d+)-(\d+)\.csv\.gz$")
+
+
+def _archive_path(day: date, first_id: int, last_id: int) -> str:
+    return os.path.join(
+        ARCHIVE_DIR,
+        f"{day:%Y}",
+        f"{day:%m}",
+        f"usage_logs-{day.isoformat()}-{first_id}-{last_id}.csv.gz",
+    )
+
+
+def _list_archives() -> list:
+    """Returns (day, first_id, last_id, path) for every archive file, oldest first."""
+    archives = []
+    for path in glob.glob(os.path.join(ARCHIVE_DIR, "*", "*", "usage_logs-*.csv.gz")):
+        match = _ARCHIVE_NAME.search(os.path.basename(path))
+        if match:
+            day = date.fromisoformat(match.group(1))
+            archives.append((day, int(match.group(2)), int(match.group(3)), path))
+    archives.sort()
+    return archives
+
+
+def _day_bounds(day: date) -> tuple:
+    """Returns sargable [start, end) epoch bounds for one UTC day."""
+    start = calendar.timegm(day.timetuple())
+    return start, start + 86400
+
+
+def _next_day(after: date = None):
+    """Returns the first day with rows in usage_events on or after the given day."""
+    with get_manager().reader() as conn:
+        oldest = conn.execute(
+            "SELECT MIN(ts) FROM usage_events WHERE ts >= ?",
+            (_day_bounds(after)[0] if after else 0,),
+        ).fetchone()[0]
+    return datetime.fromtimestamp(oldest, timezone.utc).date() if oldest is not None else None
+
+
+def _archive_day(day: date, archived_upto: int) -> tuple:
+    """
+    Writes the day's not-yet-archived rows to a new archive file.
+
+    Rows are streamed from a pooled reader straight into the gzip file, and
+    the file only appears under its final name once it is complete.
+
+    Returns:
+        Tuple of (rows archived, last archived id)
+    """
+    start, end = _day_bounds(day)
+    tmp_path = os.path.join(ARCHIVE_DIR, f".usage_logs-{day.isoformat()}.tmp")
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+
+    first_id = last_id = None
+    count = 0
+    with get_manager().reader() as conn:
+        cursor = conn.execute(
+            f"""
+            SELECT {", ".join(COLUMNS)} FROM usage_logs
+            WHERE ts >= ? AND ts < ? AND id > ?
+            ORDER BY id
+            """,
+            (start, end, archived_upto),
+        )
+        with gzip.open(tmp_path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for row in cursor:
+                writer.writerow(row)
+                if first_id is None:
+                    first_id = row[0]
+                last_id = row[0]
+                count += 1
+
+    if count == 0:
+        os.remove(tmp_path)
+        return 0, archived_upto
+
+    final_path = _archive_path(day, first_id, last_id)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return count, last_id
+
+
+def _delete_day(day: date, upto_id: int, batch_size: int) -> int:
+    """Deletes the day's archived rows in short write transactions."""
+    start, end = _day_bounds(day)
+    deleted = 0
+    while True:
+        with get_manager().writer() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM usage_events WHERE id IN (
+                    SELECT id FROM usage_events
+                    WHERE ts >= ? AND ts < ? AND id <= ?
+                    LIMIT ?
+                )
+                """,
+                (start, end, upto_id, batch_size),
+            )
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return deleted
+        # Give the bot's log_action() calls a chance at the writer lock
+        time.sleep(0.01)
+
+
+def incremental_vacuum(pages: int = 0) -> None:
+    """
+    Returns free pages to the filesystem (all of them when pages is 0).
+
+    Needs auto_vacuum=INCREMENTAL, which init_db() sets for new databases;
+    older files need enable_incremental_vacuum() once.
+    """
+    with get_manager().writer() as conn:
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode != 2:
+            logger.warning("auto_vacuum is not INCREMENTAL; run retention.py --migrate-vacuum once to enable it")
+            return
+        # executescript() steps the pragma to completion; execute() would
+        # stop after freeing a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        # The freed pages only leave the main file once the WAL is checkpointed
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def enable_incremental_vacuum() -> bool:
+    """
+    Switches a database created with auto_vacuum=NONE to INCREMENTAL.
+
+    The mode only changes with a full VACUUM, which rewrites the whole file:
+    it needs free disk space about the size of the database and holds the
+    write lock until done (the bot's writes wait up to DB_BUSY_TIMEOUT_MS and
+    then fail), so run it once while the bot is stopped or quiet.
+
+    Returns:
+        True if the database was migrated, False if it already was INCREMENTAL
+    """
+    with get_manager().writer() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        start = time.monotonic()
+        # executescript() commits first; VACUUM cannot run inside a transaction
+        conn.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+        migrated = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    if not migrated:
+        raise RuntimeError("VACUUM did not switch auto_vacuum to INCREMENTAL")
+    logger.info(f"Enabled incremental vacuum in {time.monotonic() - start:.1f}s")
+    return True
+
+
+def run_retention(days: int = RETENTION_DAYS, batch_size: int = RETENTION_BATCH_SIZE, dry_run: bool = False) -> dict:
+    """
+    Archives and deletes usage_events rows older than the retention horizon.
+
+    Safe to re-run after a crash: rows already covered by an archive file
+    are deleted without being written again.
+
+    Args:
+        days: Keep this many days of raw logs in SQLite
+        batch_size: Rows deleted per write transaction
+        dry_run: Only report the days that would be archived
+
+    Returns:
+        Dict with days processed, rows archived and deleted, and sketch rollup rows written
+    """
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=days)
+    result = {"days": 0, "archived": 0, "deleted": 0}
+
+    # Cohort bitmaps are built from usage_events, so catch them up before
+    # any rows go away
+    if not dry_run:
+        update_cohorts()
+
+    archived_upto = {}
+    for archive_day, _, last_id, _ in _list_archives():
+        archived_upto[archive_day] = max(archived_upto.get(archive_day, 0), last_id)
+
+    day = _next_day()
+    while day is not None and day < cutoff:
+        if dry_run:
+            logger.info(f"Would archive {day.isoformat()}")
+        else:
+            archived, upto = _archive_day(day, archived_upto.get(day, 0))
+            deleted = _delete_day(day, upto, batch_size) if upto else 0
+            result["archived"] += archived
+            result["deleted"] += deleted
+            if archived or deleted:
+                logger.info(f"{day.isoformat()}: archived {archived}, deleted {deleted}")
+        result["days"] += 1
+        day = _next_day(day + timedelta(days=1))
+
+    if not dry_run:
+        sketches = compact_sketches()
+        result["sketches"] = sketches["hourly"] + sketches["daily"]
+
+    if not dry_run and (result["deleted"] or result.get("sketches")):
+        incremental_vacuum()
+
+    return result
+
+
+def iter_archived_logs(start: date = None, end: date = None):
+    """
+    Streams archived rows as dicts, oldest day first.
+
+    Only files whose day falls in [start, end) are opened, and rows are read
+    one at a time so arbitrarily large archives can be scanned.
+
+    Args:
+        start: First day to include (inclusive)
+        end: Last day to include (exclusive)
+    """
+    for day, _, _, path in _list_archives():
+        if start and day < start:
+            continue
+        if end and day >= end:
+            continue
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def count_archived_actions(start: date = None, end: date = None) -> dict:
+    """Returns action counts over archived rows with start <= day < end."""
+    counts = {}
+    for row in iter_archived_logs(start, end):
+        counts[row["action"]] = counts.get(row["action"], 0) + 1
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old usage_events rows")
+    parser.add_argument("--days", type=int, default=RETENTION_DAYS, help="days of raw logs to keep")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="rows deleted per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only list the days that would be archived")
+    parser.add_argument(
+        "--migrate-vacuum",
+        action="store_true",
+        help="switch an old database to incremental vacuum (one full VACUUM) and exit",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO,
+    )
+    if args.migrate_vacuum:
+        if not enable_incremental_vacuum():
+            logger.info("Incremental vacuum is already enabled")
+        return
+    result = run_retention(args.days, args.batch_size, args.dry_run)
+    logger.info(f"Done: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Dispatch table for inline keyboard callbacks.
+
+Handlers are registered by exact callback_data ("show_targets") or by
+prefix ("lang_"); the rest of the data after a prefix is passed to the
+handler as its argument. Dispatch is a dict lookup for the exact key and
+one per distinct prefix length, longest first, instead of a chain of
+comparisons, and every route's call count and time are recorded.
+"""
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RouteTiming:
+    """Call count and time spent in one route."""
+
+    __slots__ = ("calls", "errors", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class CallbackRouter:
+    """Maps callback_data to async handlers(update, context, arg)."""
+
+    def __init__(self):
+        self._exact = {}
+        self._prefixes = {}
+        # Distinct prefix lengths, longest first, so the longest match wins
+        self._prefix_lengths = []
+        self._timings = {}
+
+    def route(self, key: str):
+        """Decorator registering a handler for callback_data == key (arg is "")."""
+        def register(handler):
+            if key in self._exact:
+                raise ValueError(f"callback route {key!r} registered twice")
+            self._exact[key] = handler
+            self._timings[key] = RouteTiming()
+            return handler
+        return register
+
+    def prefix(self, prefix: str):
+        """Decorator registering a handler for callback_data starting with prefix (arg is the rest)."""
+        def register(handler):
+            if not prefix or prefix in self._prefixes:
+                raise ValueError(f"callback prefix {prefix!r} is empty or registered twice")
+            self._prefixes[prefix] = handler
+            self._prefix_lengths = sorted({len(p) for p in self._prefixes}, reverse=True)
+            self._timings[f"{prefix}*"] = RouteTiming()
+            return handler
+        return register
+
+    def resolve(self, data: str) -> tuple:
+        """
+        Finds the handler for callback data.
+
+        Args:
+            data: callback_data of the pressed button
+
+        Returns:
+            (route name, handler, arg), or (None, None, None) if nothing matches
+        """
+        handler = self._exact.get(data)
+        if handler is not None:
+            return data, handler, ""
+        for length in self._prefix_lengths:
+            if length <= len(data):
+                prefix = data[:length]
+                handler = self._prefixes.get(prefix)
+                if handler is not None:
+                    return f"{prefix}*", handler, data[length:]
+        return None, None, None
+
+    async def dispatch(self, update, context) -> bool:
+        """Runs the handler for update.callback_query.data; returns False if there is none."""
+        data = update.callback_query.data or ""
+        name, handler, arg = self.resolve(data)
+        if handler is None:
+            logger.warning(f"No handler for callback data {data!r}")
+            return False
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            await handler(update, context, arg)
+            failed = False
+        finally:
+            self._timings[name].record(time.perf_counter() - start, failed)
+        return True
+
+    def timings(self) -> dict:
+        """Returns {route: {"calls", "errors", "total", "mean", "max"}} for routes that were called."""
+        return {
+            name: {
+                "calls": t.calls,
+                "errors": t.errors,
+                "total": t.total,
+                "mean": t.total / t.calls,
+                "max": t.max,
+            }
+            for name, t in self._timings.items()
+            if t.calls
+        }
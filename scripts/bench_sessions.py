@@ -0,0 +1,115 @@
+"""
+Measures memory per session for the old and the compact session layouts.
+
+Builds N sessions that have each selected a few targets (plus a custom
+handle) and generated a message for each, once in the old layout (target
+dicts in selected_targets, a dict with text and a precomputed intent URL per
+message) and once with sessions.py, and reports allocated bytes per session
+as seen by tracemalloc. Shared target records are created before measuring,
+so only what each session holds is counted.
+
+    python3 scripts/bench_sessions.py --sessions 20000 --selected 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import GeneratedMessage, add_target, get_selected_targets  # noqa: E402
+from targets import TARGETS, get_all_targets  # noqa: E402
+
+SAMPLE_TEXT = (
+    "@{handle} Iran's people are being silenced: internet blackouts, mass arrests, "
+    "executions. The world must not look away. Stand with them and demand accountability "
+    "now. #R2pforiran #iranmassacre"
+)
+
+
+def _intent_url(text: str) -> str:
+    # Same URL as bot.create_twitter_intent_url, without importing the bot
+    return f"https://twitter.com/intent/tweet?text={urllib.parse.quote(text, safe='')}"
+
+
+def _sample(rng: random.Random, count: int) -> list:
+    handles = rng.sample([t["handle"] for t in TARGETS], count)
+    return handles + [f"custom_{rng.randrange(10**6)}"]
+
+
+def build_legacy(plan: list) -> list:
+    """The layout bot.py used before sessions.py: dicts everywhere, URLs stored."""
+    by_handle = {t["handle"]: t for t in TARGETS}
+    sessions = []
+    for handles in plan:
+        selected = []
+        for handle in handles:
+            if handle in by_handle:
+                selected.append(by_handle[handle])
+            else:
+                selected.append({
+                    "name": f"@{handle}",
+                    "handle": handle,
+                    "description": "Custom target",
+                    "description_fa": "هدف سفارشی",
+                    "tone": "respectful and urgent",
+                })
+        messages = []
+        for target in selected:
+            text = SAMPLE_TEXT.format(handle=target["handle"])
+            messages.append({"target": target, "message": text, "url": _intent_url(text)})
+        sessions.append({"state": 0, "platform": "twitter", "selected_targets": selected,
+                         "generated_messages": messages, "current_message_index": 0, "language": "en"})
+    return sessions
+
+
+def build_compact(plan: list) -> list:
+    """The layout bot.py uses now (see sessions.py)."""
+    sessions = []
+    for handles in plan:
+        user_data = {"state": 0, "platform": "twitter"}
+        for handle in handles:
+            add_target(user_data, handle)
+        user_data["generated_messages"] = [
+            GeneratedMessage(target.handle, SAMPLE_TEXT.format(handle=target.handle))
+            for target in get_selected_targets(user_data)
+        ]
+        user_data["current_message_index"] = 0
+        user_data["language"] = "en"
+        sessions.append(user_data)
+    return sessions
+
+
+def measure(build, plan: list) -> float:
+    """Returns bytes allocated per session by build(plan)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build(plan)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del sessions
+    return (after - before) / len(plan)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes per session, old vs compact layout")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--selected", type=int, default=3, help="known targets selected per session")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    get_all_targets()  # build the shared records and indexes up front
+    plan = [_sample(rng, min(args.selected, len(TARGETS))) for _ in range(args.sessions)]
+
+    legacy = measure(build_legacy, plan)
+    compact = measure(build_compact, plan)
+    print(f"sessions: {args.sessions}, targets per session: {len(plan[0])}")
+    print(f"old layout:     {legacy:8.0f} bytes/session")
+    print(f"compact layout: {compact:8.0f} bytes/session ({compact / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Local stand-in for the Anthropic Messages API, for load and latency tests.
+
+Answers POST /v1/messages with canned text for the bot's prompt families
+(tweets, Instagram captions, email subjects and bodies, smart replies),
+after a simulated delay drawn from a configurable distribution. Supports
+streaming, random 429/529 errors, a requests-per-minute limit with the
+same rate-limit headers as the real API, and keep-alive connections. The
+same seed gives the same delays, errors and texts for the same sequence of
+requests.
+
+Run it, then point the bot at it (any API key is accepted):
+
+    python3 scripts/fake_anthropic.py --port 8089 --latency lognormal:-0.5,0.4 --error-429 0.02
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8089 ANTHROPIC_API_KEY=fake python3 bot.py
+
+or start it in-process from a benchmark and hand its URL to the generator:
+
+    with FakeAnthropicServer(latency="fixed:0.2") as server:
+        ai_generator._generator = ai_generator.MessageGenerator(base_url=server.base_url)
+
+(config.py reads ANTHROPIC_BASE_URL when it is imported, so setting the
+environment variable in-process only works before config or ai_generator
+are imported; after that, requests would still go to the real API.)
+
+GET /_stats returns requests served per family and errors returned.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED = {
+    "tweet": [
+        "@{handle} The people of Iran are facing executions and internet blackouts for demanding freedom. "
+        "Please use your voice to stand with them. #IranRevolution #R2pforiran",
+        "@{handle} Thousands of Iranians have been arrested for peaceful protest. The world is watching - "
+        "will you speak up for them? #StandWithIran #iranmassacre",
+        "@{handle} Iranian families are burying their children while the regime cuts them off from the world. "
+        "Please don't stay silent. #IranProtests #R2pforiran",
+    ],
+    "caption": [
+        "Iranians are risking everything for freedom. Silence is not neutral. 🕊️\n\n#IranRevolution #StandWithIran",
+        "Every voice matters when a people is silenced. Stand with Iran. 💚🤍❤️\n\n#R2pforiran #FreeIran",
+    ],
+    "email_subject": {
+        "fi": ["Vetoomus pidätettyjen iranilaisten vapauttamiseksi", "Pyyntö koskien kahta pidätettyä iranilaista"],
+        "da": ["Appel om støtte til det iranske folk", "Anmodning vedrørende menneskerettigheder i Iran"],
+        "en": ["Urgent appeal regarding human rights in Iran", "Request for action on the situation in Iran"],
+    },
+    "email_body": {
+        "fi": [
+            "Hyvä vastaanottaja,\n\nKirjoitan teille huolestuneena kahden pidätetyn iranilaisen tilanteesta. "
+            "Pyydän kunnioittavasti, että asiaa tarkastellaan oikeudenmukaisesti ja inhimillisesti.\n\n"
+            "Kunnioittavasti,\nHuolestunut kansalainen",
+            "Arvoisa vastaanottaja,\n\nOtan yhteyttä koskien Helsingissä pidätettyjä iranilaisia mielenosoittajia. "
+            "Toivon, että heidän tekonsa taustat otetaan huomioon.\n\nYstävällisin terveisin,\nKansalainen",
+        ],
+        "da": [
+            "Kære modtager,\n\nJeg skriver for at bede Danmark om at stå op for det iranske folk og deres "
+            "grundlæggende rettigheder.\n\nMed venlig hilsen,\nEn bekymret borger",
+        ],
+        "en": [
+            "Dear Sir or Madam,\n\nI am writing to ask you to use your office to support the people of Iran, "
+            "who face arrests and executions for peaceful protest.\n\nRespectfully,\nA concerned citizen",
+            "Dear Recipient,\n\nI respectfully urge you to speak out about the crackdown in Iran and to support "
+            "accountability for the violence against protesters.\n\nSincerely,\nA concerned citizen",
+        ],
+    },
+    "smart_reply": [
+        "این همه زور زدی که آخرش همینو بنویسی؟ 😂",
+        "تاریخ یادش میمونه کی کنار مردم بود و کی کنار جلاد. تو انتخابتو کردی.",
+        "حرفت مثل اینترنت جمهوری اسلامیه: قطع و وصل و بی‌محتوا 🤡",
+    ],
+}
+
+
+def _family(system: str, prompt: str, max_tokens: int) -> str:
+    """Tells the bot's prompt families apart by their system prompts."""
+    if "correspondence" in system or "open letter" in system:
+        return "email_subject" if max_tokens <= 150 else "email_body"
+    if "social media" in system:
+        return "caption" if "instagram" in prompt.lower() else "tweet"
+    return "smart_reply"
+
+
+def _email_language(system: str) -> str:
+    if "Finnish" in system:
+        return "fi"
+    if "Danish" in system:
+        return "da"
+    return "en"
+
+
+def parse_latency(spec: str):
+    """
+    Parses a latency distribution into a function of a Random returning seconds.
+
+    Args:
+        spec: "fixed:S", "uniform:MIN,MAX", "normal:MEAN,STDDEV" or
+              "lognormal:MU,SIGMA" (of the natural log of seconds)
+
+    Raises:
+        ValueError: If the spec is not one of these
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(v) for v in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"invalid latency spec {spec!r}")
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(*values))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(*values)
+    raise ValueError(f"invalid latency spec {spec!r}")
+
+
+class _RateLimiter:
+    """Sliding one-minute window of request times."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._times = deque()
+
+    def check(self, now: float) -> tuple:
+        """Records a request; returns (allowed, remaining, seconds until a slot frees up)."""
+        if not self.per_minute:
+            return True, 1000000, 0.0
+        while self._times and now - self._times[0] >= 60:
+            self._times.popleft()
+        reset = 60 - (now - self._times[0]) if self._times else 0.0
+        if len(self._times) >= self.per_minute:
+            return False, 0, reset
+        self._times.append(now)
+        return True, self.per_minute - len(self._times), reset
+
+
+class FakeAnthropicServer:
+    """Fake Messages API served from a background thread; usable as a context manager."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "lognormal:-0.5,0.4",
+        error_429: float = 0.0,
+        error_529: float = 0.0,
+        rpm: int = 0,
+        stream_chunks: int = 8,
+        seed: int = 0,
+    ):
+        self.latency = parse_latency(latency)
+        self.error_429 = error_429
+        self.error_529 = error_529
+        self.stream_chunks = max(1, stream_chunks)
+        self.seed = seed
+        self._limiter = _RateLimiter(rpm)
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.stats = Counter()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-anthropic", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serves on the calling thread until interrupted."""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeAnthropicServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def plan(self, request: dict) -> dict:
+        """
+        Decides how to answer one request: status, delay, text and rate-limit state.
+
+        Draws happen under a lock in arrival order, so a seeded run with the
+        same request sequence gets the same answers.
+        """
+        system = request.get("system") or ""
+        if isinstance(system, list):
+            system = " ".join(block.get("text", "") for block in system)
+        messages = request.get("messages") or [{}]
+        prompt = messages[-1].get("content") or ""
+        if isinstance(prompt, list):
+            prompt = " ".join(block.get("text", "") for block in prompt)
+        family = _family(system, prompt, int(request.get("max_tokens", 0)))
+
+        with self._lock:
+            allowed, remaining, reset = self._limiter.check(time.monotonic())
+            roll = self._rng.random()
+            delay = self.latency(self._rng)
+            pick = self._rng.random()
+            if not allowed or roll < self.error_429:
+                status = 429
+            elif roll < self.error_429 + self.error_529:
+                status = 529
+            else:
+                status = 200
+            self.stats["requests"] += 1
+            self.stats[family if status == 200 else f"error_{status}"] += 1
+
+        options = CANNED[family]
+        if isinstance(options, dict):
+            options = options[_email_language(system)]
+        text = options[int(pick * len(options))]
+        handle = next((word for word in prompt.split() if word.startswith("@") and len(word) > 1), "@someone")
+        return {
+            "status": status,
+            "delay": delay,
+            "text": text.replace("@{handle}", handle.rstrip(".,:;)")),
+            "model": request.get("model", "claude-fake"),
+            "input_tokens": (len(system) + len(prompt)) // 4,
+            "remaining": remaining,
+            "reset": reset,
+            "limited": not allowed,
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                # Connection warm-up
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path != "/_stats":
+                    self._send_json(404, _error("not_found_error", "Not found"))
+                    return
+                with server._lock:
+                    stats = dict(server.stats)
+                self._send_json(200, stats)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.split("?")[0] != "/v1/messages":
+                    self._send_json(404, _error("not_found_error", "Not found"))
+                    return
+                try:
+                    request = json.loads(body)
+                except ValueError:
+                    self._send_json(400, _error("invalid_request_error", "Body is not JSON"))
+                    return
+
+                plan = server.plan(request)
+                headers = _rate_limit_headers(server._limiter.per_minute, plan)
+                if plan["status"] == 429:
+                    # A full window frees up when its oldest request expires; random 429s clear at once
+                    headers["retry-after"] = str(max(1, math.ceil(plan["reset"])) if plan["limited"] else 1)
+                    message = "Number of requests has exceeded your rate limit" if plan["limited"] else "Rate limited"
+                    self._send_json(429, _error("rate_limit_error", message), headers)
+                    return
+                if plan["status"] == 529:
+                    time.sleep(plan["delay"] / 4)
+                    self._send_json(529, _error("overloaded_error", "Overloaded"), headers)
+                    return
+
+                if request.get("stream"):
+                    self._stream(plan, headers)
+                    return
+                time.sleep(plan["delay"])
+                self._send_json(200, _message(plan, plan["text"]), headers)
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("request-id", f"req_fake_{time.monotonic_ns()}")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, plan: dict, headers: dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+
+                # Half the delay before the first token, the rest spread over the chunks
+                text = plan["text"]
+                chunks = server.stream_chunks
+                size = math.ceil(len(text) / chunks) or 1
+                pieces = [text[i : i + size] for i in range(0, len(text), size)] or [""]
+                time.sleep(plan["delay"] / 2)
+                start = _message(plan, "")
+                start["content"] = []
+                start["stop_reason"] = None
+                start["usage"]["output_tokens"] = 0
+                self._event("message_start", {"type": "message_start", "message": start})
+                self._event(
+                    "content_block_start",
+                    {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                )
+                for piece in pieces:
+                    self._event(
+                        "content_block_delta",
+                        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}},
+                    )
+                    time.sleep(plan["delay"] / 2 / len(pieces))
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event(
+                    "message_delta",
+                    {
+                        "type": "message_delta",
+                        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                        "usage": {"output_tokens": max(1, len(text) // 4)},
+                    },
+                )
+                self._event("message_stop", {"type": "message_stop"})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _event(self, event: str, data: dict):
+                payload = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+                self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def _error(kind: str, message: str) -> dict:
+    return {"type": "error", "error": {"type": kind, "message": message}}
+
+
+def _message(plan: dict, text: str) -> dict:
+    return {
+        "id": f"msg_fake_{time.monotonic_ns()}",
+        "type": "message",
+        "role": "assistant",
+        "model": plan["model"],
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": plan["input_tokens"], "output_tokens": max(1, len(text) // 4)},
+    }
+
+
+def _rate_limit_headers(per_minute: int, plan: dict) -> dict:
+    reset = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + plan["reset"]))
+    return {
+        "anthropic-ratelimit-requests-limit": str(per_minute or 1000000),
+        "anthropic-ratelimit-requests-remaining": str(plan["remaining"]),
+        "anthropic-ratelimit-requests-reset": reset,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="lognormal:-0.5,0.4",
+                        help="fixed:S, uniform:MIN,MAX, normal:MEAN,SD or lognormal:MU,SIGMA (seconds)")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-529", type=float, default=0.0, help="fraction of requests answered 529")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--stream-chunks", type=int, default=8, help="text deltas per streamed response")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeAnthropicServer(
+        args.host, args.port, args.latency, args.error_429, args.error_529, args.rpm, args.stream_chunks, args.seed
+    )
+    print(f"Fake Anthropic API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+        print(json.dumps(dict(server.stats)))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,23 +10,10 @@ echo "Setting up Voice for Iran database..."
 # Create data directory if it doesn't exist
 mkdir -p "$PROJECT_DIR/data"
 
-# Create the database and tables
-sqlite3 "$DB_PATH" <<EOF
-CREATE TABLE IF NOT EXISTS usage_logs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    telegram_id INTEGER NOT NULL,
-    username TEXT,
-    action TEXT NOT NULL,
-    target_handle TEXT,
-    target_category TEXT,
-    language TEXT,
-    platform TEXT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE INDEX IF NOT EXISTS idx_telegram_id ON usage_logs(telegram_id);
-CREATE INDEX IF NOT EXISTS idx_timestamp ON usage_logs(timestamp);
-EOF
+# Create the database and tables. The schema lives in db.init_db(), which
+# registers the campaigns from campaigns.py and migrates an old flat
+# usage_logs table in place.
+cd "$PROJECT_DIR" && python3 -c "from db import init_db; init_db()"
 
 if [ $? -eq 0 ]; then
     echo "Database created successfully at: $DB_PATH"
@@ -34,3 +21,7 @@ else
     echo "Error creating database!"
     exit 1
 fi
+
+# Seed data/targets.json with the built-in targets (kept if it already exists)
+cd "$PROJECT_DIR" && python3 -c "from targets import export_targets; export_targets()" \
+    && echo "Targets file: $PROJECT_DIR/data/targets.json"
@@ -1,30 +1,21 @@
 #!/bin/bash
 # View recent usage logs for Voice for Iran bot
+# Thin wrapper around analytics.py; extra options are passed through, e.g.
+#   ./scripts/view_logs.sh 100 --action generate --since 2026-01-01
+#   ./scripts/view_logs.sh 20 --follow --campaign spain
+#   ./scripts/view_logs.sh --follow
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PROJECT_DIR="$(dirname "$SCRIPT_DIR")"
-DB_PATH="$PROJECT_DIR/data/usage.db"
 
-# Default limit
-LIMIT=${1:-50}
-
-if [ ! -f "$DB_PATH" ]; then
-    echo "Database not found. Run setup_db.sh first."
-    exit 1
+# Optional leading limit; anything else is passed through
+LIMIT=50
+if [[ $1 =~ ^[0-9]+$ ]]; then
+    LIMIT=$1
+    shift
 fi
 
 echo "=== Recent Activity (last $LIMIT entries) ==="
 echo ""
 
-sqlite3 -header -column "$DB_PATH" <<EOF
-SELECT
-    datetime(timestamp, 'localtime') as time,
-    telegram_id,
-    COALESCE(username, '-') as username,
-    action,
-    COALESCE(target_handle, '-') as target,
-    COALESCE(language, '-') as lang
-FROM usage_logs
-ORDER BY timestamp DESC
-LIMIT $LIMIT;
-EOF
+exec python3 "$PROJECT_DIR/analytics.py" logs --limit "$LIMIT" "$@"
@@ -0,0 +1,324 @@
+"""
+Compact per-user session state kept in context.user_data.
+
+Sessions store ids and text, never copies of target records:
+- "selected_ids": int bitset of the selected targets' ids (targets.get_target_id)
+- "custom_handles": tuple of selected handles that are not known targets
+- "generated_messages": list of GeneratedMessage(handle, text); tweet and
+  Instagram links are built when a message is shown, not stored
+
+Target records themselves are shared, immutable and looked up on demand.
+
+SessionManager bounds how many sessions stay in memory: sessions idle for
+SESSION_IDLE_TTL, and the least recently used ones while the total exceeds
+SESSION_MAX_BYTES, are dropped from the Application. With SESSION_SPILL on
+they are pickled to SESSION_SPILL_DIR first and restored transparently on
+the user's next update. Target ids are only stable within one process, so
+spilled sessions store the selected handles and the bitset is rebuilt from
+them on restore.
+"""
+
+import asyncio
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from config import (
+    SESSION_IDLE_TTL,
+    SESSION_MAX_BYTES,
+    SESSION_SPILL,
+    SESSION_SPILL_DAYS,
+    SESSION_SPILL_DIR,
+    SESSION_SWEEP_SECONDS,
+)
+from targets import Target, custom_target, get_target_id, get_targets_by_ids
+
+logger = logging.getLogger(__name__)
+
+
+class GeneratedMessage(NamedTuple):
+    """A generated message and the Twitter handle of its target."""
+
+    handle: str
+    text: str
+
+
+def clear_selection(user_data: dict) -> None:
+    """Deselects every target."""
+    user_data["selected_ids"] = 0
+    user_data.pop("custom_handles", None)
+
+
+def get_selected_ids(user_data: dict) -> int:
+    """Returns the bitset of selected known target ids."""
+    return user_data.get("selected_ids", 0)
+
+
+def is_selected(user_data: dict, handle: str) -> bool:
+    """Returns whether a handle is in the selection."""
+    target_id = get_target_id(handle)
+    if target_id is not None:
+        return bool(user_data.get("selected_ids", 0) >> target_id & 1)
+    folded = handle.casefold()
+    return any(h.casefold() == folded for h in user_data.get("custom_handles", ()))
+
+
+def add_target(user_data: dict, handle: str) -> None:
+    """Adds a known target or a custom handle to the selection."""
+    target_id = get_target_id(handle)
+    if target_id is not None:
+        user_data["selected_ids"] = user_data.get("selected_ids", 0) | (1 << target_id)
+    elif not is_selected(user_data, handle):
+        user_data["custom_handles"] = user_data.get("custom_handles", ()) + (handle,)
+
+
+def toggle_target(user_data: dict, target: Target) -> None:
+    """Selects a known target, or deselects it if it is already selected."""
+    target_id = get_target_id(target.handle)
+    if target_id is not None:
+        user_data["selected_ids"] = user_data.get("selected_ids", 0) ^ (1 << target_id)
+
+
+def selection_count(user_data: dict) -> int:
+    """Returns how many targets are selected."""
+    return user_data.get("selected_ids", 0).bit_count() + len(user_data.get("custom_handles", ()))
+
+
+def get_selected_targets(user_data: dict) -> list:
+    """Returns the selected targets: known ones in list order, then custom handles."""
+    targets = get_targets_by_ids(user_data.get("selected_ids", 0))
+    targets.extend(custom_target(handle) for handle in user_data.get("custom_handles", ()))
+    return targets
+
+
+def message_target(message: GeneratedMessage) -> Target:
+    """Returns the target record a generated message is addressed to."""
+    return custom_target(message.handle)
+
+
+def _to_spill(user_data: dict) -> dict:
+    """Returns a copy of a session to pickle, with the selection stored as handles."""
+    data = dict(user_data)
+    bits = data.pop("selected_ids", 0)
+    if bits:
+        data["selected_handles"] = tuple(target.handle for target in get_targets_by_ids(bits))
+    return data
+
+
+def _from_spill(data: dict, user_data: dict) -> None:
+    """Restores a session written by _to_spill() into user_data."""
+    handles = data.pop("selected_handles", ())
+    # Bitsets spilled by older versions may refer to another process's ids
+    data.pop("selected_ids", None)
+    user_data.update(data)
+    for handle in handles:
+        add_target(user_data, handle)
+
+
+def _deep_size(obj, seen: set = None) -> int:
+    """Approximate bytes held by a session: the containers, strings and numbers it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    return size
+
+
+class SessionManager:
+    """
+    Tracks when each user's session was last used and how big it is, and
+    evicts sessions from the Application's user_data.
+
+    touch() and measure() are called around every update and sweep()
+    periodically, all on the event loop. Spilled sessions are written to
+    disk in a worker thread; until then they are restored from memory.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_bytes: int = SESSION_MAX_BYTES,
+        spill_dir: str = SESSION_SPILL_DIR if SESSION_SPILL else None,
+    ):
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        # user_id -> monotonic time of the last update, least recent first
+        self._last_used = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        # user_id -> pickled session waiting to be written to disk
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._next_prune = 0.0
+        self._counters = {"evicted_idle": 0, "evicted_memory": 0, "spilled": 0, "rehydrated": 0}
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _spill_path(self, user_id: int) -> str:
+        return os.path.join(self.spill_dir, f"{user_id}.pickle")
+
+    def touch(self, user_id: int, user_data: dict) -> None:
+        """Marks a session as used, first restoring it if it was spilled. Call before handlers run."""
+        if user_id not in self._last_used and self.spill_dir and not user_data:
+            self._rehydrate(user_id, user_data)
+        self._last_used[user_id] = time.monotonic()
+        self._last_used.move_to_end(user_id)
+
+    def measure(self, user_id: int, user_data: dict) -> None:
+        """Records a session's current size. Call after handlers have run."""
+        if user_id not in self._last_used:
+            return
+        size = _deep_size(user_data)
+        self._bytes += size - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = size
+
+    def _rehydrate(self, user_id: int, user_data: dict) -> None:
+        with self._pending_lock:
+            data = self._pending.pop(user_id, None)
+        path = self._spill_path(user_id)
+        try:
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            os.remove(path)
+        except FileNotFoundError:
+            if data is None:
+                return
+        except OSError as e:
+            logger.error(f"Error restoring session {user_id}: {e}")
+            return
+
+        try:
+            _from_spill(pickle.loads(data), user_data)
+        except Exception as e:
+            logger.error(f"Discarding unreadable session {user_id}: {e}")
+            return
+        self._counters["rehydrated"] += 1
+
+    def _evict(self, application, user_id: int, reason: str) -> None:
+        self._last_used.pop(user_id, None)
+        self._bytes -= self._sizes.pop(user_id, 0)
+        user_data = application.user_data.get(user_id)
+        if user_data and self.spill_dir:
+            try:
+                data = pickle.dumps(_to_spill(user_data), protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.error(f"Error spilling session {user_id}, dropping it: {e}")
+            else:
+                with self._pending_lock:
+                    self._pending[user_id] = data
+                self._counters["spilled"] += 1
+        application.drop_user_data(user_id)
+        self._counters[f"evicted_{reason}"] += 1
+
+    async def sweep(self, application) -> int:
+        """
+        Evicts idle sessions, then least recently used ones until under the memory ceiling.
+
+        Args:
+            application: The telegram Application whose user_data is managed
+
+        Returns:
+            Number of sessions evicted
+        """
+        now = time.monotonic()
+        idle = []
+        for user_id, last_used in self._last_used.items():
+            if now - last_used < self.idle_ttl:
+                break
+            idle.append(user_id)
+        for user_id in idle:
+            self._evict(application, user_id, "idle")
+
+        evicted = len(idle)
+        while self._bytes > self.max_bytes and self._last_used:
+            self._evict(application, next(iter(self._last_used)), "memory")
+            evicted += 1
+
+        if self.spill_dir and (self._pending or now >= self._next_prune):
+            prune = now >= self._next_prune
+            if prune:
+                self._next_prune = now + 3600
+            await asyncio.to_thread(self._write_spilled, prune)
+        return evicted
+
+    def _write_spilled(self, prune: bool = False) -> None:
+        """Writes pending spilled sessions to disk (worker thread)."""
+        while True:
+            with self._pending_lock:
+                if not self._pending:
+                    break
+                user_id, data = next(iter(self._pending.items()))
+            path = self._spill_path(user_id)
+            try:
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                logger.error(f"Error writing session {user_id}: {e}")
+            with self._pending_lock:
+                if self._pending.get(user_id) is data:
+                    del self._pending[user_id]
+                    continue
+                rehydrated = user_id not in self._pending
+            if rehydrated:
+                # Restored from memory while it was being written
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        if prune:
+            cutoff = time.time() - SESSION_SPILL_DAYS * 86400
+            with os.scandir(self.spill_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.stat().st_mtime < cutoff:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+
+    def metrics(self) -> dict:
+        """Returns live session count, bytes held and eviction counters."""
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "live_sessions": len(self._last_used),
+            "bytes_held": self._bytes,
+            "pending_spill": pending,
+            **self._counters,
+        }
+
+
+_session_manager = None
+
+
+def get_session_manager() -> SessionManager:
+    """Returns the singleton SessionManager instance."""
+    global _session_manager
+    if _session_manager is None:
+        _session_manager = SessionManager()
+    return _session_manager
+
+
+async def run_session_sweeper(application, interval: float = SESSION_SWEEP_SECONDS) -> None:
+    """Sweeps sessions every interval seconds until cancelled."""
+    manager = get_session_manager()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await manager.sweep(application)
+        except Exception as e:
+            logger.error(f"Error sweeping sessions: {e}")
@@ -0,0 +1,192 @@
+"""
+HyperLogLog sketches for approximate distinct-user counts.
+
+log_action() feeds every telegram_id into one sketch per campaign per
+minute. Sketches for any set of minutes merge into one, so "unique users
+in the last hour" is a merge of up to 60 small register arrays rather
+than a COUNT(DISTINCT) over the log.
+
+With the default precision of 10 each sketch is a 1 KB register array
+and estimates have a standard error of 1.04 / sqrt(1024), about 3.25%
+(roughly ±6.5% at 95% confidence), independent of how many users it has
+seen.
+"""
+
+import hashlib
+import math
+import threading
+
+from config import SKETCH_PRECISION, SKETCH_MEMORY_MINUTES
+
+# 2^-rank for every possible register value, so count() is a table lookup
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+def _hash64(value) -> int:
+    """Returns a well-mixed 64-bit hash of an integer or string."""
+    data = value.to_bytes(8, "big", signed=True) if isinstance(value, int) else str(value).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Fixed-size distinct counter with 2^precision one-byte registers."""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = SKETCH_PRECISION, registers: bytes = None):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        m = 1 << precision
+        if registers is None:
+            self.registers = bytearray(m)
+        elif len(registers) == m:
+            self.registers = bytearray(registers)
+        else:
+            raise ValueError(f"expected {m} registers, got {len(registers)}")
+
+    @property
+    def standard_error(self) -> float:
+        """Relative standard error of count()."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, value) -> None:
+        """Adds a value (e.g. a telegram_id) to the sketch."""
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = h & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, *others: "HyperLogLog") -> "HyperLogLog":
+        """Folds other sketches of the same precision into this one."""
+        if not others:
+            return self
+        if any(other.precision != self.precision for other in others):
+            raise ValueError("cannot merge sketches with different precision")
+        # One pass over all register arrays at once is much cheaper than
+        # merging them pairwise
+        self.registers = bytearray(map(max, self.registers, *(other.registers for other in others)))
+        return self
+
+    def count(self) -> int:
+        """Returns the estimated number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        if estimate <= 2.5 * m:
+            # Small-range correction: linear counting over empty registers
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(int(math.log2(len(data))), data)
+
+
+class SketchStore:
+    """
+    In-memory HyperLogLog buckets keyed by (key, minute).
+
+    Only the last memory_minutes minutes are kept; older buckets are
+    expected to have been checkpointed by the caller (see db.py) before
+    they are pruned. Thread-safe.
+    """
+
+    def __init__(self, precision: int = SKETCH_PRECISION, memory_minutes: int = SKETCH_MEMORY_MINUTES):
+        self.precision = precision
+        self.memory_minutes = memory_minutes
+        self._buckets = {}
+        self._dirty = set()
+        # key -> (start, end, merged sketch) for the last window's finished
+        # minutes, which no longer change, so repeated dashboard queries
+        # only merge the current minute
+        self._closed = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: int, value, ts: int) -> None:
+        """Adds value to the bucket for key and the minute containing ts."""
+        bucket_key = (key, ts // 60)
+        with self._lock:
+            sketch = self._buckets.get(bucket_key)
+            if sketch is None:
+                sketch = self._buckets[bucket_key] = HyperLogLog(self.precision)
+            sketch.add(value)
+            self._dirty.add(bucket_key)
+            closed = self._closed.get(key)
+            if closed and closed[0] <= bucket_key[1] < closed[1]:
+                del self._closed[key]
+
+    def load(self, key: int, minute: int, registers: bytes) -> None:
+        """Restores a checkpointed bucket, merging with anything already added."""
+        restored = HyperLogLog(self.precision, registers)
+        with self._lock:
+            sketch = self._buckets.get((key, minute))
+            self._buckets[(key, minute)] = restored.merge(sketch) if sketch else restored
+            self._closed.pop(key, None)
+
+    def window(self, key: int, start_minute: int, end_minute: int, now: int) -> HyperLogLog:
+        """
+        Returns the merge of key's in-memory buckets with start <= minute < end.
+
+        Args:
+            key: Bucket key (campaign id)
+            start_minute: First minute (epoch // 60), inclusive
+            end_minute: Last minute, exclusive
+            now: Current epoch; minutes before now's minute are cached as finished
+        """
+        closed_end = max(start_minute, min(end_minute, now // 60))
+        with self._lock:
+            closed = self._closed.get(key)
+            if closed and closed[:2] == (start_minute, closed_end):
+                merged = HyperLogLog(self.precision, closed[2].registers)
+            else:
+                merged = HyperLogLog(self.precision).merge(*self._range(key, start_minute, closed_end))
+                self._closed[key] = (start_minute, closed_end, HyperLogLog(self.precision, merged.registers))
+            merged.merge(*self._range(key, closed_end, end_minute))
+        return merged
+
+    def _range(self, key: int, start_minute: int, end_minute: int) -> list:
+        buckets = self._buckets
+        return [
+            buckets[(key, minute)] for minute in range(start_minute, end_minute) if (key, minute) in buckets
+        ]
+
+    def keys(self) -> set:
+        """Returns every key that has an in-memory bucket."""
+        with self._lock:
+            return {key for key, _ in self._buckets}
+
+    def oldest_minute(self, now: int) -> int:
+        """Returns the first minute whose bucket is still guaranteed to be in memory."""
+        return now // 60 - self.memory_minutes + 1
+
+    def take_dirty(self) -> list:
+        """Returns (key, minute, registers) for buckets changed since the last call."""
+        with self._lock:
+            dirty = [
+                (key, minute, self._buckets[(key, minute)].to_bytes())
+                for key, minute in self._dirty
+                if (key, minute) in self._buckets
+            ]
+            self._dirty.clear()
+        return dirty
+
+    def mark_dirty(self, buckets: list) -> None:
+        """Re-queues buckets from take_dirty() after a failed checkpoint."""
+        with self._lock:
+            self._dirty.update((key, minute) for key, minute, _ in buckets)
+
+    def prune(self, now: int) -> None:
+        """Drops clean buckets that have fallen out of the memory window."""
+        oldest = self.oldest_minute(now)
+        with self._lock:
+            for bucket_key in [k for k in self._buckets if k[1] < oldest and k not in self._dirty]:
+                del self._buckets[bucket_key]
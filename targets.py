@@ -1,11 +1,28 @@
 """
 Target database for Voice for Iran bot.
 Simplified list of key influential people and organizations.
+
+Targets are loaded from TARGETS_PATH (data/targets.json) when it exists,
+falling back to the built-in lists below. The file is checked for changes
+at most every TARGETS_RELOAD_SECONDS; a valid new version is swapped in as
+a whole, an invalid one is logged and ignored. Readers never take a lock.
 """
 
+import json
+import logging
+import os
 import random
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
 from typing import Optional
 
+from config import TARGETS_PATH, TARGETS_RELOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Built-in targets, used until TARGETS_PATH exists (seed it with export_targets()).
 # Simplified flat list of key targets with Persian descriptions
 TARGETS = [
     {
@@ -152,37 +169,6 @@ TARGETS = [
 ]
 
 
-def get_all_targets() -> list:
-    """Returns all targets."""
-    return TARGETS
-
-
-def get_targets_with_instagram() -> list:
-    """Returns targets that have Instagram handles."""
-    return [t for t in TARGETS if t.get("instagram")]
-
-
-def get_random_target() -> dict:
-    """Returns a random target."""
-    return random.choice(TARGETS) if TARGETS else None
-
-
-def get_target_by_handle(handle: str) -> Optional[dict]:
-    """Finds a target by their Twitter handle."""
-    for target in TARGETS:
-        if target["handle"].lower() == handle.lower():
-            return target
-    return None
-
-
-def get_target_by_instagram(handle: str) -> Optional[dict]:
-    """Finds a target by their Instagram handle."""
-    for target in TARGETS:
-        if target.get("instagram") and target["instagram"].lower() == handle.lower():
-            return target
-    return None
-
-
 # Yle Article Correction Campaign - Twitter Targets
 YLE_CAMPAIGN_TARGETS = {
     "yle_journalists": [
@@ -210,21 +196,336 @@ YLE_CAMPAIGN_TARGETS = {
 }
 
 
+@dataclass(frozen=True, slots=True)
+class Target:
+    """
+    Immutable target record, shared by every session that selects it.
+
+    Supports target["name"] and target.get("tone", default) so prompt
+    builders can keep treating it like the dicts it replaced; get() also
+    falls back to the default for fields that are None.
+    """
+
+    name: str
+    handle: str
+    instagram: Optional[str] = None
+    description_fa: str = ""
+    description: str = ""
+    tone: Optional[str] = None
+    category: Optional[str] = None
+    language: Optional[str] = None
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+
+_FIELDS = {field.name for field in fields(Target)}
+_TWITTER_HANDLE = re.compile(r"^[A-Za-z0-9_]{1,15}$")
+_INSTAGRAM_HANDLE = re.compile(r"^[A-Za-z0-9._]{1,30}$")
+
+
+def _index(records, key) -> dict:
+    """Maps case-folded key(record) to record; the first record wins on duplicates."""
+    index = {}
+    for record in records:
+        value = key(record)
+        if value:
+            index.setdefault(value.casefold(), record)
+    return index
+
+
+def _parse_target(entry, where: str, **extra) -> Target:
+    """Validates one target entry from the data file and returns its record."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where}: expected an object, got {type(entry).__name__}")
+    unknown = set(entry) - _FIELDS
+    if unknown:
+        raise ValueError(f"{where}: unknown fields {sorted(unknown)}")
+    for key, value in entry.items():
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"{where}: {key} must be a string")
+    if not entry.get("name"):
+        raise ValueError(f"{where}: name is required")
+    if not _TWITTER_HANDLE.match(entry.get("handle") or ""):
+        raise ValueError(f"{where}: invalid Twitter handle {entry.get('handle')!r}")
+    if entry.get("instagram") and not _INSTAGRAM_HANDLE.match(entry["instagram"]):
+        raise ValueError(f"{where}: invalid Instagram handle {entry['instagram']!r}")
+    return Target(**{**entry, **extra})
+
+
+def _check_unique(records, where: str) -> None:
+    seen = set()
+    for record in records:
+        handle = record.handle.casefold()
+        if handle in seen:
+            raise ValueError(f"{where}: duplicate handle {record.handle!r}")
+        seen.add(handle)
+
+
+# Case-folded handle -> small integer id. Ids are never reused or
+# reassigned, so bitsets of ids kept in sessions stay valid across reloads.
+# Only written while building a snapshot (at import or under _reload_lock).
+_target_ids = {}
+
+
+@dataclass(frozen=True, slots=True)
+class _Snapshot:
+    """One consistent, immutable version of every target list and index."""
+
+    targets: tuple
+    instagram_targets: tuple
+    by_handle: dict
+    by_instagram: dict
+    by_category: dict
+    yle_by_category: dict
+    yle_by_handle: dict
+    # Case-folded handle -> stable id, and id -> record, for targets
+    by_id: dict
+    ids: dict
+    # (mtime_ns, size, inode) of the file it was loaded from; None for built-ins
+    source: Optional[tuple] = None
+
+
+def _build_snapshot(targets, yle_targets, source: Optional[tuple] = None) -> _Snapshot:
+    """
+    Validates raw target data and builds its indexes.
+
+    Args:
+        targets: List of target objects
+        yle_targets: Dict of Yle campaign category -> list of target objects
+        source: File signature the data was read from
+
+    Returns:
+        The new snapshot; raises ValueError if the data is invalid
+    """
+    if not isinstance(targets, list) or not targets:
+        raise ValueError("targets must be a non-empty list")
+    if not isinstance(yle_targets, dict):
+        raise ValueError("yle_campaign_targets must be an object")
+
+    records = tuple(_parse_target(entry, f"targets[{i}]") for i, entry in enumerate(targets))
+    _check_unique(records, "targets")
+
+    by_category = {}
+    for record in records:
+        if record.category:
+            by_category.setdefault(record.category, []).append(record)
+
+    # Yle targets carry their category, so lookups by handle need no scan or mutation
+    yle_by_category = {}
+    for category, entries in yle_targets.items():
+        if not isinstance(entries, list):
+            raise ValueError(f"yle_campaign_targets.{category}: expected a list")
+        yle_by_category[category] = tuple(
+            _parse_target(entry, f"yle_campaign_targets.{category}[{i}]", category=category)
+            for i, entry in enumerate(entries)
+        )
+    yle_records = [record for group in yle_by_category.values() for record in group]
+    _check_unique(yle_records, "yle_campaign_targets")
+
+    # Ids are only handed out once the data is known to be valid
+    for record in records:
+        _target_ids.setdefault(record.handle.casefold(), len(_target_ids))
+    ids = {record.handle.casefold(): _target_ids[record.handle.casefold()] for record in records}
+
+    return _Snapshot(
+        targets=records,
+        instagram_targets=tuple(record for record in records if record.instagram),
+        by_handle=_index(records, lambda t: t.handle),
+        by_instagram=_index(records, lambda t: t.instagram),
+        by_category={category: tuple(group) for category, group in by_category.items()},
+        yle_by_category=yle_by_category,
+        yle_by_handle=_index(yle_records, lambda t: t.handle),
+        by_id={ids[record.handle.casefold()]: record for record in records},
+        ids=ids,
+        source=source,
+    )
+
+
+_snapshot = _build_snapshot(TARGETS, YLE_CAMPAIGN_TARGETS)
+# Signature of the last file version that failed validation, so it is
+# reported once rather than re-parsed on every check
+_rejected_source = None
+_next_check = 0.0
+_reload_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _reload_locked(path: str) -> bool:
+    global _snapshot, _rejected_source
+    source = _file_signature(path)
+    if source is None or source == _snapshot.source or source == _rejected_source:
+        return False
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("expected an object with a targets list")
+        snapshot = _build_snapshot(data.get("targets"), data.get("yle_campaign_targets", {}), source)
+    except (OSError, ValueError) as e:
+        _rejected_source = source
+        logger.error(f"Ignoring invalid targets file {path}, keeping previous targets: {e}")
+        return False
+
+    # A single reference assignment: readers see either the old snapshot
+    # or the new one, never a mix
+    _snapshot = snapshot
+    _rejected_source = None
+    logger.info(
+        f"Loaded {len(snapshot.targets)} targets and "
+        f"{sum(map(len, snapshot.yle_by_category.values()))} Yle targets from {path}"
+    )
+    return True
+
+
+def reload_targets(path: str = TARGETS_PATH) -> bool:
+    """
+    Loads targets from the data file if it changed since the last load.
+
+    Args:
+        path: JSON file with "targets" and "yle_campaign_targets"
+
+    Returns:
+        True if a new version was swapped in
+    """
+    global _next_check
+    with _reload_lock:
+        _next_check = time.monotonic() + TARGETS_RELOAD_SECONDS
+        return _reload_locked(path)
+
+
+def _current() -> _Snapshot:
+    """Returns the current snapshot, checking the data file at most every TARGETS_RELOAD_SECONDS."""
+    global _next_check
+    if time.monotonic() >= _next_check and _reload_lock.acquire(blocking=False):
+        # Only one thread checks; the others carry on with the current snapshot
+        try:
+            _next_check = time.monotonic() + TARGETS_RELOAD_SECONDS
+            _reload_locked(TARGETS_PATH)
+        finally:
+            _reload_lock.release()
+    return _snapshot
+
+
+def export_targets(path: str = TARGETS_PATH, overwrite: bool = False) -> bool:
+    """
+    Writes the built-in targets to the data file, to seed it for editing.
+
+    Args:
+        path: File to write
+        overwrite: Replace an existing file
+
+    Returns:
+        True if the file was written
+    """
+    if os.path.exists(path) and not overwrite:
+        return False
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"targets": TARGETS, "yle_campaign_targets": YLE_CAMPAIGN_TARGETS}, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return True
+
+
+def get_all_targets() -> tuple:
+    """Returns all targets."""
+    return _current().targets
+
+
+def get_targets_with_instagram() -> tuple:
+    """Returns targets that have Instagram handles."""
+    return _current().instagram_targets
+
+
+def get_targets_by_category(category: str) -> tuple:
+    """Returns targets in a category (e.g. "trump_senator")."""
+    return _current().by_category.get(category, ())
+
+
+def get_random_target() -> Optional[Target]:
+    """Returns a random target."""
+    targets = _current().targets
+    return random.choice(targets) if targets else None
+
+
+def get_target_by_handle(handle: str) -> Optional[Target]:
+    """Finds a target by their Twitter handle (case-insensitive)."""
+    return _current().by_handle.get(handle.casefold())
+
+
+def get_target_by_instagram(handle: str) -> Optional[Target]:
+    """Finds a target by their Instagram handle (case-insensitive)."""
+    return _current().by_instagram.get(handle.casefold())
+
+
+def get_target_id(handle: str) -> Optional[int]:
+    """Returns the stable id of a target's Twitter handle, or None if it is not a known target."""
+    return _current().ids.get(handle.casefold())
+
+
+def get_target_by_id(target_id: int) -> Optional[Target]:
+    """Returns the target with this id, or None if it was removed from the data file."""
+    return _current().by_id.get(target_id)
+
+
+def get_targets_by_ids(bits: int) -> list:
+    """
+    Returns the targets whose ids are set in a bitset, in id order.
+
+    Args:
+        bits: Python int with bit i set for target id i
+
+    Returns:
+        List of Target records; ids of removed targets are skipped
+    """
+    by_id = _current().by_id
+    targets = []
+    while bits:
+        low = bits & -bits
+        target = by_id.get(low.bit_length() - 1)
+        if target:
+            targets.append(target)
+        bits ^= low
+    return targets
+
+
+def custom_target(handle: str) -> Target:
+    """Returns a record for a handle the user typed in, or the known target with that handle."""
+    return get_target_by_handle(handle) or Target(
+        name=f"@{handle}",
+        handle=handle,
+        description="Custom target",
+        description_fa="هدف سفارشی",
+        tone="respectful and urgent",
+    )
+
+
 def get_yle_campaign_categories() -> list:
     """Returns list of Yle campaign category keys."""
-    return list(YLE_CAMPAIGN_TARGETS.keys())
+    return list(_current().yle_by_category)
 
 
-def get_yle_campaign_targets(category: str) -> list:
+def get_yle_campaign_targets(category: str) -> tuple:
     """Returns targets in a Yle campaign category."""
-    return YLE_CAMPAIGN_TARGETS.get(category, [])
+    return _current().yle_by_category.get(category, ())
 
 
-def get_yle_target_by_handle(handle: str) -> Optional[dict]:
-    """Finds a Yle campaign target by their Twitter handle."""
-    for category, targets in YLE_CAMPAIGN_TARGETS.items():
-        for target in targets:
-            if target["handle"].lower() == handle.lower():
-                target["category"] = category
-                return target
-    return None
+def get_yle_target_by_handle(handle: str) -> Optional[Target]:
+    """Finds a Yle campaign target by their Twitter handle (case-insensitive)."""
+    return _current().yle_by_handle.get(handle.casefold())
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points db.py at an empty database under tmp_path and initializes it."""
+    manager = db.ConnectionManager(path=str(tmp_path / "usage.db"))
+    monkeypatch.setattr(db, "_manager", manager)
+    db.init_db()
+    yield manager
+    manager.close()
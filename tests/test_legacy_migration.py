@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+import db
+from campaigns import SPAIN_EMAIL_TO
+
+LEGACY_ROWS = [
+    (1, "spain_email_start", "", "", "", "telegram"),
+    (1, "spain_email", SPAIN_EMAIL_TO, "", "es", "telegram"),
+    (2, "spain_email_start", "", "", "", "telegram"),
+    (2, "spain_email", SPAIN_EMAIL_TO, "", "es", "telegram"),
+    (3, "tweet", "someone", "journalists", "en", "twitter"),
+]
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """A database holding only the original flat usage_logs table."""
+    path = str(tmp_path / "usage.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE usage_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER NOT NULL,
+            username TEXT,
+            action TEXT NOT NULL,
+            target_handle TEXT,
+            target_category TEXT,
+            language TEXT,
+            platform TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        """
+        INSERT INTO usage_logs (telegram_id, username, action, target_handle, target_category, language, platform)
+        VALUES (?, 'user', ?, ?, ?, ?, ?)
+        """,
+        LEGACY_ROWS,
+    )
+    conn.commit()
+    conn.close()
+
+    manager = db.ConnectionManager(path=path)
+    monkeypatch.setattr(db, "_manager", manager)
+    yield manager
+    manager.close()
+
+
+def _campaign_counts(manager) -> dict:
+    with manager.reader() as conn:
+        return dict(conn.execute("""
+            SELECT COALESCE(campaigns.name, ''), COUNT(*) FROM usage_events
+            LEFT JOIN campaigns ON campaigns.id = usage_events.campaign_id
+            GROUP BY 1
+        """).fetchall())
+
+
+def test_setup_db_migration_uses_registered_campaigns(legacy_db):
+    # What scripts/setup_db.sh runs, followed by the bot starting
+    db.init_db()
+    db.init_db()
+
+    assert _campaign_counts(legacy_db) == {"spain": 4, "": 1}
+    assert "spain_email" not in db.get_campaigns()
+
+
+def test_rows_migrated_without_registry_are_reattached(legacy_db):
+    # Databases migrated before the registry was importable
+    db.init_db({})
+    assert _campaign_counts(legacy_db) == {"spain_email": 2, "": 3}
+
+    db.init_db()
+
+    assert _campaign_counts(legacy_db) == {"spain": 4, "": 1}
+    assert "spain_email" not in db.get_campaigns()
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from outbound import OutboundScheduler
+
+
+def _recorder(order: list, name: str):
+    async def send():
+        order.append(name)
+        return name
+
+    return send
+
+
+def test_interactive_call_goes_before_queued_broadcast():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=30, chat_rate=10, chat_burst=1)
+        order = []
+        # The first send takes the chat's only token, so the broadcast waits
+        first = scheduler.submit(1, _recorder(order, "first"))
+        broadcast = scheduler.submit(1, _recorder(order, "broadcast"), low_priority=True)
+        await asyncio.sleep(0.01)
+        reply = scheduler.submit(1, _recorder(order, "reply"))
+        await asyncio.gather(first, broadcast, reply)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "reply", "broadcast"]
+
+
+def test_low_lane_pause_is_checked_after_chat_token():
+    async def scenario():
+        scheduler = OutboundScheduler(global_rate=30, chat_rate=10, chat_burst=1)
+        order = []
+        first = scheduler.submit(1, _recorder(order, "first"))
+        broadcast = scheduler.submit(1, _recorder(order, "broadcast"), low_priority=True)
+        await asyncio.sleep(0.01)
+        # Paused by a RetryAfter elsewhere while this chat waits for its token
+        scheduler._low_blocked_until = time.monotonic() + 0.3
+        await first
+        start = time.monotonic()
+        await broadcast
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) >= 0.25
@@ -0,0 +1,15 @@
+import pytest
+
+import db
+
+
+def test_time_range_queries_use_their_indexes(temp_db):
+    db.check_query_plans()
+
+
+def test_missing_index_is_reported(temp_db):
+    with temp_db.writer() as conn:
+        conn.execute("DROP INDEX idx_events_ts_action")
+
+    with temp_db.writer() as conn, pytest.raises(RuntimeError, match="idx_events_ts_action"):
+        db.check_query_plans(conn)